@@ -0,0 +1,114 @@
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, identify_hasher, make_password
+from threading import BoundedSemaphore, Lock
+from .models import LoginIdentity
+
+
+# ============================================================
+# CREDENTIAL RESOLUTION SETTINGS
+# ============================================================
+DEFAULT_LOGIN_CREDENTIAL_SETTINGS = {
+    'HASH_WORKERS': 4,       # Threads verifying password hashes (per process)
+    'MAX_PENDING': 32,       # Verifications running or waiting before new logins are refused
+    'WAIT_TIMEOUT': 10,      # Seconds a login waits for its verification
+}
+
+
+def get_login_credential_settings():
+    return {**DEFAULT_LOGIN_CREDENTIAL_SETTINGS, **getattr(settings, 'LOGIN_CREDENTIALS', {})}
+
+
+class CredentialCheckBusy(Exception):
+    """Raised when the password hashing pool is saturated"""
+    pass
+
+
+# ============================================================
+# BOUNDED PASSWORD HASHING POOL
+# ============================================================
+class PasswordHashPool:
+    """
+    Runs password hash verification on a small fixed pool of threads
+    (the hash functions release the GIL), with a cap on queued work, so a
+    login burst cannot occupy every request worker with hashing.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._executor = None
+        self._slots = None
+
+    def _ensure_started(self):
+        if self._executor is not None:
+            return
+        with self._lock:
+            if self._executor is None:
+                config = get_login_credential_settings()
+                self._slots = BoundedSemaphore(config['MAX_PENDING'])
+                self._executor = ThreadPoolExecutor(max_workers=config['HASH_WORKERS'], thread_name_prefix='password-hash')
+
+    def check(self, password, encoded):
+        self._ensure_started()
+        if not self._slots.acquire(blocking=False):
+            raise CredentialCheckBusy('Too many logins in progress, please try again')
+        try:
+            future = self._executor.submit(check_password, password, encoded)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            return future.result(timeout=get_login_credential_settings()['WAIT_TIMEOUT'])
+        except FutureTimeoutError:
+            raise CredentialCheckBusy('Too many logins in progress, please try again')
+
+
+password_hash_pool = PasswordHashPool()
+
+
+def _upgrade_hash_if_needed(password, encoded, save):
+    """Re-hash with the current hasher settings (what Django's check_password setter does)"""
+    try:
+        if identify_hasher(encoded).must_update(encoded):
+            save(make_password(password))
+    except ValueError:
+        pass
+
+
+# ============================================================
+# CREDENTIAL RESOLVER
+# ============================================================
+def resolve_credentials(email, password):
+    """
+    Find the account for `email` with one indexed query and verify the password.
+    Admins (active staff/superusers) take precedence over custom users with the same email.
+    Returns (LoginIdentity.ADMIN, user), (LoginIdentity.CUSTOM, custom_user) or (None, None).
+    Raises CredentialCheckBusy when the hashing pool is saturated.
+    """
+    identities = sorted(
+        LoginIdentity.objects.filter(email=email).select_related('user', 'custom_user'),
+        key=lambda identity: identity.account_type != LoginIdentity.ADMIN
+    )
+
+    for identity in identities:
+        if identity.account_type == LoginIdentity.ADMIN:
+            user = identity.user
+            if not (user.is_active and (user.is_superuser or user.is_staff)):
+                continue
+            if password_hash_pool.check(password, user.password):
+                def save_user_password(encoded):
+                    user.password = encoded
+                    user.save(update_fields=['password'])
+                _upgrade_hash_if_needed(password, user.password, save_user_password)
+                return LoginIdentity.ADMIN, user
+        else:
+            custom_user = identity.custom_user
+            if password_hash_pool.check(password, custom_user.login_password):
+                def save_custom_password(encoded):
+                    custom_user.login_password = encoded
+                    custom_user.save(update_fields=['login_password'])
+                _upgrade_hash_if_needed(password, custom_user.login_password, save_custom_password)
+                return LoginIdentity.CUSTOM, custom_user
+
+    return None, None
@@ -0,0 +1,81 @@
+from django.conf import settings
+from django.core import signing
+
+
+# ============================================================
+# SIGNED CUSTOM USER SESSION
+# ============================================================
+DEFAULT_CUSTOM_SESSION_SETTINGS = {
+    'COOKIE_NAME': 'custom_session',
+    'MAX_AGE': 60 * 60 * 12,                # Token lifetime in seconds
+    'SALT': 'authapp.custom_session',
+    'PRINCIPAL_CACHE_TTL': 60,              # Seconds a resolved custom user is trusted per process
+}
+
+
+def get_custom_session_settings():
+    return {**DEFAULT_CUSTOM_SESSION_SETTINGS, **getattr(settings, 'CUSTOM_USER_SESSION', {})}
+
+
+class CustomUserPrincipal:
+    """
+    Lightweight stand-in for a CustomUser, built from the session token without a query.
+    Exposes `pk`/`id` so it can be passed to log_activity, and `*_id` foreign key assignments.
+    """
+    is_authenticated = True
+
+    def __init__(self, id, full_name='', email='', role='user'):
+        self.id = self.pk = id
+        self.full_name = full_name
+        self.login_email = email
+        self.role = role
+
+    def __str__(self):
+        return f"{self.full_name} ({self.login_email})"
+
+
+def issue_custom_session(custom_user, role='user'):
+    """Signed, timestamped token carrying the custom user's id, name and role"""
+    config = get_custom_session_settings()
+    return signing.dumps(
+        {'id': custom_user.id, 'name': custom_user.full_name, 'email': custom_user.login_email, 'role': role},
+        salt=config['SALT'],
+        compress=True,
+    )
+
+
+def read_custom_session(token):
+    """Return the principal for a valid, unexpired token, otherwise None"""
+    if not token:
+        return None
+    config = get_custom_session_settings()
+    try:
+        payload = signing.loads(token, salt=config['SALT'], max_age=config['MAX_AGE'])
+    except signing.BadSignature:
+        return None
+    return CustomUserPrincipal(payload['id'], payload.get('name', ''), payload.get('email', ''), payload.get('role', 'user'))
+
+
+def get_session_principal(request):
+    """Principal carried by the request's session cookie (token check only, see authapp.principal)"""
+    return read_custom_session(request.COOKIES.get(get_custom_session_settings()['COOKIE_NAME']))
+
+
+def set_custom_session_cookie(response, custom_user):
+    config = get_custom_session_settings()
+    response.set_cookie(
+        config['COOKIE_NAME'],
+        issue_custom_session(custom_user),
+        max_age=config['MAX_AGE'],
+        httponly=True,
+        samesite='Lax',
+    )
+    response.set_cookie("user_type", 'user', max_age=config['MAX_AGE'], httponly=True, samesite='Lax')
+    return response
+
+
+def delete_custom_session_cookie(response):
+    response.delete_cookie(get_custom_session_settings()['COOKIE_NAME'])
+    response.delete_cookie("user_type")
+    response.delete_cookie("custom_user_id")  # Legacy unsigned cookie
+    return response
@@ -1,36 +1,74 @@
+from asgiref.sync import iscoroutinefunction
 from functools import wraps
 from django.shortcuts import redirect
 from django.http import JsonResponse
-from .models import CustomUser
+from django.contrib.auth.models import AnonymousUser
+from .principal import get_request_actor, aget_request_actor
+from .jwt_auth import get_bearer_token
+from dus_reception.profiling import get_profile_plan, run_profiled, arun_profiled
 
 
 def login_required_dual(login_url='/unauthorized/'):
     """
-    Decorator that accepts BOTH Django admin users AND custom users (via cookies)
+    Decorator that accepts BOTH Django admin users AND custom users (via signed session cookie or JWT)
     Works with both function-based views and ensures custom users aren't redirected to unauthorized
+    The resolved actor is memoized on the request (see get_request_actor) and custom users
+    are attached as request.custom_user
+    Async views get an async wrapper, so they stay async under ASGI
+    Views are marked as authenticating by Bearer token (CSRF exempt for valid tokens, see
+    JWTCsrfExemptMiddleware); on token requests request.user is the token's admin, never the session's
+    Staff can profile the view with the X-Profile header / ?_profile= flag (see dus_reception.profiling)
     """
     def decorator(view_func):
-        @wraps(view_func)
-        def wrapper(request, *args, **kwargs):
-            # Check if user is Django admin user
-            if request.user.is_authenticated:
-                return view_func(request, *args, **kwargs)
+        def use_token_user(request, user):
+            # Token requests skip CSRF, so the session cookie must not authenticate them
+            if get_bearer_token(request):
+                request.user = user if user is not None else AnonymousUser()
+        
+        def get_denied_response(request, user, custom_user):
+            # Check if user is Django admin user (session or JWT)
+            if user is not None:
+                return None
             
-            # Check if user is custom user (via cookie)
-            custom_user_id = request.COOKIES.get("custom_user_id")
-            user_type = request.COOKIES.get("user_type")
+            # Check if user is custom user (signed session cookie or JWT)
+            if custom_user is not None and custom_user.role == 'user':
+                return None
             
-            if custom_user_id and user_type == 'user':
-                try:
-                    custom_user = CustomUser.objects.get(id=custom_user_id)
-                    # Optionally attach custom user to request for use in view
-                    request.custom_user = custom_user
-                    return view_func(request, *args, **kwargs)
-                except CustomUser.DoesNotExist:
-                    pass
+            # API clients using a Bearer token get a 401 instead of a redirect
+            if get_bearer_token(request):
+                return JsonResponse({'error': 'Invalid or expired token'}, status=401)
             
             # If neither admin nor custom user, redirect to login
             return redirect(login_url)
         
+        if iscoroutinefunction(view_func):
+            @wraps(view_func)
+            async def async_wrapper(request, *args, **kwargs):
+                user, custom_user = await aget_request_actor(request)
+                use_token_user(request, user)
+                denied = get_denied_response(request, user, custom_user)
+                if denied is not None:
+                    return denied
+                plan = get_profile_plan(request, user)
+                if plan is not None:
+                    return await arun_profiled(request, plan, lambda: view_func(request, *args, **kwargs))
+                return await view_func(request, *args, **kwargs)
+            
+            async_wrapper.authenticates_bearer_token = True
+            return async_wrapper
+        
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            user, custom_user = get_request_actor(request)
+            use_token_user(request, user)
+            denied = get_denied_response(request, user, custom_user)
+            if denied is not None:
+                return denied
+            plan = get_profile_plan(request, user)
+            if plan is not None:
+                return run_profiled(request, plan, lambda: view_func(request, *args, **kwargs))
+            return view_func(request, *args, **kwargs)
+        
+        wrapper.authenticates_bearer_token = True
         return wrapper
-    return decorator
\ No newline at end of file
+    return decorator
@@ -0,0 +1,17 @@
+# ============================================================
+# PASSWORD HASHING WORKER PROCESSES
+# ============================================================
+# Entry points of the spawned processes used by user_import.hash_passwords.
+# A spawned child imports this module before the pool initializer has run, so
+# it must not import models (or anything that does) at module level.
+def init_hash_worker():
+    # Spawned workers start from a fresh interpreter and need Django configured for the hashers
+    import django
+    from django.apps import apps
+    if not apps.ready:
+        django.setup()
+
+
+def hash_password(password):
+    from django.contrib.auth.hashers import make_password
+    return make_password(password)
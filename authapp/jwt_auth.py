@@ -0,0 +1,67 @@
+from rest_framework_simplejwt.tokens import RefreshToken, AccessToken
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+from .custom_session import CustomUserPrincipal
+
+
+# ============================================================
+# JWT TOKENS FOR ADMIN AND CUSTOM USERS
+# ============================================================
+class JWTUser(TokenUser):
+    """Stateless admin user built from access token claims (no DB read)"""
+
+    def get_full_name(self):
+        return self.token.get('name', '')
+
+
+def get_admin_tokens(user):
+    """Refresh/access pair for a Django admin user"""
+    refresh = RefreshToken.for_user(user)
+    refresh['user_type'] = 'admin'
+    refresh['username'] = user.username
+    refresh['name'] = user.get_full_name()
+    refresh['is_staff'] = user.is_staff
+    refresh['is_superuser'] = user.is_superuser
+    return {'refresh': str(refresh), 'access': str(refresh.access_token)}
+
+
+def get_custom_user_tokens(custom_user):
+    """
+    Refresh/access pair for a CustomUser. These users are not Django users, so the
+    id goes in a separate claim and the token is never resolved to an auth User.
+    """
+    refresh = RefreshToken()
+    refresh['user_type'] = 'user'
+    refresh['custom_user_id'] = custom_user.id
+    refresh['name'] = custom_user.full_name
+    refresh['email'] = custom_user.login_email
+    return {'refresh': str(refresh), 'access': str(refresh.access_token)}
+
+
+def get_bearer_token(request):
+    header = request.META.get(api_settings.AUTH_HEADER_NAME, '')
+    parts = header.split()
+    if len(parts) == 2 and parts[0] in api_settings.AUTH_HEADER_TYPES:
+        return parts[1]
+    return None
+
+
+def authenticate_jwt(request):
+    """
+    Validate the request's Bearer access token (signature, expiry, type) without
+    session or DB access. Returns (user, custom_user), both None if there is no valid token.
+    """
+    raw_token = get_bearer_token(request)
+    if not raw_token:
+        return None, None
+    try:
+        token = AccessToken(raw_token)
+    except TokenError:
+        return None, None
+
+    if token.get('user_type') == 'user':
+        return None, CustomUserPrincipal(token['custom_user_id'], token.get('name', ''), token.get('email', ''))
+    if token.get('user_type') == 'admin' and token.get(api_settings.USER_ID_CLAIM):
+        return JWTUser(token), None
+    return None, None
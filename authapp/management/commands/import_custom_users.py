@@ -0,0 +1,53 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from authapp.user_import import parse_import_file, import_custom_users, ImportFormatError
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        'Bulk-create custom users from a CSV (full_name,login_email,password) or JSON file. '
+        'Passwords are hashed in parallel on all cores.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV or JSON file to import')
+        parser.add_argument('--format', choices=['csv', 'json'], default=None, help='Defaults to the file extension')
+        parser.add_argument('--created-by', default=None, help='Username of the admin recorded as creator')
+        parser.add_argument('--skip-invalid', action='store_true', help='Import the valid rows even if some rows fail')
+        parser.add_argument('--dry-run', action='store_true', help='Validate only')
+        parser.add_argument('--workers', type=int, default=None, help='Hashing processes (default: CPU count)')
+
+    def handle(self, *args, **options):
+        import_format = options['format'] or ('json' if options['path'].lower().endswith('.json') else 'csv')
+
+        created_by = None
+        if options['created_by']:
+            created_by = User.objects.filter(username=options['created_by']).first()
+            if created_by is None:
+                raise CommandError(f'Unknown user {options["created_by"]}')
+
+        try:
+            with open(options['path'], 'rb') as import_file:
+                rows = parse_import_file(import_file.read(), import_format)
+        except (OSError, ImportFormatError) as e:
+            raise CommandError(str(e))
+
+        result = import_custom_users(
+            rows,
+            created_by=created_by,
+            skip_invalid=options['skip_invalid'],
+            dry_run=options['dry_run'],
+            workers=options['workers'],
+        )
+
+        for error in result['errors']:
+            self.stdout.write(self.style.WARNING(f'  row {error["row"]}: {error["field"]}: {error["error"]}'))
+
+        if result['dry_run']:
+            self.stdout.write(f'Dry run: {len(rows) - result["skipped"]} valid, {result["skipped"]} invalid rows')
+        elif result['errors'] and not options['skip_invalid']:
+            raise CommandError(f'{len(result["errors"])} errors, nothing imported (use --skip-invalid to import the valid rows)')
+        else:
+            self.stdout.write(self.style.SUCCESS(f'Imported {result["created"]} custom users ({result["skipped"]} skipped)'))
@@ -0,0 +1,44 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from .jwt_auth import get_bearer_token, authenticate_jwt
+
+
+# ============================================================
+# JWT CSRF EXEMPTION
+# ============================================================
+class JWTCsrfExemptMiddleware:
+    """
+    Requests carrying a valid Bearer access token to a view that authenticates
+    by that token only (login_required_dual marks its views; see
+    authapp.principal.get_request_actor) are CSRF exempt: the token is not sent
+    by browsers automatically. Session-authenticated views keep CSRF even when
+    an Authorization header is added. Must come before CsrfViewMiddleware.
+    Sync and async capable; the token check is stateless, so under ASGI
+    process_view runs on the event loop without a thread hop.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+            # Django calls an async process_view directly in async mode
+            self.process_view = self.aprocess_view
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        return await self.get_response(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if getattr(view_func, 'authenticates_bearer_token', False) and get_bearer_token(request):
+            user, custom_user = authenticate_jwt(request)
+            if user is not None or custom_user is not None:
+                request._dont_enforce_csrf_checks = True
+        return None
+
+    async def aprocess_view(self, request, view_func, view_args, view_kwargs):
+        return JWTCsrfExemptMiddleware.process_view(self, request, view_func, view_args, view_kwargs)
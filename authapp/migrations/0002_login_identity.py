@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-19 01:19
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_login_identities(apps, schema_editor):
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    CustomUser = apps.get_model('authapp', 'CustomUser')
+    LoginIdentity = apps.get_model('authapp', 'LoginIdentity')
+
+    LoginIdentity.objects.bulk_create([
+        LoginIdentity(email=email, account_type='admin', user_id=user_id)
+        for user_id, email in User.objects.exclude(email='').values_list('id', 'email').iterator()
+    ], batch_size=1000)
+    LoginIdentity.objects.bulk_create([
+        LoginIdentity(email=email, account_type='user', custom_user_id=custom_user_id)
+        for custom_user_id, email in CustomUser.objects.values_list('id', 'login_email').iterator()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authapp', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LoginIdentity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('email', models.CharField(db_index=True, max_length=254)),
+                ('account_type', models.CharField(choices=[('admin', 'Admin'), ('user', 'Custom User')], max_length=10)),
+                ('custom_user', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='login_identity', to='authapp.customuser')),
+                ('user', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='login_identity', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Login Identity',
+                'verbose_name_plural': 'Login Identities',
+                'db_table': 'login_identities',
+            },
+        ),
+        migrations.RunPython(backfill_login_identities, migrations.RunPython.noop),
+    ]
@@ -29,4 +29,42 @@ class CustomUser(models.Model):
         verbose_name_plural = 'Custom Users'
 
     def __str__(self):
-        return f"{self.full_name} ({self.login_email})"
\ No newline at end of file
+        return f"{self.full_name} ({self.login_email})"
+
+class LoginIdentity(models.Model):
+    """
+    One row per login-capable account (admin User or CustomUser), keyed by email,
+    so login resolves the account type and password hash with a single indexed query.
+    Kept in sync by authapp.signals.
+    """
+    ADMIN = 'admin'
+    CUSTOM = 'user'
+    ACCOUNT_TYPE_CHOICES = [
+        (ADMIN, 'Admin'),
+        (CUSTOM, 'Custom User'),
+    ]
+
+    email = models.CharField(max_length=254, db_index=True)
+    account_type = models.CharField(max_length=10, choices=ACCOUNT_TYPE_CHOICES)
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='login_identity'
+    )
+    custom_user = models.OneToOneField(
+        CustomUser,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='login_identity'
+    )
+
+    class Meta:
+        db_table = 'login_identities'
+        verbose_name = 'Login Identity'
+        verbose_name_plural = 'Login Identities'
+
+    def __str__(self):
+        return f"{self.email} ({self.account_type})"
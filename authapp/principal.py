@@ -0,0 +1,114 @@
+from asgiref.sync import sync_to_async
+from threading import Lock
+import time
+from dus_reception.cache_backends import get_cache_version, bump_cache_version
+from .models import CustomUser
+from .custom_session import get_custom_session_settings, get_session_principal
+from .jwt_auth import get_bearer_token, authenticate_jwt
+
+
+# ============================================================
+# PRINCIPAL RESOLUTION
+# ============================================================
+CUSTOM_USER_CACHE_VERSION = 'custom_user_cache'
+
+class CustomUserCache:
+    """
+    Short-TTL, per-process cache of custom user identity (name/email), keyed by id.
+    Lets every request confirm its custom user still exists without a query;
+    custom_user_api invalidates entries when a user is updated or deleted, and a
+    version counter in the shared cache carries that to the other workers.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._entries = {}
+        self._version = None
+
+    def get(self, custom_user_id):
+        """{'id', 'full_name', 'login_email'} or None if the user no longer exists"""
+        now = time.monotonic()
+        # An invalidation in any worker bumps the shared version and drops every local entry
+        version = get_cache_version(CUSTOM_USER_CACHE_VERSION)
+        with self._lock:
+            if version != self._version:
+                self._entries.clear()
+                self._version = version
+            entry = self._entries.get(custom_user_id)
+            if entry is not None and entry[0] > now:
+                return entry[1]
+
+        data = CustomUser.objects.filter(id=custom_user_id).values('id', 'full_name', 'login_email').first()
+        ttl = get_custom_session_settings()['PRINCIPAL_CACHE_TTL']
+        with self._lock:
+            self._entries[custom_user_id] = (now + ttl, data)
+        return data
+
+    def invalidate(self, custom_user_id=None):
+        with self._lock:
+            if custom_user_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(custom_user_id, None)
+        bump_cache_version(CUSTOM_USER_CACHE_VERSION)
+
+
+custom_user_cache = CustomUserCache()
+
+
+def get_request_actor(request):
+    """
+    The actor of this request as (user, custom_user); at most one is set.
+    A Bearer access token is checked statelessly and, when present, is the only
+    credential considered (those requests are CSRF exempt, see JWTCsrfExemptMiddleware).
+    Otherwise admin users come from Django auth and custom users from the signed
+    session token confirmed against custom_user_cache. Memoized on the request,
+    so the decorator and the view share a single resolution.
+    """
+    if hasattr(request, '_actor'):
+        return request._actor
+
+    user = None
+    custom_user = None
+    if get_bearer_token(request):
+        user, custom_user = authenticate_jwt(request)
+    elif request.user.is_authenticated:
+        user = request.user
+    else:
+        principal = get_session_principal(request)
+        if principal is not None:
+            data = custom_user_cache.get(principal.id)
+            if data is not None:
+                principal.full_name = data['full_name']
+                principal.login_email = data['login_email']
+                custom_user = principal
+
+    request._actor = (user, custom_user)
+    request.custom_user = custom_user
+    return request._actor
+
+
+async def aget_request_actor(request):
+    """get_request_actor for async views (resolving may read the session and user tables)"""
+    if hasattr(request, '_actor'):
+        return request._actor
+    return await sync_to_async(get_request_actor)(request)
+
+
+def invalidate_custom_user(custom_user_id):
+    """Call after a custom user is updated or deleted"""
+    custom_user_cache.invalidate(custom_user_id)
+
+
+def is_staff_actor(user):
+    """True for an admin actor (session or JWT) with staff or superuser rights"""
+    return user is not None and (user.is_superuser or user.is_staff)
+
+
+def get_actor_name(user, custom_user):
+    """Display name of an actor, worded like Booking.get_creator_name()"""
+    if user is not None:
+        return f"{user.get_full_name() or user.username} (Admin)"
+    if custom_user is not None:
+        return f"{custom_user.full_name} (User)"
+    return "System"
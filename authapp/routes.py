@@ -24,7 +24,17 @@ urlpatterns = [
     # CUSTOM USER API ROUTES
     # --------------------------------------------------------
     path("api/users/", views.custom_user_api, name="user_list_api"),
+    path("api/users/names/", views.custom_user_names_api, name="user_names_api"),
+    path("api/users/import/", views.custom_user_import_api, name="user_import_api"),
     path("api/users/<int:user_id>/", views.custom_user_api, name="user_detail_api"),
+    
+    # --------------------------------------------------------
+    # JWT TOKEN ROUTES (admin & user)
+    # --------------------------------------------------------
+    path("api/token/", views.token_obtain_view, name="token_obtain"),
+    path("api/token/refresh/", views.ThrottledTokenRefreshView.as_view(), name="token_refresh"),
+    path("api/token/logout/", views.token_logout_view, name="token_logout"),
+    path("api/throttle/metrics/", views.auth_throttle_metrics, name="auth_throttle_metrics"),
 ]
 
 # ============================================================
@@ -1,45 +1,70 @@
 from rest_framework import serializers
-from django.contrib.auth import authenticate, get_user_model
-from django.contrib.auth.hashers import make_password, check_password
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
 from rest_framework_simplejwt.tokens import RefreshToken
-from .models import CustomUser
+from .models import CustomUser, LoginIdentity
+from .credentials import resolve_credentials
+from .jwt_auth import get_admin_tokens, get_custom_user_tokens
 
 User = get_user_model()
 
 # ============================================================
-# ADMIN AUTH SERIALIZERS
+# TOKEN PAYLOADS
 # ============================================================
-class AdminLoginSerializer(serializers.Serializer):
+def get_admin_token_payload(user):
+    return {
+        **get_admin_tokens(user),
+        "id": user.id,
+        "email": user.email,
+        "username": user.username,
+        "is_superuser": user.is_superuser,
+        "is_staff": user.is_staff,
+    }
+
+
+def get_custom_user_token_payload(custom_user):
+    return {
+        **get_custom_user_tokens(custom_user),
+        "id": custom_user.id,
+        "full_name": custom_user.full_name,
+        "email": custom_user.login_email,
+        "created_at": custom_user.created_at,
+        "updated_at": custom_user.updated_at,
+    }
+
+
+# ============================================================
+# UNIFIED TOKEN SERIALIZER (admin & user)
+# ============================================================
+class TokenObtainSerializer(serializers.Serializer):
+    """Same credentials and precedence as login_view; one indexed lookup"""
     email = serializers.EmailField()
     password = serializers.CharField(write_only=True)
 
     def validate(self, data):
-        email = data.get("email")
-        password = data.get("password")
+        account_type, account = resolve_credentials(data.get("email"), data.get("password"))
 
-        try:
-            user_obj = User.objects.get(email=email)
-        except User.DoesNotExist:
-            raise serializers.ValidationError("Invalid email or password")
+        if account_type == LoginIdentity.ADMIN:
+            return {"user_type": "admin", "account": account, **get_admin_token_payload(account)}
+        if account_type == LoginIdentity.CUSTOM:
+            return {"user_type": "user", "account": account, **get_custom_user_token_payload(account)}
+        raise serializers.ValidationError("Invalid email or password")
 
-        user = authenticate(username=user_obj.username, password=password)
 
-        if not user:
-            raise serializers.ValidationError("Invalid email or password")
+# ============================================================
+# ADMIN AUTH SERIALIZERS
+# ============================================================
+class AdminLoginSerializer(serializers.Serializer):
+    email = serializers.EmailField()
+    password = serializers.CharField(write_only=True)
+
+    def validate(self, data):
+        account_type, user = resolve_credentials(data.get("email"), data.get("password"))
 
-        # Only allow superuser or staff
-        if not (user.is_superuser or user.is_staff):
-            raise serializers.ValidationError("Access denied. Only admin users can log in.")
+        if account_type != LoginIdentity.ADMIN:
+            raise serializers.ValidationError("Invalid email or password")
 
-        refresh = RefreshToken.for_user(user)
-        return {
-            "refresh": str(refresh),
-            "access": str(refresh.access_token),
-            "email": user.email,
-            "username": user.username,
-            "is_superuser": user.is_superuser,
-            "is_staff": user.is_staff,
-        }
+        return get_admin_token_payload(user)
 
 
 class AdminLogoutSerializer(serializers.Serializer):
@@ -68,26 +93,12 @@ class CustomUserLoginSerializer(serializers.Serializer):
     password = serializers.CharField(write_only=True)
 
     def validate(self, data):
-        email = data.get("email")
-        password = data.get("password")
-
-        try:
-            custom_user = CustomUser.objects.get(login_email=email)
-        except CustomUser.DoesNotExist:
-            raise serializers.ValidationError("Invalid email or password")
+        account_type, custom_user = resolve_credentials(data.get("email"), data.get("password"))
 
-        # Check password
-        if not check_password(password, custom_user.login_password):
+        if account_type != LoginIdentity.CUSTOM:
             raise serializers.ValidationError("Invalid email or password")
 
-        # Create a simple token (you can use JWT if needed)
-        return {
-            "id": custom_user.id,
-            "full_name": custom_user.full_name,
-            "email": custom_user.login_email,
-            "created_at": custom_user.created_at,
-            "updated_at": custom_user.updated_at,
-        }
+        return get_custom_user_token_payload(custom_user)
 
 
 class CustomUserLogoutSerializer(serializers.Serializer):
@@ -0,0 +1,51 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from managementapp.dashboards import invalidate_dashboards
+from .models import CustomUser, LoginIdentity
+from .user_directory import invalidate_user_name_map
+
+User = get_user_model()
+
+
+# ============================================================
+# LOGIN IDENTITY SYNC
+# ============================================================
+def sync_user_identity(user):
+    if user.email:
+        LoginIdentity.objects.update_or_create(
+            user=user, defaults={'email': user.email, 'account_type': LoginIdentity.ADMIN}
+        )
+    else:
+        LoginIdentity.objects.filter(user=user).delete()
+
+
+def sync_custom_user_identity(custom_user):
+    LoginIdentity.objects.update_or_create(
+        custom_user=custom_user, defaults={'email': custom_user.login_email, 'account_type': LoginIdentity.CUSTOM}
+    )
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, raw=False, update_fields=None, **kwargs):
+    # last_login/password-only saves (e.g. every login) cannot change the email
+    if raw or (update_fields is not None and 'email' not in update_fields):
+        return
+    sync_user_identity(instance)
+
+
+@receiver(post_save, sender=CustomUser)
+def custom_user_saved(sender, instance, raw=False, update_fields=None, **kwargs):
+    if update_fields is None or 'full_name' in update_fields:
+        invalidate_user_name_map()
+    # Profile fields and creator names are part of the cached dashboards
+    invalidate_dashboards(custom_user_id=instance.id)
+    if raw or (update_fields is not None and 'login_email' not in update_fields):
+        return
+    sync_custom_user_identity(instance)
+
+
+@receiver(post_delete, sender=CustomUser)
+def custom_user_deleted(sender, instance, **kwargs):
+    invalidate_user_name_map()
+    invalidate_dashboards(custom_user_id=instance.id)
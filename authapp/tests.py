@@ -1,3 +1,98 @@
-from django.test import TestCase
+from concurrent.futures.process import BrokenProcessPool
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import IntegrityError
+from django.test import SimpleTestCase, TestCase, override_settings
+from unittest import mock
+from .models import CustomUser
+from .throttling import AuthThrottle
+import json
 
-# Create your tests here.
+
+# ============================================================
+# BULK CUSTOM USER IMPORT
+# ============================================================
+@override_settings(ACTIVITY_LOG={'ASYNC': False})
+class CustomUserImportTests(TestCase):
+    url = '/auth/api/users/import/'
+
+    def setUp(self):
+        self.admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.client.force_login(self.admin)
+
+    def post_users(self, users):
+        return self.client.post(self.url, json.dumps({'users': users}), content_type='application/json')
+
+    def test_json_body_creates_users(self):
+        response = self.post_users([{'full_name': 'Ram Bahadur', 'login_email': 'ram@example.com', 'password': 'Secret123!'}])
+
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(CustomUser.objects.filter(login_email='ram@example.com').exists())
+
+    def test_form_post_without_file_is_rejected(self):
+        response = self.client.post(self.url, {'format': 'csv'})
+
+        self.assertEqual(response.status_code, 400)
+
+    def test_email_registered_during_import_is_a_conflict(self):
+        with mock.patch('authapp.user_import.CustomUser.objects.bulk_create', side_effect=IntegrityError):
+            response = self.post_users([{'full_name': 'Ram Bahadur', 'login_email': 'ram@example.com', 'password': 'Secret123!'}])
+
+        self.assertEqual(response.status_code, 409)
+
+    def test_broken_hashing_pool_is_unavailable(self):
+        with mock.patch('authapp.user_import.hash_passwords', side_effect=BrokenProcessPool):
+            response = self.post_users([{'full_name': 'Ram Bahadur', 'login_email': 'ram@example.com', 'password': 'Secret123!'}])
+
+        self.assertEqual(response.status_code, 503)
+        self.assertFalse(CustomUser.objects.filter(login_email='ram@example.com').exists())
+
+
+# ============================================================
+# AUTH THROTTLING (TOKEN BUCKETS)
+# ============================================================
+@override_settings(
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'auth-throttle-tests'}},
+    AUTH_THROTTLE={'ENDPOINTS': {'login': {'IP': {'RATE': '10/min', 'BURST': 10}, 'EMAIL': {'RATE': '5/min', 'BURST': 5}}}},
+)
+class AuthThrottleTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.throttle = AuthThrottle()
+        self.now = 1_000_000.0
+        patcher = mock.patch('authapp.throttling.time.time', side_effect=lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def attempts(self, count, ip='10.0.0.1', email='ram@example.com'):
+        return [self.throttle.check('login', ip=ip, email=email) for _ in range(count)]
+
+    def test_burst_then_retry_after_one_token(self):
+        self.assertEqual(self.attempts(5), [0] * 5)
+        # 5/min refills one token every 12 seconds
+        self.assertEqual(self.attempts(1), [12])
+
+    def test_tokens_refill_over_time(self):
+        self.attempts(5)
+        self.now += 12
+        self.assertEqual(self.attempts(2), [0, 12])
+        self.now += 60
+        self.assertEqual(self.attempts(6), [0] * 5 + [12])
+
+    def test_email_is_case_insensitive(self):
+        self.attempts(5, email='Ram@Example.com')
+        self.assertEqual(self.attempts(1, email='ram@example.com'), [12])
+
+    def test_ip_bucket_limits_across_emails(self):
+        for index in range(10):
+            self.assertEqual(self.attempts(1, email=f'user{index}@example.com'), [0])
+        # 10/min refills one token every 6 seconds
+        self.assertEqual(self.attempts(1, email='other@example.com'), [6])
+        self.assertEqual(self.attempts(1, ip='10.0.0.2', email='other@example.com'), [0])
+
+    def test_rejections_are_counted_per_scope(self):
+        self.attempts(6)
+        self.assertEqual(self.throttle.metrics['login'], {'allowed': 5, 'rejected_ip': 0, 'rejected_email': 1})
+
+    def test_unconfigured_endpoint_is_not_throttled(self):
+        self.assertEqual([self.throttle.check('token_refresh', ip='10.0.0.1') for _ in range(50)], [0] * 50)
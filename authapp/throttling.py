@@ -0,0 +1,119 @@
+from django.conf import settings
+from django.core.cache import caches
+from threading import Lock
+import hashlib
+import math
+import time
+
+
+# ============================================================
+# AUTH THROTTLING SETTINGS
+# ============================================================
+# RATE is '<n>/<sec|min|hour>' (refill speed), BURST the bucket capacity.
+DEFAULT_AUTH_THROTTLE_SETTINGS = {
+    'ENABLED': True,
+    'CACHE': 'default',        # Use a cache shared by all workers so limits hold across them
+    'ENDPOINTS': {
+        'login': {
+            'IP': {'RATE': '20/min', 'BURST': 20},
+            'EMAIL': {'RATE': '5/min', 'BURST': 5},
+        },
+        'token_obtain': {
+            'IP': {'RATE': '20/min', 'BURST': 20},
+            'EMAIL': {'RATE': '5/min', 'BURST': 5},
+        },
+        'token_refresh': {
+            'IP': {'RATE': '60/min', 'BURST': 30},
+        },
+    },
+}
+
+RATE_PERIODS = {'sec': 1, 'min': 60, 'hour': 3600, 'day': 86400}
+
+
+def get_auth_throttle_settings():
+    return {**DEFAULT_AUTH_THROTTLE_SETTINGS, **getattr(settings, 'AUTH_THROTTLE', {})}
+
+
+def parse_rate(rate):
+    """'5/min' -> tokens per second"""
+    count, period = rate.split('/')
+    return int(count) / RATE_PERIODS[period]
+
+
+# ============================================================
+# TOKEN BUCKET THROTTLE
+# ============================================================
+class AuthThrottle:
+    """
+    Token buckets keyed by (endpoint, scope, identifier) stored in the Django cache.
+    The read-modify-write is serialized per process; across workers a race can
+    let at most a few extra attempts through, which is acceptable for throttling.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self.metrics = {}
+
+    def _record(self, endpoint, outcome):
+        with self._lock:
+            counters = self.metrics.setdefault(endpoint, {'allowed': 0, 'rejected_ip': 0, 'rejected_email': 0})
+            counters[outcome] += 1
+        cache = caches[get_auth_throttle_settings()['CACHE']]
+        key = f'throttle:metrics:{endpoint}:{outcome}'
+        cache.add(key, 0, timeout=None)
+        cache.incr(key)
+
+    def _take(self, cache, key, rate, burst):
+        """Take one token; return 0 if allowed, otherwise seconds until the next token"""
+        now = time.time()
+        with self._lock:
+            tokens, updated = cache.get(key, (burst, now))
+            tokens = min(burst, tokens + (now - updated) * rate)
+            if tokens < 1:
+                return math.ceil((1 - tokens) / rate)
+            cache.set(key, (tokens - 1, now), timeout=math.ceil(burst / rate) + 1)
+        return 0
+
+    def check(self, endpoint, ip=None, email=None):
+        """
+        Consume a token from every configured bucket for this attempt.
+        Returns 0 when allowed, otherwise the Retry-After in seconds.
+        """
+        config = get_auth_throttle_settings()
+        limits = config['ENDPOINTS'].get(endpoint)
+        if not config['ENABLED'] or not limits:
+            return 0
+
+        cache = caches[config['CACHE']]
+        for scope, identifier in (('IP', ip), ('EMAIL', email.lower() if email else None)):
+            limit = limits.get(scope)
+            if not limit or not identifier:
+                continue
+            key = f'throttle:{endpoint}:{scope.lower()}:{hashlib.sha1(identifier.encode()).hexdigest()}'
+            retry_after = self._take(cache, key, parse_rate(limit['RATE']), limit['BURST'])
+            if retry_after:
+                self._record(endpoint, f'rejected_{scope.lower()}')
+                return retry_after
+
+        self._record(endpoint, 'allowed')
+        return 0
+
+    def get_metrics(self):
+        """Per-endpoint counters for this process and, from the shared cache, all workers"""
+        cache = caches[get_auth_throttle_settings()['CACHE']]
+        shared = {}
+        for endpoint in get_auth_throttle_settings()['ENDPOINTS']:
+            keys = {f'throttle:metrics:{endpoint}:{outcome}': outcome for outcome in ('allowed', 'rejected_ip', 'rejected_email')}
+            values = cache.get_many(list(keys))
+            shared[endpoint] = {outcome: values.get(key, 0) for key, outcome in keys.items()}
+        return {'process': self.metrics, 'all_workers': shared}
+
+
+auth_throttle = AuthThrottle()
+
+
+def throttled_response(retry_after, response_class):
+    response = response_class({'error': 'Too many attempts, please try again later'}, status=429)
+    response['Retry-After'] = str(retry_after)
+    return response
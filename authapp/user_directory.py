@@ -0,0 +1,68 @@
+from django.core.cache import cache
+from django.db.models import Count, Sum, Q, OuterRef, Subquery, Value, DecimalField
+from django.db.models.functions import Coalesce
+from managementapp.models import ActivityLog
+from .models import CustomUser
+
+
+# ============================================================
+# CUSTOM USER DIRECTORY
+# ============================================================
+USER_NAME_MAP_CACHE_KEY = 'custom_user_name_map'
+USER_NAME_MAP_TIMEOUT = 60 * 60
+
+
+def get_user_directory_queryset(search=None):
+    """
+    Custom users with their booking count, total advance and last activity,
+    computed by the database in one query (last activity is a correlated subquery
+    so it does not multiply the booking join).
+    """
+    last_activity = ActivityLog.objects.filter(
+        performed_by_custom=OuterRef('pk')
+    ).order_by('-created_at').values('created_at')[:1]
+
+    users = CustomUser.objects.select_related('created_by').annotate(
+        booking_count=Count('bookings_created'),
+        total_advance=Coalesce(
+            Sum('bookings_created__advance_given'),
+            Value(0),
+            output_field=DecimalField(max_digits=12, decimal_places=2)
+        ),
+        last_activity=Subquery(last_activity),
+    )
+    if search:
+        users = users.filter(Q(full_name__icontains=search) | Q(login_email__icontains=search))
+    return users.order_by('-created_at', '-id')
+
+
+def serialize_directory_user(user):
+    created_by = None
+    if user.created_by:
+        created_by = user.created_by.get_full_name() or user.created_by.username
+    return {
+        'id': user.id,
+        'full_name': user.full_name,
+        'login_email': user.login_email,
+        'created_by': created_by,
+        'created_at': user.created_at.isoformat() if user.created_at else None,
+        'booking_count': user.booking_count,
+        'total_advance': f'{user.total_advance:.2f}',
+        'last_activity': user.last_activity.isoformat() if user.last_activity else None,
+    }
+
+
+# ============================================================
+# CACHED ID -> NAME MAP (dropdowns)
+# ============================================================
+def get_user_name_map():
+    """[{'id', 'full_name'}, ...] ordered by name, cached until a custom user changes"""
+    name_map = cache.get(USER_NAME_MAP_CACHE_KEY)
+    if name_map is None:
+        name_map = list(CustomUser.objects.order_by('full_name').values('id', 'full_name'))
+        cache.set(USER_NAME_MAP_CACHE_KEY, name_map, USER_NAME_MAP_TIMEOUT)
+    return name_map
+
+
+def invalidate_user_name_map():
+    cache.delete(USER_NAME_MAP_CACHE_KEY)
@@ -0,0 +1,167 @@
+from concurrent.futures import ProcessPoolExecutor
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import transaction
+import csv
+import io
+import json
+import multiprocessing
+import os
+from managementapp.activity_logger import log_activity
+from managementapp.dashboards import invalidate_dashboards
+from .hash_workers import init_hash_worker, hash_password
+from .models import CustomUser, LoginIdentity
+from .user_directory import invalidate_user_name_map
+
+
+# ============================================================
+# BULK CUSTOM USER IMPORT
+# ============================================================
+IMPORT_FIELDS = ('full_name', 'login_email', 'password')
+
+# Below this many passwords the process pool start-up costs more than it saves
+PARALLEL_HASH_THRESHOLD = 8
+
+
+class ImportFormatError(ValueError):
+    """Raised when the uploaded file cannot be parsed"""
+    pass
+
+
+def parse_import_file(content, import_format):
+    """Rows from CSV (header: full_name,login_email,password) or a JSON list / {'users': [...]}"""
+    if isinstance(content, bytes):
+        content = content.decode('utf-8-sig')
+
+    if import_format == 'csv':
+        reader = csv.DictReader(io.StringIO(content))
+        missing = [field for field in IMPORT_FIELDS if field not in (reader.fieldnames or [])]
+        if missing:
+            raise ImportFormatError(f'Missing CSV columns: {", ".join(missing)}')
+        return list(reader)
+
+    if import_format == 'json':
+        try:
+            data = json.loads(content)
+        except json.JSONDecodeError:
+            raise ImportFormatError('Invalid JSON')
+        rows = data.get('users') if isinstance(data, dict) else data
+        if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+            raise ImportFormatError('JSON must be a list of users or {"users": [...]}')
+        return rows
+
+    raise ImportFormatError('Format must be csv or json')
+
+
+def validate_import_rows(rows):
+    """
+    Apply the registration rules to every row; existing emails are checked with one query.
+    Returns (valid_rows, errors) where errors are {'row', 'field', 'error'} (rows are 1-based).
+    """
+    cleaned = []
+    errors = []
+    seen_emails = set()
+
+    for number, row in enumerate(rows, start=1):
+        full_name = str(row.get('full_name') or '').strip()
+        login_email = str(row.get('login_email') or '').strip()
+        password = str(row.get('password') or '').strip()
+
+        row_errors = []
+        if not full_name:
+            row_errors.append(('full_name', 'Full name is required'))
+        if not login_email:
+            row_errors.append(('login_email', 'Email is required'))
+        else:
+            try:
+                validate_email(login_email)
+            except ValidationError:
+                row_errors.append(('login_email', 'Invalid email'))
+            if login_email.lower() in seen_emails:
+                row_errors.append(('login_email', 'Duplicate email in file'))
+            seen_emails.add(login_email.lower())
+        if not password:
+            row_errors.append(('password', 'Password is required'))
+        elif len(password) < 6:
+            row_errors.append(('password', 'Password must be at least 6 characters'))
+
+        if row_errors:
+            errors.extend({'row': number, 'field': field, 'error': error} for field, error in row_errors)
+        else:
+            cleaned.append({'row': number, 'full_name': full_name, 'login_email': login_email, 'password': password})
+
+    existing = {
+        email.lower() for email in CustomUser.objects.filter(
+            login_email__in=[row['login_email'] for row in cleaned]
+        ).values_list('login_email', flat=True)
+    }
+    valid_rows = []
+    for row in cleaned:
+        if row['login_email'].lower() in existing:
+            errors.append({'row': row['row'], 'field': 'login_email', 'error': 'Email already registered'})
+        else:
+            valid_rows.append(row)
+
+    errors.sort(key=lambda error: error['row'])
+    return valid_rows, errors
+
+
+def hash_passwords(passwords, workers=None):
+    """make_password for every password, spread over a process pool (one process per core)"""
+    workers = min(workers or os.cpu_count() or 1, len(passwords))
+    if workers <= 1 or len(passwords) < PARALLEL_HASH_THRESHOLD:
+        return [hash_password(password) for password in passwords]
+
+    # Spawn, not fork: the web worker already runs background threads (activity writer,
+    # metrics flusher, password hash pool) whose held locks a forked child would inherit
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                             initializer=init_hash_worker) as pool:
+        return list(pool.map(hash_password, passwords, chunksize=max(1, len(passwords) // (workers * 4))))
+
+
+def import_custom_users(rows, created_by=None, skip_invalid=False, dry_run=False, request=None, workers=None):
+    """
+    Validate, hash and bulk_create custom users, then write one summary activity log.
+    Nothing is created when there are errors, unless skip_invalid is set.
+    Returns {'created', 'skipped', 'errors', 'dry_run'}.
+    """
+    valid_rows, errors = validate_import_rows(rows)
+    result = {'created': 0, 'skipped': len(rows) - len(valid_rows), 'errors': errors, 'dry_run': dry_run}
+
+    if (errors and not skip_invalid) or dry_run or not valid_rows:
+        return result
+
+    hashed = hash_passwords([row['password'] for row in valid_rows], workers=workers)
+
+    with transaction.atomic():
+        CustomUser.objects.bulk_create([
+            CustomUser(
+                full_name=row['full_name'],
+                login_email=row['login_email'],
+                login_password=password_hash,
+                created_by=created_by,
+            )
+            for row, password_hash in zip(valid_rows, hashed)
+        ], batch_size=500)
+
+        # bulk_create skips signals (and does not return ids on MySQL), so the
+        # login identities are created from a follow-up query.
+        emails = [row['login_email'] for row in valid_rows]
+        LoginIdentity.objects.bulk_create([
+            LoginIdentity(email=login_email, account_type=LoginIdentity.CUSTOM, custom_user_id=custom_user_id)
+            for custom_user_id, login_email in CustomUser.objects.filter(login_email__in=emails).values_list('id', 'login_email')
+        ], batch_size=500)
+
+    invalidate_user_name_map()
+    invalidate_dashboards()
+    result['created'] = len(valid_rows)
+
+    log_activity(
+        'create',
+        'custom_user',
+        description=f'Bulk imported {len(valid_rows)} custom users'
+                    + (f' ({result["skipped"]} rows skipped)' if result['skipped'] else ''),
+        request=request,
+        performed_by_user=created_by,
+    )
+    return result
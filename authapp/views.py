@@ -1,56 +1,32 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.http import JsonResponse
-from django.contrib.auth import authenticate, login, logout, get_user_model
-from django.contrib.auth.hashers import make_password, check_password
+from django.contrib.auth import login, logout, get_user_model
+from django.contrib.auth.hashers import make_password
 from django.contrib.auth.decorators import login_required
-from django.db.models import Sum, Count
-from rest_framework_simplejwt.tokens import RefreshToken
-from rest_framework_simplejwt.exceptions import TokenError
-from managementapp.models import Booking, ActivityLog
-from .models import CustomUser
+from django.core.paginator import Paginator
+from django.db import IntegrityError
+from rest_framework import serializers
+from rest_framework.decorators import api_view, authentication_classes, permission_classes
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+from rest_framework_simplejwt.views import TokenRefreshView
+from managementapp.activity_logger import log_activity, get_client_ip
+from managementapp.dashboards import get_admin_dashboard, get_user_dashboard
+from .models import CustomUser, LoginIdentity
+from .decorators import login_required_dual
+from .credentials import resolve_credentials, CredentialCheckBusy
+from .throttling import auth_throttle, throttled_response
+from .user_directory import get_user_directory_queryset, serialize_directory_user, get_user_name_map
+from .user_import import parse_import_file, import_custom_users, ImportFormatError
+from .custom_session import set_custom_session_cookie, delete_custom_session_cookie
+from .principal import get_request_actor, invalidate_custom_user
+from .serializers import TokenObtainSerializer, AdminLogoutSerializer
+from concurrent.futures.process import BrokenProcessPool
 import json
 
 User = get_user_model()
 
 
-# ============================================================
-# ACTIVITY LOG HELPER FUNCTION
-# ============================================================
-def get_client_ip(request):
-    """Get client IP address from request"""
-    x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
-    if x_forwarded_for:
-        ip = x_forwarded_for.split(',')[0]
-    else:
-        ip = request.META.get('REMOTE_ADDR')
-    return ip
-
-
-def log_activity(action, entity_type, entity_id=None, entity_name='', description='', request=None, performed_by_user=None, performed_by_custom=None):
-    """
-    Helper function to create activity logs
-    Usage: log_activity('create', 'booking', booking.id, booking.client_name, 'Created new booking', request)
-    """
-    try:
-        ip_address = get_client_ip(request) if request else None
-        user_agent = request.META.get('HTTP_USER_AGENT', '') if request else ''
-        
-        ActivityLog.objects.create(
-            action=action,
-            entity_type=entity_type,
-            entity_id=entity_id,
-            entity_name=entity_name,
-            description=description,
-            performed_by_user=performed_by_user,
-            performed_by_custom=performed_by_custom,
-            ip_address=ip_address,
-            user_agent=user_agent
-        )
-    except Exception as e:
-        # Silent fail - don't break main functionality if logging fails
-        print(f"Activity logging error: {e}")
-
-
 # ============================================================
 # UNIFIED LOGIN VIEW (ONE ROUTE FOR BOTH ADMIN & USER)
 # ============================================================
@@ -58,96 +34,99 @@ def login_view(request):
     """Single Login View: Automatically detects and handles both Admin and CustomUser login.
     Redirects to appropriate dashboard based on user type."""
     
+    if request.method != 'GET':
+        # Get credentials
+        if request.content_type == 'application/json':
+            try:
+                data = json.loads(request.body)
+                email = data.get('email', '').strip()
+                password = data.get('password', '').strip()
+            except json.JSONDecodeError:
+                return JsonResponse({'error': 'Invalid JSON'}, status=400)
+        else:
+            email = request.POST.get('email', '').strip()
+            password = request.POST.get('password', '').strip()
+
+        # Validation
+        if not email or not password:
+            return JsonResponse({'error': 'Email and password are required'}, status=400)
+
+        # Throttle by IP and email before any DB access (session included) or hashing
+        retry_after = auth_throttle.check('login', ip=get_client_ip(request), email=email)
+        if retry_after:
+            return throttled_response(retry_after, JsonResponse)
+    
     # If user already logged in, redirect them directly
     if request.user.is_authenticated:
         if request.user.is_superuser or request.user.is_staff:
             return redirect('admin_dashboard')
-        elif request.COOKIES.get("custom_user_id"):
-            return redirect('user_dashboard')
+    if get_request_actor(request)[1] is not None:
+        return redirect('user_dashboard')
 
     if request.method == 'GET':
         return render(request, "Auth/login.html")
 
-    # Get credentials
-    if request.content_type == 'application/json':
-        try:
-            data = json.loads(request.body)
-            email = data.get('email', '').strip()
-            password = data.get('password', '').strip()
-        except json.JSONDecodeError:
-            return JsonResponse({'error': 'Invalid JSON'}, status=400)
-    else:
-        email = request.POST.get('email', '').strip()
-        password = request.POST.get('password', '').strip()
-
-    # Validation
-    if not email or not password:
-        return JsonResponse({'error': 'Email and password are required'}, status=400)
-
-    # Try Admin Login First
+    # Resolve the account with one indexed lookup; hashes are verified on a bounded pool
     try:
-        user_obj = User.objects.get(email=email)
-        user = authenticate(username=user_obj.username, password=password)
+        account_type, account = resolve_credentials(email, password)
+    except CredentialCheckBusy as e:
+        return JsonResponse({'error': str(e)}, status=503)
+
+    # Admin Login
+    if account_type == LoginIdentity.ADMIN:
+        user = account
+        login(request, user, backend='django.contrib.auth.backends.ModelBackend')
         
-        if user and (user.is_superuser or user.is_staff):
-            login(request, user)
-            
-            # Log admin login activity
-            log_activity(
-                'login',
-                'system',
-                description=f'Admin user {user.username} logged in',
-                request=request,
-                performed_by_user=user
-            )
-            
-            if request.content_type == 'application/json':
-                return JsonResponse({
-                    'success': True,
-                    'message': 'Login successful',
-                    'user_type': 'admin',
-                    'redirect': '/auth/admin/dashboard/'
-                })
-            return redirect('admin_dashboard')
-    except User.DoesNotExist:
-        pass
+        # Log admin login activity
+        log_activity(
+            'login',
+            'system',
+            description=f'Admin user {user.username} logged in',
+            request=request,
+            performed_by_user=user
+        )
+        
+        if request.content_type == 'application/json':
+            return JsonResponse({
+                'success': True,
+                'message': 'Login successful',
+                'user_type': 'admin',
+                'redirect': '/auth/admin/dashboard/'
+            })
+        return redirect('admin_dashboard')
 
-    # Try Custom User Login
-    try:
-        custom_user = CustomUser.objects.get(login_email=email)
-        if check_password(password, custom_user.login_password):
-            
-            # Log custom user login activity
-            log_activity(
-                'login',
-                'system',
-                description=f'Custom user {custom_user.full_name} logged in',
-                request=request,
-                performed_by_custom=custom_user
-            )
-            
-            if request.content_type == 'application/json':
-                response = JsonResponse({
-                    'success': True,
-                    'message': 'Login successful',
-                    'user_type': 'user',
-                    'redirect': '/auth/user/dashboard/',
-                    'user_data': {
-                        'id': custom_user.id,
-                        'full_name': custom_user.full_name,
-                        'email': custom_user.login_email
-                    }
-                })
-            else:
-                response = redirect('user_dashboard')
-            
-            # Set simple cookie to identify custom user session
-            response.set_cookie("custom_user_id", custom_user.id, httponly=True, samesite='Lax')
-            response.set_cookie("user_type", 'user', httponly=True, samesite='Lax')
-            
-            return response
-    except CustomUser.DoesNotExist:
-        pass
+    # Custom User Login
+    if account_type == LoginIdentity.CUSTOM:
+        custom_user = account
+        
+        # Log custom user login activity
+        log_activity(
+            'login',
+            'system',
+            description=f'Custom user {custom_user.full_name} logged in',
+            request=request,
+            performed_by_custom=custom_user
+        )
+        
+        if request.content_type == 'application/json':
+            response = JsonResponse({
+                'success': True,
+                'message': 'Login successful',
+                'user_type': 'user',
+                'redirect': '/auth/user/dashboard/',
+                'user_data': {
+                    'id': custom_user.id,
+                    'full_name': custom_user.full_name,
+                    'email': custom_user.login_email
+                }
+            })
+        else:
+            response = redirect('user_dashboard')
+        
+        # Signed, expiring session token (verified without a DB lookup)
+        set_custom_session_cookie(response, custom_user)
+        
+        return response
 
     # Login Failed
     return JsonResponse({'error': 'Invalid email or password'}, status=400)
@@ -189,20 +168,16 @@ def logout_view(request):
         return response
 
     # Handle Custom User Logout
-    custom_user_id = request.COOKIES.get("custom_user_id")
-    if custom_user_id:
-        try:
-            custom_user = CustomUser.objects.get(id=custom_user_id)
-            # Log custom user logout activity
-            log_activity(
-                'logout',
-                'system',
-                description=f'Custom user {custom_user.full_name} logged out',
-                request=request,
-                performed_by_custom=custom_user
-            )
-        except CustomUser.DoesNotExist:
-            pass
+    custom_user = get_request_actor(request)[1]
+    if custom_user is not None:
+        # Log custom user logout activity
+        log_activity(
+            'logout',
+            'system',
+            description=f'Custom user {custom_user.full_name} logged out',
+            request=request,
+            performed_by_custom=custom_user
+        )
     
     if request.content_type == 'application/json':
         response = JsonResponse({
@@ -213,11 +188,80 @@ def logout_view(request):
     else:
         response = redirect('login')
 
-    response.delete_cookie("custom_user_id")
-    response.delete_cookie("user_type")
+    delete_custom_session_cookie(response)
     
     return response
 
+# ============================================================
+# JWT TOKEN API (external / mobile clients)
+# ============================================================
+@api_view(['POST'])
+@authentication_classes([])
+@permission_classes([AllowAny])
+def token_obtain_view(request):
+    """Issue a refresh/access token pair for an admin or a custom user (same credentials as login)"""
+    retry_after = auth_throttle.check('token_obtain', ip=get_client_ip(request), email=str(request.data.get('email', '')))
+    if retry_after:
+        return throttled_response(retry_after, Response)
+    
+    serializer = TokenObtainSerializer(data=request.data)
+    try:
+        valid = serializer.is_valid()
+    except CredentialCheckBusy as e:
+        return Response({'error': str(e)}, status=503)
+    if not valid:
+        return Response({'error': 'Invalid email or password'}, status=400)
+    
+    data = dict(serializer.validated_data)
+    account = data.pop('account')
+    if data['user_type'] == 'admin':
+        description = f'Admin user {account.username} obtained an API token'
+        performed_by_user, performed_by_custom = account, None
+    else:
+        description = f'Custom user {account.full_name} obtained an API token'
+        performed_by_user, performed_by_custom = None, account
+    
+    log_activity(
+        'login',
+        'system',
+        description=description,
+        request=request,
+        performed_by_user=performed_by_user,
+        performed_by_custom=performed_by_custom
+    )
+    return Response(data)
+
+
+@api_view(['POST'])
+@authentication_classes([])
+@permission_classes([AllowAny])
+def token_logout_view(request):
+    """Blacklist a refresh token (admin or custom user)"""
+    serializer = AdminLogoutSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    try:
+        serializer.save()
+    except serializers.ValidationError as e:
+        return Response({'error': e.detail[0] if isinstance(e.detail, list) else str(e.detail)}, status=400)
+    return Response({'success': True, 'message': 'Logged out successfully'})
+
+class ThrottledTokenRefreshView(TokenRefreshView):
+    """simplejwt's refresh view behind the per-IP auth throttle"""
+
+    def post(self, request, *args, **kwargs):
+        retry_after = auth_throttle.check('token_refresh', ip=get_client_ip(request))
+        if retry_after:
+            return throttled_response(retry_after, Response)
+        return super().post(request, *args, **kwargs)
+
+
+@login_required(login_url='/unauthorized/')
+def auth_throttle_metrics(request):
+    """Allowed/rejected auth attempts per endpoint (staff only)"""
+    if not (request.user.is_superuser or request.user.is_staff):
+        return JsonResponse({'error': 'Unauthorized'}, status=403)
+    return JsonResponse(auth_throttle.get_metrics(), status=200)
+
 # ============================================================
 # ADMIN DASHBOARD VIEW
 # ============================================================
@@ -229,27 +273,13 @@ def admin_dashboard(request):
     if not (user.is_superuser or user.is_staff):
         return redirect('login')
     
-    # Get statistics for admin (all bookings and users)
-    total_bookings = Booking.objects.count()
-    total_users = CustomUser.objects.count()
-    total_advance = Booking.objects.aggregate(
-        total=Sum('advance_given')
-    )['total'] or 0
-    
-    # Get recent bookings for activity log
-    recent_bookings = Booking.objects.select_related(
-        'created_by_user', 'created_by_custom'
-    ).order_by('-created_at')[:5]
-    
+    # KPIs, recent and upcoming bookings come from one cached bundle
     context = {
         "email": user.email,
         "username": user.username,
         "is_superuser": user.is_superuser,
         "is_staff": user.is_staff,
-        "total_bookings": total_bookings,
-        "total_users": total_users,
-        "total_advance": total_advance,
-        "recent_bookings": recent_bookings,
+        **get_admin_dashboard(),
     }
     return render(request, "admin/dashboards.html", context)
 
@@ -259,37 +289,16 @@ def admin_dashboard(request):
 
 def custom_user_dashboard(request):
     """Renders dashboard page for authenticated custom users"""
-    custom_user_id = request.COOKIES.get("custom_user_id")
-    user_type = request.COOKIES.get("user_type")
+    principal = get_request_actor(request)[1]
     
-    if not custom_user_id or user_type != 'user':
+    if principal is None or principal.role != 'user':
         return redirect("login")
     
-    try:
-        custom_user = CustomUser.objects.get(id=custom_user_id)
-        
-        # Get statistics for this specific user (only their bookings)
-        user_bookings = Booking.objects.filter(created_by_custom=custom_user)
-        total_bookings = user_bookings.count()
-        total_advance = user_bookings.aggregate(
-            total=Sum('advance_given')
-        )['total'] or 0
-        
-        # Get recent bookings created by this user
-        recent_bookings = user_bookings.order_by('-created_at')[:5]
-        
-        context = {
-            "full_name": custom_user.full_name,
-            "email": custom_user.login_email,
-            "created_at": custom_user.created_at,
-            "updated_at": custom_user.updated_at,
-            "total_bookings": total_bookings,
-            "total_advance": total_advance,
-            "recent_bookings": recent_bookings,
-        }
-        return render(request, "user/user_dashboard.html", context)
-    except CustomUser.DoesNotExist:
+    # Profile, KPIs, recent and upcoming bookings come from one cached bundle
+    context = get_user_dashboard(principal.id)
+    if context is None:
         return redirect("login")
+    return render(request, "user/user_dashboard.html", context)
 
 # ============================================================
 # CUSTOM USER REGISTRATION VIEW
@@ -352,7 +361,7 @@ def custom_user_registration(request):
         entity_name=custom_user.full_name,
         description=f'New custom user registered: {custom_user.full_name} ({custom_user.login_email})',
         request=request,
-        performed_by_user=request.user if request.user.is_authenticated else None
+        performed_by_user=get_request_actor(request)[0]
     )
     
     if request.content_type == 'application/json':
@@ -382,18 +391,28 @@ def custom_user_api(request, user_id=None):
                 'created_at': user.created_at.isoformat() if user.created_at else None
             })
         else:
-            # List all users
-            users = CustomUser.objects.all().order_by('-created_at')
-            users_data = [{
-                'id': user.id,
-                'full_name': user.full_name,
-                'login_email': user.login_email,
-                'created_at': user.created_at.isoformat() if user.created_at else None
-            } for user in users]
+            # List users one page at a time, with booking totals and last activity
+            try:
+                page = int(request.GET.get('page', 1))
+                per_page = min(int(request.GET.get('per_page', 20)), 100)
+            except ValueError:
+                return JsonResponse({'error': 'Invalid page or per_page'}, status=400)
+            
+            users = get_user_directory_queryset(search=request.GET.get('search', '').strip())
+            paginator = Paginator(users, per_page)
+            page_obj = paginator.get_page(page)
             
             return JsonResponse({
-                'users': users_data,
-                'count': len(users_data)
+                'users': [serialize_directory_user(user) for user in page_obj],
+                'count': paginator.count,
+                'pagination': {
+                    'current_page': page_obj.number,
+                    'total_pages': paginator.num_pages,
+                    'total_count': paginator.count,
+                    'has_next': page_obj.has_next(),
+                    'has_previous': page_obj.has_previous(),
+                    'per_page': per_page
+                }
             })
     
     elif request.method == 'PUT':
@@ -423,6 +442,7 @@ def custom_user_api(request, user_id=None):
         user.full_name = full_name
         user.login_email = login_email
         user.save()
+        invalidate_custom_user(user.id)
         
         # Log custom user update activity
         log_activity(
@@ -432,7 +452,7 @@ def custom_user_api(request, user_id=None):
             entity_name=user.full_name,
             description=f'Updated custom user: {user.full_name} ({user.login_email})',
             request=request,
-            performed_by_user=request.user if request.user.is_authenticated else None
+            performed_by_user=get_request_actor(request)[0]
         )
         
         return JsonResponse({
@@ -459,14 +479,70 @@ def custom_user_api(request, user_id=None):
             entity_name=user_name,
             description=f'Deleted custom user: {user_name} ({user_email})',
             request=request,
-            performed_by_user=request.user if request.user.is_authenticated else None
+            performed_by_user=get_request_actor(request)[0]
         )
         
         user.delete()
+        invalidate_custom_user(user_id)
         
         return JsonResponse({
             'success': True,
             'message': f'User "{user_name}" deleted successfully'
         })
     
-    return JsonResponse({'error': 'Method not allowed'}, status=405)
\ No newline at end of file
+    return JsonResponse({'error': 'Method not allowed'}, status=405)
+
+# ============================================================
+# CUSTOM USER NAME MAP (dropdowns)
+# ============================================================
+@login_required_dual(login_url='/unauthorized/')
+def custom_user_names_api(request):
+    """Compact cached id -> name list of custom users"""
+    return JsonResponse({'users': get_user_name_map()})
+
+
+# ============================================================
+# BULK CUSTOM USER IMPORT
+# ============================================================
+@login_required(login_url='/unauthorized/')
+def custom_user_import_api(request):
+    """
+    Bulk-create custom users from an uploaded CSV/JSON file ('file') or a JSON body
+    ({"users": [...]}). ?skip_invalid=1 imports the valid rows when some fail,
+    ?dry_run=1 only validates.
+    """
+    if request.method != 'POST':
+        return JsonResponse({'error': 'Method not allowed'}, status=405)
+    
+    if not (request.user.is_superuser or request.user.is_staff):
+        return JsonResponse({'error': 'Unauthorized'}, status=403)
+    
+    try:
+        upload = request.FILES.get('file')
+        if upload is not None:
+            import_format = request.POST.get('format') or ('json' if upload.name.lower().endswith('.json') else 'csv')
+            rows = parse_import_file(upload.read(), import_format)
+        elif request.content_type == 'application/json':
+            rows = parse_import_file(request.body, 'json')
+        else:
+            # The body of a form request was already consumed by request.FILES
+            return JsonResponse({'error': "Upload a 'file' or send a JSON body"}, status=400)
+    except ImportFormatError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    
+    try:
+        result = import_custom_users(
+            rows,
+            created_by=request.user,
+            skip_invalid=request.GET.get('skip_invalid') == '1',
+            dry_run=request.GET.get('dry_run') == '1',
+            request=request,
+        )
+    except IntegrityError:
+        # An email was registered between validation and the insert
+        return JsonResponse({'error': 'Some emails were registered during the import; nothing was created, please retry'}, status=409)
+    except BrokenProcessPool:
+        return JsonResponse({'error': 'Password hashing workers are unavailable, please retry'}, status=503)
+    
+    status = 201 if result['created'] else (400 if result['errors'] else 200)
+    return JsonResponse(result, status=status)
@@ -0,0 +1,263 @@
+from django.core.cache import cache
+from django.core.cache.backends.base import BaseCache, DEFAULT_TIMEOUT
+from threading import local
+from .metrics import record_cache_lookups
+import os
+import pickle
+import sqlite3
+import time
+
+
+# ============================================================
+# SHARED SQLITE CACHE BACKEND
+# ============================================================
+# Keys of the cross-process version counters (see bump_cache_version)
+VERSION_KEY_PREFIX = 'version:'
+
+
+class SQLiteCache(BaseCache):
+    """
+    Cache stored in one SQLite file (WAL mode), so every worker process on the
+    host sees the same entries and invalidations, without a cache service.
+
+    - Integers are stored as SQLite integers, so incr()/decr() are a single
+      atomic UPDATE ... RETURNING across processes (usable as version counters).
+    - Other values are pickled.
+    - Eviction is LRU: when MAX_ENTRIES is exceeded, expired rows go first, then
+      the least recently read 1/CULL_FREQUENCY of the rows. Reads refresh the
+      access time at most once per ACCESS_RESOLUTION seconds per key, so a hot
+      key does not turn every read into a write. Version counters
+      (bump_cache_version) are never culled: losing one would reset it and hide
+      an invalidation from processes that saw the old value.
+
+    OPTIONS: MAX_ENTRIES, CULL_FREQUENCY (Django's), plus ACCESS_RESOLUTION and
+    BUSY_TIMEOUT (seconds to wait for another process's write lock).
+    """
+
+    pickle_protocol = pickle.HIGHEST_PROTOCOL
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._path = str(location)
+        self._access_resolution = float(options.get('ACCESS_RESOLUTION', 10))
+        self._busy_timeout = float(options.get('BUSY_TIMEOUT', 5))
+        self._local = local()
+        self._name = os.path.splitext(os.path.basename(self._path))[0]
+        self._uncullable = self._like_prefix(self.make_key(VERSION_KEY_PREFIX))
+
+    @staticmethod
+    def _like_prefix(prefix):
+        """LIKE pattern (with ESCAPE '\\') matching keys that start with prefix"""
+        return prefix.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+
+    # ------------------------------------------------------------
+    # Connections (one per thread, reopened after fork)
+    # ------------------------------------------------------------
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None and self._local.pid == os.getpid():
+            return connection
+
+        directory = os.path.dirname(self._path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        connection = sqlite3.connect(self._path, timeout=self._busy_timeout, isolation_level=None, check_same_thread=False)
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.execute('PRAGMA synchronous=NORMAL')
+        connection.execute(
+            'CREATE TABLE IF NOT EXISTS cache ('
+            'key TEXT PRIMARY KEY, value BLOB, expires REAL, accessed REAL NOT NULL'
+            ') WITHOUT ROWID'
+        )
+        connection.execute('CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed)')
+        self._local.connection = connection
+        self._local.pid = os.getpid()
+        return connection
+
+    def _encode(self, value):
+        # bool is an int subclass but must round-trip as bool
+        if isinstance(value, int) and not isinstance(value, bool) and -2 ** 63 <= value < 2 ** 63:
+            return value
+        return pickle.dumps(value, self.pickle_protocol)
+
+    def _decode(self, value):
+        if isinstance(value, int):
+            return value
+        return pickle.loads(value)
+
+    def _alive(self, expires, now):
+        return expires is None or expires > now
+
+    # ------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------
+    def get(self, key, default=None, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        return self._get_many([key]).get(key, default)
+
+    def get_many(self, keys, version=None):
+        key_map = {self.make_and_validate_key(key, version=version): key for key in keys}
+        return {key_map[key]: value for key, value in self._get_many(list(key_map)).items()}
+
+    def _get_many(self, keys):
+        if not keys:
+            return {}
+        now = time.time()
+        connection = self._connection()
+        placeholders = ','.join('?' * len(keys))
+        rows = connection.execute(
+            f'SELECT key, value, expires, accessed FROM cache WHERE key IN ({placeholders})', keys
+        ).fetchall()
+
+        found = {}
+        stale = []
+        for key, value, expires, accessed in rows:
+            if not self._alive(expires, now):
+                continue
+            found[key] = self._decode(value)
+            if accessed < now - self._access_resolution:
+                stale.append(key)
+
+        if stale:
+            placeholders = ','.join('?' * len(stale))
+            # The access time is only an eviction hint: skip it at once instead of
+            # waiting BUSY_TIMEOUT when another process holds the write lock
+            connection.execute('PRAGMA busy_timeout = 0')
+            try:
+                connection.execute(f'UPDATE cache SET accessed = ? WHERE key IN ({placeholders})', [now, *stale])
+            except sqlite3.OperationalError:
+                pass
+            finally:
+                connection.execute(f'PRAGMA busy_timeout = {int(self._busy_timeout * 1000)}')
+        record_cache_lookups(self._name, len(found), len(keys) - len(found))
+        return found
+
+    def has_key(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        row = self._connection().execute('SELECT expires FROM cache WHERE key = ?', [key]).fetchone()
+        return row is not None and self._alive(row[0], time.time())
+
+    # ------------------------------------------------------------
+    # Writes
+    # ------------------------------------------------------------
+    def _write(self, rows, only_if_missing=False):
+        """Upsert [(key, value, expires)] in one transaction and cull; returns the number written"""
+        now = time.time()
+        connection = self._connection()
+        written = 0
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            for key, value, expires in rows:
+                if only_if_missing:
+                    # add(): replace only a missing or expired entry
+                    cursor = connection.execute(
+                        'INSERT INTO cache (key, value, expires, accessed) VALUES (?, ?, ?, ?) '
+                        'ON CONFLICT (key) DO UPDATE SET value = excluded.value, expires = excluded.expires, '
+                        'accessed = excluded.accessed WHERE cache.expires IS NOT NULL AND cache.expires <= ?',
+                        [key, self._encode(value), expires, now, now]
+                    )
+                else:
+                    cursor = connection.execute(
+                        'INSERT OR REPLACE INTO cache (key, value, expires, accessed) VALUES (?, ?, ?, ?)',
+                        [key, self._encode(value), expires, now]
+                    )
+                written += cursor.rowcount
+            self._cull(connection, now)
+            connection.execute('COMMIT')
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        return written
+
+    def _cull(self, connection, now):
+        count = connection.execute('SELECT COUNT(*) FROM cache').fetchone()[0]
+        if count <= self._max_entries:
+            return
+        connection.execute('DELETE FROM cache WHERE expires IS NOT NULL AND expires <= ?', [now])
+        count = connection.execute('SELECT COUNT(*) FROM cache').fetchone()[0]
+        if count <= self._max_entries:
+            return
+        if self._cull_frequency == 0:
+            connection.execute("DELETE FROM cache WHERE key NOT LIKE ? ESCAPE '\\'", [self._uncullable])
+            return
+        connection.execute(
+            "DELETE FROM cache WHERE key IN (SELECT key FROM cache WHERE key NOT LIKE ? ESCAPE '\\' "
+            "ORDER BY accessed LIMIT ?)",
+            [self._uncullable, max(1, count // self._cull_frequency)]
+        )
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        self._write([(key, value, self.get_backend_timeout(timeout))])
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        expires = self.get_backend_timeout(timeout)
+        self._write([
+            (self.make_and_validate_key(key, version=version), value, expires) for key, value in data.items()
+        ])
+        return []
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        return self._write([(key, value, self.get_backend_timeout(timeout))], only_if_missing=True) > 0
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        cursor = self._connection().execute(
+            'UPDATE cache SET expires = ? WHERE key = ? AND (expires IS NULL OR expires > ?)',
+            [self.get_backend_timeout(timeout), key, time.time()]
+        )
+        return cursor.rowcount > 0
+
+    def incr(self, key, delta=1, version=None):
+        """Atomic across processes (a single UPDATE); raises ValueError for a missing or non-integer key"""
+        key = self.make_and_validate_key(key, version=version)
+        row = self._connection().execute(
+            "UPDATE cache SET value = value + ? WHERE key = ? AND typeof(value) = 'integer' "
+            "AND (expires IS NULL OR expires > ?) RETURNING value",
+            [delta, key, time.time()]
+        ).fetchone()
+        if row is None:
+            raise ValueError("Key '%s' not found" % key)
+        return row[0]
+
+    def delete(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        return self._connection().execute('DELETE FROM cache WHERE key = ?', [key]).rowcount > 0
+
+    def delete_many(self, keys, version=None):
+        keys = [self.make_and_validate_key(key, version=version) for key in keys]
+        if keys:
+            placeholders = ','.join('?' * len(keys))
+            self._connection().execute(f'DELETE FROM cache WHERE key IN ({placeholders})', keys)
+
+    def clear(self):
+        self._connection().execute('DELETE FROM cache')
+
+    def close(self, **kwargs):
+        # Connections are reused across requests; Django calls close() after each one
+        pass
+
+
+# ============================================================
+# CROSS-PROCESS VERSION COUNTERS
+# ============================================================
+def get_cache_version(name):
+    """Current value of a version counter in the default cache (0 if never bumped)"""
+    return cache.get(f'{VERSION_KEY_PREFIX}{name}', 0)
+
+
+def bump_cache_version(name):
+    """
+    Atomically increment a version counter and return the new value.
+    Processes holding local copies compare versions to know they are stale.
+    """
+    key = f'{VERSION_KEY_PREFIX}{name}'
+    cache.add(key, 0, timeout=None)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # Evicted between add() and incr(); any value different from before works
+        cache.set(key, 1, timeout=None)
+        return 1
@@ -0,0 +1,351 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.http import HttpResponse, JsonResponse
+from threading import Event, Lock, Thread, local
+import atexit
+import hmac
+import json
+import logging
+import os
+import sqlite3
+import time
+
+
+logger = logging.getLogger('dus_reception.metrics')
+
+
+# ============================================================
+# METRICS SETTINGS
+# ============================================================
+DEFAULT_METRICS_SETTINGS = {
+    'ENABLED': True,
+    'PATH': None,                  # SQLite file shared by the workers (default: BASE_DIR/cache/metrics.sqlite3)
+    'FLUSH_INTERVAL': 1.0,         # Seconds between writes of a worker's pending samples to the store
+    'GAUGE_STALE_AFTER': 30,       # Gauges of workers that stopped reporting are ignored after N seconds
+    'LATENCY_BUCKETS': (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+    'DB_QUERY_BUCKETS': (1, 2, 5, 10, 20, 50, 100, 200),
+    'TOKEN': None,                 # Bearer token scrapers must send (staff sessions are also accepted)
+    'ALLOWED_IPS': (),             # Opt-in: REMOTE_ADDRs allowed without credentials (not behind a reverse proxy,
+                                   # where every request arrives from the proxy's address)
+}
+
+
+def get_metrics_settings():
+    return {**DEFAULT_METRICS_SETTINGS, **getattr(settings, 'METRICS', {})}
+
+
+# name: (type, help)
+METRIC_FAMILIES = {
+    'dus_http_requests_total': ('counter', 'HTTP requests by URL name, method and status code'),
+    'dus_http_request_duration_seconds': ('histogram', 'HTTP request latency by URL name and method'),
+    'dus_http_request_db_queries': ('histogram', 'Database queries per HTTP request by URL name'),
+    'dus_cache_requests_total': ('counter', 'Cache lookups by cache and result (hit or miss)'),
+    'dus_activity_log_queue_depth': ('gauge', 'Activity log events waiting to be written, summed over live workers'),
+}
+
+
+# ============================================================
+# MULTIPROCESS STORE
+# ============================================================
+class MetricsStore:
+    """
+    Metrics of all worker processes in one SQLite file (WAL mode) on local disk.
+    Each process buffers increments in memory and a background thread adds
+    them to the file every FLUSH_INTERVAL, so a request never waits for a
+    write. Counters and histogram samples are summed across processes; gauges
+    are stored per process and summed over the processes still reporting.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._flush_lock = Lock()
+        self._local = local()
+        self._pending = {}
+        self._gauges = {}
+        self._gauge_written = {}
+        self._pid = None
+        self._thread = None
+        self._stop = Event()
+
+    # --------------------------------------------------------
+    # Lifecycle
+    # --------------------------------------------------------
+    def _ensure_started(self):
+        # Restart after fork so every worker process gets its own flusher
+        if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+                return
+            if self._pid != os.getpid():
+                # Increments inherited from the parent are the parent's to write
+                self._pending = {}
+                self._gauge_written = {}
+            self._pid = os.getpid()
+            self._stop.clear()
+            self._thread = Thread(target=self._run, name='metrics-flusher', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(get_metrics_settings()['FLUSH_INTERVAL']):
+            try:
+                self.flush()
+            except sqlite3.Error:
+                logger.exception('Metrics flush failed')
+
+    def shutdown(self):
+        self._stop.set()
+        if self._pid == os.getpid():
+            try:
+                self.flush()
+            except sqlite3.Error:
+                pass
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None and self._local.pid == os.getpid():
+            return connection
+
+        path = get_metrics_settings()['PATH'] or os.path.join(settings.BASE_DIR, 'cache', 'metrics.sqlite3')
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        connection = sqlite3.connect(path, timeout=5, isolation_level=None, check_same_thread=False)
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.execute('PRAGMA synchronous=NORMAL')
+        connection.execute(
+            'CREATE TABLE IF NOT EXISTS samples ('
+            'name TEXT NOT NULL, labels TEXT NOT NULL, value REAL NOT NULL, PRIMARY KEY (name, labels)'
+            ') WITHOUT ROWID'
+        )
+        connection.execute(
+            'CREATE TABLE IF NOT EXISTS gauges ('
+            'name TEXT NOT NULL, labels TEXT NOT NULL, pid INTEGER NOT NULL, value REAL NOT NULL, '
+            'updated REAL NOT NULL, PRIMARY KEY (name, labels, pid)'
+            ') WITHOUT ROWID'
+        )
+        self._local.connection = connection
+        self._local.pid = os.getpid()
+        return connection
+
+    # --------------------------------------------------------
+    # Recording (in memory)
+    # --------------------------------------------------------
+    def inc(self, name, labels, amount=1):
+        self._ensure_started()
+        key = (name, json.dumps(labels, sort_keys=True))
+        with self._lock:
+            self._pending[key] = self._pending.get(key, 0) + amount
+
+    def observe(self, name, labels, value, buckets):
+        """Histogram observation: cumulative buckets, _sum and _count"""
+        self._ensure_started()
+        # Every bucket is written (0 when above it) so the series are complete from the first observation
+        rows = [(f'{name}_bucket', {**labels, 'le': format_bucket(bound)}, int(value <= bound)) for bound in buckets]
+        rows.append((f'{name}_bucket', {**labels, 'le': '+Inf'}, 1))
+        rows.append((f'{name}_count', labels, 1))
+        rows.append((f'{name}_sum', labels, value))
+        with self._lock:
+            for sample_name, sample_labels, amount in rows:
+                key = (sample_name, json.dumps(sample_labels, sort_keys=True))
+                self._pending[key] = self._pending.get(key, 0) + amount
+
+    def register_gauge(self, name, labels, func):
+        """Gauge read from func() in every worker at each flush"""
+        with self._lock:
+            self._gauges[(name, json.dumps(labels, sort_keys=True))] = func
+
+    # --------------------------------------------------------
+    # Store (on disk)
+    # --------------------------------------------------------
+    def flush(self):
+        with self._flush_lock:
+            self._flush()
+
+    def _flush(self):
+        config = get_metrics_settings()
+        now = time.time()
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            gauges = list(self._gauges.items())
+
+        gauge_rows = []
+        for key, func in gauges:
+            try:
+                value = float(func())
+            except Exception:
+                continue
+            # Rewrite unchanged values only often enough to stay live
+            last = self._gauge_written.get(key)
+            if last is None or last[0] != value or now - last[1] > config['GAUGE_STALE_AFTER'] / 3:
+                gauge_rows.append((*key, os.getpid(), value, now))
+                self._gauge_written[key] = (value, now)
+
+        if not pending and not gauge_rows:
+            return
+
+        connection = self._connection()
+        try:
+            connection.execute('BEGIN IMMEDIATE')
+            connection.executemany(
+                'INSERT INTO samples (name, labels, value) VALUES (?, ?, ?) '
+                'ON CONFLICT (name, labels) DO UPDATE SET value = value + excluded.value',
+                [(name, labels, value) for (name, labels), value in pending.items()]
+            )
+            connection.executemany(
+                'INSERT OR REPLACE INTO gauges (name, labels, pid, value, updated) VALUES (?, ?, ?, ?, ?)',
+                gauge_rows
+            )
+            connection.execute('DELETE FROM gauges WHERE updated < ?', [now - config['GAUGE_STALE_AFTER'] * 10])
+            connection.execute('COMMIT')
+        except BaseException:
+            if connection.in_transaction:
+                connection.execute('ROLLBACK')
+            # Keep the increments for the next flush
+            with self._lock:
+                for key, value in pending.items():
+                    self._pending[key] = self._pending.get(key, 0) + value
+            for key, *_ in gauge_rows:
+                self._gauge_written.pop(key, None)
+            raise
+
+    def collect(self):
+        """{name: [(labels, value)]} over all workers, after writing this worker's pending samples"""
+        self.flush()
+        connection = self._connection()
+        collected = {}
+        for name, labels, value in connection.execute('SELECT name, labels, value FROM samples'):
+            collected.setdefault(name, []).append((json.loads(labels), value))
+        live_since = time.time() - get_metrics_settings()['GAUGE_STALE_AFTER']
+        for name, labels, value in connection.execute(
+            'SELECT name, labels, SUM(value) FROM gauges WHERE updated >= ? GROUP BY name, labels', [live_since]
+        ):
+            collected.setdefault(name, []).append((json.loads(labels), value))
+        return collected
+
+
+metrics_store = MetricsStore()
+atexit.register(metrics_store.shutdown)
+
+
+# ============================================================
+# RECORDING HELPERS
+# ============================================================
+def format_bucket(bound):
+    # Same form as the official clients: 1 -> "1.0", 0.005 -> "0.005"
+    return str(float(bound))
+
+
+def record_request(route, method, status, duration, db_queries=None):
+    config = get_metrics_settings()
+    if not config['ENABLED']:
+        return
+    metrics_store.inc('dus_http_requests_total', {'route': route, 'method': method, 'status': str(status)})
+    metrics_store.observe(
+        'dus_http_request_duration_seconds', {'route': route, 'method': method}, duration, config['LATENCY_BUCKETS']
+    )
+    if db_queries is not None:
+        metrics_store.observe('dus_http_request_db_queries', {'route': route}, db_queries, config['DB_QUERY_BUCKETS'])
+
+
+def record_cache_lookups(cache_name, hits, misses):
+    if not get_metrics_settings()['ENABLED']:
+        return
+    if hits:
+        metrics_store.inc('dus_cache_requests_total', {'cache': cache_name, 'result': 'hit'}, hits)
+    if misses:
+        metrics_store.inc('dus_cache_requests_total', {'cache': cache_name, 'result': 'miss'}, misses)
+
+
+# ============================================================
+# PROMETHEUS TEXT FORMAT
+# ============================================================
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _sample_sort_key(sample):
+    labels, _ = sample
+    le = labels.get('le')
+    bound = float('inf') if le == '+Inf' else float(le) if le is not None else 0
+    return sorted((key, value) for key, value in labels.items() if key != 'le'), bound
+
+
+def render_metrics(collected):
+    """Prometheus text exposition format (version 0.0.4)"""
+    lines = []
+    for family, (metric_type, help_text) in METRIC_FAMILIES.items():
+        names = [f'{family}_bucket', f'{family}_sum', f'{family}_count'] if metric_type == 'histogram' else [family]
+        if not any(name in collected for name in names):
+            continue
+        lines.append(f'# HELP {family} {help_text}')
+        lines.append(f'# TYPE {family} {metric_type}')
+        for name in names:
+            for labels, value in sorted(collected.get(name, []), key=_sample_sort_key):
+                label_text = ','.join(f'{key}="{_escape(label)}"' for key, label in sorted(labels.items(), key=lambda item: item[0] == 'le'))
+                value_text = str(int(value)) if float(value).is_integer() else repr(value)
+                lines.append(f'{name}{{{label_text}}} {value_text}' if label_text else f'{name} {value_text}')
+    return '\n'.join(lines) + '\n'
+
+
+# ============================================================
+# MIDDLEWARE
+# ============================================================
+class MetricsMiddleware:
+    """
+    Records count, latency and DB queries of every request, labelled with the
+    URL name from authapp/routes.py and managementapp/routes.py ('unmatched'
+    when nothing resolved). DB query counts come from RequestTimingMiddleware,
+    so put this right after it. Sync and async capable.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        started = time.perf_counter()
+        response = self.get_response(request)
+        self._record(request, response, time.perf_counter() - started)
+        return response
+
+    async def __acall__(self, request):
+        started = time.perf_counter()
+        response = await self.get_response(request)
+        self._record(request, response, time.perf_counter() - started)
+        return response
+
+    def _record(self, request, response, duration):
+        from .request_timing import get_current_timer
+
+        resolver_match = getattr(request, 'resolver_match', None)
+        route = (resolver_match.url_name if resolver_match else None) or 'unmatched'
+        timer = get_current_timer()
+        record_request(route, request.method, response.status_code, duration, timer.query_count if timer else None)
+
+
+# ============================================================
+# METRICS ENDPOINT
+# ============================================================
+def is_metrics_request_allowed(request, config):
+    if request.META.get('REMOTE_ADDR') in config['ALLOWED_IPS']:
+        return True
+    if config['TOKEN']:
+        authorization = request.META.get('HTTP_AUTHORIZATION', '')
+        if authorization.startswith('Bearer ') and hmac.compare_digest(authorization[7:], config['TOKEN']):
+            return True
+    user = getattr(request, 'user', None)
+    return bool(user and user.is_authenticated and (user.is_superuser or user.is_staff))
+
+
+def metrics_view(request):
+    """Prometheus scrape endpoint, aggregated over all worker processes on this host"""
+    config = get_metrics_settings()
+    if not is_metrics_request_allowed(request, config):
+        return JsonResponse({'error': 'Unauthorized'}, status=403)
+    return HttpResponse(render_metrics(metrics_store.collect()), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,259 @@
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, JsonResponse
+from django.urls import reverse
+from authapp.principal import get_request_actor, is_staff_actor
+from threading import Event, Lock, Thread, get_ident
+import cProfile
+import io
+import os
+import pstats
+import random
+import re
+import sys
+import time
+import uuid
+
+
+# ============================================================
+# PROFILING SETTINGS
+# ============================================================
+DEFAULT_PROFILING_SETTINGS = {
+    'ENABLED': True,               # Staff may profile a request with the header or query flag
+    'HEADER': 'X-Profile',         # X-Profile: cprofile | sample (add ",text" to get the pstats report back)
+    'QUERY_PARAM': '_profile',     # ?_profile=cprofile | sample | text
+    'SAMPLE_RATE': 0.0,            # Fraction of authenticated requests profiled in the background (stored only)
+    'SAMPLE_MODE': 'sample',       # Profiler used for background collection
+    'SAMPLE_INTERVAL': 0.005,      # Seconds between stack samples
+    'DIR': None,                   # Output directory, not publicly served (default: BASE_DIR/profiles)
+    'MAX_FILES': 200,              # Oldest profile files are deleted beyond this
+    'TEXT_LINES': 60,              # Functions listed in the returned pstats report
+}
+
+PROFILE_MODES = ('cprofile', 'sample')
+
+PROFILE_FILENAME = re.compile(r'^[\w-]+\.(pstats|collapsed)$')
+
+
+def get_profiling_settings():
+    return {**DEFAULT_PROFILING_SETTINGS, **getattr(settings, 'PROFILING', {})}
+
+
+def get_profile_dir(config):
+    return config['DIR'] or os.path.join(settings.BASE_DIR, 'profiles')
+
+
+class ProfilePlan:
+    """How one request is profiled: mode, whether the report is returned, and whether it was sampled"""
+
+    def __init__(self, mode, text=False, background=False):
+        self.mode = mode
+        self.text = text
+        self.background = background
+
+
+def get_profile_plan(request, user):
+    """
+    ProfilePlan for this request, or None (the common case, a settings
+    lookup and a random draw). Called by login_required_dual once access
+    is granted; `user` is the admin actor, if any.
+    """
+    config = get_profiling_settings()
+    if not config['ENABLED']:
+        return None
+    if config['SAMPLE_RATE'] and random.random() < config['SAMPLE_RATE']:
+        return ProfilePlan(config['SAMPLE_MODE'], background=True)
+
+    if not is_staff_actor(user):
+        return None
+    flag = request.headers.get(config['HEADER']) or request.GET.get(config['QUERY_PARAM'])
+    if not flag:
+        return None
+
+    options = {option.strip().lower() for option in flag.split(',')}
+    mode = next((mode for mode in PROFILE_MODES if mode in options), 'cprofile')
+    return ProfilePlan(mode, text='text' in options)
+
+
+# ============================================================
+# STACK SAMPLER
+# ============================================================
+def get_frame_name(frame):
+    code = frame.f_code
+    name = getattr(code, 'co_qualname', code.co_name)
+    return f'{os.path.basename(code.co_filename)}:{name}:{code.co_firstlineno}'.replace(';', ',')
+
+
+class StackSampler(Thread):
+    """
+    Samples the stack of one thread every `interval` seconds and counts
+    identical stacks, rooted at `root_frame` (collapsed stack format for
+    flamegraph.pl / speedscope). Under ASGI the sampled thread is the event
+    loop: samples taken while the view is suspended count as '(awaiting)'.
+    """
+
+    def __init__(self, thread_id, root_frame, interval):
+        super().__init__(name='profile-sampler', daemon=True)
+        self.thread_id = thread_id
+        self.root_frame = root_frame
+        self.interval = interval
+        self.stacks = {}
+        self._finished = Event()
+
+    def run(self):
+        while not self._finished.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            names = []
+            while frame is not None and frame is not self.root_frame:
+                names.append(get_frame_name(frame))
+                frame = frame.f_back
+            stack = ';'.join(reversed(names)) if frame is not None else '(awaiting)'
+            self.stacks[stack] = self.stacks.get(stack, 0) + 1
+
+    def stop(self):
+        self._finished.set()
+        self.join()
+
+    def get_collapsed(self):
+        return ''.join(f'{stack} {count}\n' for stack, count in sorted(self.stacks.items()))
+
+
+# ============================================================
+# PROFILE SESSION
+# ============================================================
+# cProfile (sys.monitoring on Python 3.12+) allows one active profiler per
+# process, so concurrent cprofile requests fall back to the sampler
+_cprofile_lock = Lock()
+
+
+class ProfileSession:
+    def __init__(self, plan, config):
+        self.plan = plan
+        self.config = config
+        self.profile = None
+        self.sampler = None
+        self.started = None
+        self.duration = None
+
+    def start(self, root_frame):
+        if self.plan.mode == 'cprofile' and _cprofile_lock.acquire(blocking=False):
+            self.profile = cProfile.Profile()
+        self.sampler = StackSampler(get_ident(), root_frame, self.config['SAMPLE_INTERVAL'])
+        self.sampler.start()
+        self.started = time.perf_counter()
+        if self.profile is not None:
+            self.profile.enable()
+
+    def stop(self):
+        if self.profile is not None:
+            self.profile.disable()
+            _cprofile_lock.release()
+        self.duration = time.perf_counter() - self.started
+        self.sampler.stop()
+
+    def save(self, request):
+        """Write <name>.pstats (cprofile mode) and <name>.collapsed to the profile dir; returns their staff-only URLs"""
+        directory = get_profile_dir(self.config)
+        os.makedirs(directory, exist_ok=True)
+        resolver_match = getattr(request, 'resolver_match', None)
+        route = (resolver_match.url_name if resolver_match else None) or 'request'
+        name = f'{time.strftime("%Y%m%d-%H%M%S")}-{route}-{uuid.uuid4().hex[:12]}'
+
+        files = []
+        if self.profile is not None:
+            self.profile.dump_stats(os.path.join(directory, f'{name}.pstats'))
+            files.append(f'{name}.pstats')
+        with open(os.path.join(directory, f'{name}.collapsed'), 'w') as collapsed_file:
+            collapsed_file.write(self.sampler.get_collapsed())
+        files.append(f'{name}.collapsed')
+
+        prune_profiles(directory, self.config['MAX_FILES'])
+        return [reverse('download_profile', args=[filename]) for filename in files]
+
+    def get_text_report(self):
+        output = io.StringIO()
+        output.write(f'{"cprofile" if self.profile is not None else "sample"} profile, {self.duration * 1000:.1f} ms wall time\n\n')
+        if self.profile is not None:
+            stats = pstats.Stats(self.profile, stream=output)
+            stats.sort_stats('cumulative').print_stats(self.config['TEXT_LINES'])
+        else:
+            output.write(self.sampler.get_collapsed())
+        return output.getvalue()
+
+    def finish(self, request, response):
+        urls = self.save(request)
+        if self.plan.background:
+            return response
+        if self.plan.text:
+            report = HttpResponse(self.get_text_report(), content_type='text/plain; charset=utf-8')
+            report['X-Profile-Files'] = ', '.join(urls)
+            return report
+        response['X-Profile-Files'] = ', '.join(urls)
+        return response
+
+
+def prune_profiles(directory, max_files):
+    entries = sorted(os.scandir(directory), key=lambda entry: entry.stat().st_mtime, reverse=True)
+    for entry in entries[max_files:]:
+        try:
+            os.remove(entry.path)
+        except OSError:
+            pass
+
+
+def run_profiled(request, plan, call):
+    """Run call() (the view) under the plan's profiler and store / return the profile"""
+    session = ProfileSession(plan, get_profiling_settings())
+    session.start(sys._getframe())
+    try:
+        response = call()
+    finally:
+        session.stop()
+    return session.finish(request, response)
+
+
+async def arun_profiled(request, plan, call):
+    """
+    run_profiled for async views (profiles the event loop thread). cProfile
+    stays enabled on that thread for the whole await, so coroutines of other
+    requests that run meanwhile are counted in the .pstats file too; use sample
+    mode, or a worker without concurrent traffic, for a clean profile.
+    """
+    session = ProfileSession(plan, get_profiling_settings())
+    session.start(sys._getframe())
+    try:
+        response = await call()
+    finally:
+        session.stop()
+    return session.finish(request, response)
+
+
+# ============================================================
+# STAFF-ONLY PROFILE ENDPOINTS
+# ============================================================
+def list_profiles(request):
+    """Stored profiles, newest first (admin only, session or JWT)"""
+    if not is_staff_actor(get_request_actor(request)[0]):
+        return JsonResponse({'error': 'Unauthorized'}, status=403)
+
+    directory = get_profile_dir(get_profiling_settings())
+    entries = sorted(os.scandir(directory), key=lambda entry: entry.stat().st_mtime, reverse=True) if os.path.isdir(directory) else []
+    return JsonResponse({
+        'profiles': [
+            {'name': entry.name, 'size': entry.stat().st_size, 'url': reverse('download_profile', args=[entry.name])}
+            for entry in entries if PROFILE_FILENAME.match(entry.name)
+        ]
+    }, status=200)
+
+
+def download_profile(request, filename):
+    """Download one stored .pstats / .collapsed file (admin only, session or JWT)"""
+    if not is_staff_actor(get_request_actor(request)[0]):
+        return JsonResponse({'error': 'Unauthorized'}, status=403)
+    if not PROFILE_FILENAME.match(filename):
+        return JsonResponse({'error': 'Invalid profile name'}, status=400)
+
+    path = os.path.join(get_profile_dir(get_profiling_settings()), filename)
+    if not os.path.isfile(path):
+        return JsonResponse({'error': 'Profile not found'}, status=404)
+    return FileResponse(open(path, 'rb'), as_attachment=True, filename=filename)
+
@@ -0,0 +1,222 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from contextlib import contextmanager
+from contextvars import ContextVar
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from threading import Lock
+import json
+import logging
+import re
+import time
+
+
+logger = logging.getLogger('dus_reception.request_timing')
+
+
+# ============================================================
+# REQUEST TIMING SETTINGS
+# ============================================================
+DEFAULT_REQUEST_TIMING_SETTINGS = {
+    'ENABLED': True,
+    'HEADER': True,                # Emit a Server-Timing header
+    'LOG': True,                   # One structured (JSON) log line per request
+    'SKIP_PATHS': ('/static/', '/media/'),
+    'N_PLUS_ONE_THRESHOLD': 5,     # Flag an SQL template executed more than N times in one request
+    'N_PLUS_ONE_VIEWS': (          # URL names checked for N+1 patterns
+        'get_calendar_data',
+        'get_booking_reports',
+        'export_booking_reports',
+        'get_activity_logs',
+    ),
+}
+
+
+def get_request_timing_settings():
+    return {**DEFAULT_REQUEST_TIMING_SETTINGS, **getattr(settings, 'REQUEST_TIMING', {})}
+
+
+# ============================================================
+# PER-REQUEST TIMER
+# ============================================================
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PLACEHOLDER = re.compile(r'%s|\?')
+_PLACEHOLDER_LIST = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+_WHITESPACE = re.compile(r'\s+')
+
+
+def get_sql_template(sql):
+    """SQL with literals and placeholders replaced, so queries differing only by values compare equal"""
+    sql = _STRING_LITERAL.sub('?', sql)
+    sql = _NUMBER_LITERAL.sub('?', sql)
+    sql = _PLACEHOLDER.sub('?', sql)
+    sql = _PLACEHOLDER_LIST.sub('(...)', sql)
+    return _WHITESPACE.sub(' ', sql).strip()
+
+
+class RequestTimer:
+    """
+    Measurements of one request. Views offload queries to worker threads
+    (sync_to_async copies the context), so updates are locked.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.query_count = 0
+        self.db_time = 0.0
+        self.timings = {}
+        self._templates = {}
+        self._lock = Lock()
+
+    def add_query(self, sql, duration):
+        template = get_sql_template(sql)
+        with self._lock:
+            self.query_count += 1
+            self.db_time += duration
+            self._templates[template] = self._templates.get(template, 0) + 1
+
+    def add(self, name, duration):
+        with self._lock:
+            self.timings[name] = self.timings.get(name, 0.0) + duration
+
+    def get_repeated_queries(self, threshold):
+        """[(sql_template, count)] executed more than threshold times, most repeated first"""
+        with self._lock:
+            repeated = [(template, count) for template, count in self._templates.items() if count > threshold]
+        return sorted(repeated, key=lambda item: -item[1])
+
+
+_current_timer = ContextVar('request_timer', default=None)
+
+
+def get_current_timer():
+    """RequestTimer of the request being handled, or None"""
+    return _current_timer.get()
+
+
+@contextmanager
+def timed(name):
+    """Add the duration of the block to the current request's `name` timing (no-op outside a request)"""
+    timer = _current_timer.get()
+    if timer is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timer.add(name, time.perf_counter() - started)
+
+
+# ============================================================
+# QUERY INSTRUMENTATION
+# ============================================================
+def _instrument_query(execute, sql, params, many, context):
+    timer = _current_timer.get()
+    if timer is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timer.add_query(sql, time.perf_counter() - started)
+
+
+def _install_query_wrapper(connection, **kwargs):
+    if _instrument_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_instrument_query)
+
+
+# Connections are per thread: every new one (request threads, sync_to_async
+# workers) gets the wrapper; it only measures while a request timer is active
+connection_created.connect(_install_query_wrapper)
+
+
+# ============================================================
+# MIDDLEWARE
+# ============================================================
+class RequestTimingMiddleware:
+    """
+    Records per request the DB query count and time, plus the named timings
+    views add with timed() (serialization, Nepali date conversion). Emits them
+    as a Server-Timing header and a JSON log line, and flags N+1 patterns (one
+    SQL template repeated more than N_PLUS_ONE_THRESHOLD times) on the
+    N_PLUS_ONE_VIEWS. Put it first in MIDDLEWARE so the total covers the
+    whole stack. Sync and async capable.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def _start(self, request, config):
+        if not config['ENABLED'] or request.path.startswith(tuple(config['SKIP_PATHS'])):
+            return None, None
+        # Connections opened before this module was imported
+        for connection in connections.all(initialized_only=True):
+            _install_query_wrapper(connection)
+        timer = RequestTimer()
+        return timer, _current_timer.set(timer)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        config = get_request_timing_settings()
+        timer, token = self._start(request, config)
+        if timer is None:
+            return self.get_response(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current_timer.reset(token)
+        self._finish(request, response, timer, config)
+        return response
+
+    async def __acall__(self, request):
+        config = get_request_timing_settings()
+        timer, token = self._start(request, config)
+        if timer is None:
+            return await self.get_response(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current_timer.reset(token)
+        self._finish(request, response, timer, config)
+        return response
+
+    def _finish(self, request, response, timer, config):
+        total = time.perf_counter() - timer.started
+        resolver_match = getattr(request, 'resolver_match', None)
+        view_name = resolver_match.url_name if resolver_match else None
+
+        repeated = []
+        if view_name in config['N_PLUS_ONE_VIEWS']:
+            repeated = timer.get_repeated_queries(config['N_PLUS_ONE_THRESHOLD'])
+
+        if config['HEADER']:
+            metrics = [f'db;dur={timer.db_time * 1000:.1f};desc="{timer.query_count} queries"']
+            metrics += [f'{name};dur={duration * 1000:.1f}' for name, duration in timer.timings.items()]
+            if repeated:
+                metrics.append(f'n-plus-one;desc="{len(repeated)} repeated queries"')
+            metrics.append(f'total;dur={total * 1000:.1f}')
+            existing = response.get('Server-Timing')
+            response['Server-Timing'] = ', '.join(([existing] if existing else []) + metrics)
+
+        if config['LOG']:
+            record = {
+                'method': request.method,
+                'path': request.path,
+                'view': view_name,
+                'status': response.status_code,
+                'duration_ms': round(total * 1000, 1),
+                'db_queries': timer.query_count,
+                'db_ms': round(timer.db_time * 1000, 1),
+                **{f'{name}_ms': round(duration * 1000, 1) for name, duration in timer.timings.items()},
+            }
+            if repeated:
+                record['n_plus_one'] = [{'sql': template[:500], 'count': count} for template, count in repeated]
+            logger.log(logging.WARNING if repeated else logging.INFO, json.dumps(record))
@@ -69,10 +69,13 @@ CORS_ALLOW_CREDENTIALS = True
 CORS_ALLOW_HEADERS = ['*']
 
 MIDDLEWARE = [
+    'dus_reception.request_timing.RequestTimingMiddleware',
+    'dus_reception.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.common.CommonMiddleware',
+    'authapp.middleware.JWTCsrfExemptMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
@@ -162,17 +165,167 @@ FILE_UPLOAD_TEMP_DIR = None
 
 # CACHE SETTINGS
 # ----------------------------------------
+# One SQLite file shared by every worker process on the host, so writes and
+# invalidations made by one worker are seen by all (LocMemCache is per process)
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-        'LOCATION': 'unique-snowflake',
+        'BACKEND': 'dus_reception.cache_backends.SQLiteCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache', 'shared_cache.sqlite3'),
         'TIMEOUT': 300,
         'OPTIONS': {
-            'MAX_ENTRIES': 1000,
+            'MAX_ENTRIES': 5000,
+            'CULL_FREQUENCY': 4,          # Evict the least recently used quarter when full
+            'ACCESS_RESOLUTION': 10,      # Seconds between LRU access-time updates of a key
+            'BUSY_TIMEOUT': 5,            # Seconds to wait for another worker's write lock
         }
     }
 }
 
+# ACTIVITY LOG WRITER SETTINGS
+# ----------------------------------------
+ACTIVITY_LOG = {
+    'ASYNC': True,             # Queue events and bulk_create them from a background thread
+    'QUEUE_SIZE': 10000,       # Max events waiting in memory per worker
+    'BATCH_SIZE': 100,         # Flush when this many events are queued
+    'FLUSH_INTERVAL': 1.0,     # Flush at least every N seconds
+    'ON_FULL': 'drop',         # 'drop' or 'sync' (write inline) when the queue is full
+    # High-frequency browsing events: 'log', 'coalesce' (one row + hit_count per WINDOW seconds),
+    # 'sample' (keep SAMPLE_RATE of events) or 'drop'
+    'HIGH_FREQUENCY_ACTIONS': {
+        'view': {'POLICY': 'coalesce', 'WINDOW': 300, 'SAMPLE_RATE': 1.0},
+        'export': {'POLICY': 'coalesce', 'WINDOW': 300, 'SAMPLE_RATE': 1.0},
+    },
+}
+
+# Activity stats read hourly rollups up to a watermark that stats requests advance
+# at most 48 hours at a time: on first deploy (and after restoring logs) run
+# `manage.py rollup_activity` once to backfill them.
+
+# ACTIVITY LOG RETENTION SETTINGS
+# (manage.py purge_activity_logs, schedule it daily from cron)
+# ----------------------------------------
+ACTIVITY_LOG_RETENTION = {
+    'DAYS': 90,                # Keep this many days of activity logs
+    'BATCH_SIZE': 1000,        # Rows deleted per statement
+    'PAUSE': 0.1,              # Seconds between batches so inserts are not blocked
+    'ARCHIVE': True,           # Move each batch to ACTIVITY_ARCHIVE_DIR before deleting
+}
+# Monthly gzip NDJSON archives (+ small index files), searched by get_activity_logs
+# when the date filter reaches past the retention window
+ACTIVITY_ARCHIVE_DIR = os.path.join(BASE_DIR, 'archives', 'activity_logs')
+
+# CUSTOM USER SESSION SETTINGS
+# (signed with SECRET_KEY, verified without a DB lookup)
+# ----------------------------------------
+CUSTOM_USER_SESSION = {
+    'COOKIE_NAME': 'custom_session',
+    'MAX_AGE': 60 * 60 * 12,   # Token lifetime in seconds
+    'SALT': 'authapp.custom_session',
+    'PRINCIPAL_CACHE_TTL': 60, # Seconds a resolved custom user is trusted per worker
+}
+
+# LOGIN CREDENTIAL SETTINGS
+# (password hashes are verified on a small per-process thread pool)
+# ----------------------------------------
+LOGIN_CREDENTIALS = {
+    'HASH_WORKERS': 4,         # Threads verifying password hashes
+    'MAX_PENDING': 32,         # Logins running or waiting before new ones get a 503
+    'WAIT_TIMEOUT': 10,        # Seconds a login waits for its verification
+}
+
+# AUTH THROTTLING SETTINGS
+# (token buckets per IP / email, checked before any DB access or hashing;
+#  point CACHE at a cache shared by all workers)
+# ----------------------------------------
+AUTH_THROTTLE = {
+    'ENABLED': True,
+    'CACHE': 'default',
+    'ENDPOINTS': {
+        'login': {
+            'IP': {'RATE': '20/min', 'BURST': 20},
+            'EMAIL': {'RATE': '5/min', 'BURST': 5},
+        },
+        'token_obtain': {
+            'IP': {'RATE': '20/min', 'BURST': 20},
+            'EMAIL': {'RATE': '5/min', 'BURST': 5},
+        },
+        'token_refresh': {
+            'IP': {'RATE': '60/min', 'BURST': 30},
+        },
+    },
+}
+
+# ----------------------------------------
+# SINGLE-FLIGHT SETTINGS
+# (concurrent identical GETs on the calendar, reports and activity stats
+#  APIs share one in-flight computation per process)
+# ----------------------------------------
+SINGLE_FLIGHT = {
+    'ENABLED': True,
+    'TIMEOUT': 10,
+}
+
+# ----------------------------------------
+# REQUEST TIMING SETTINGS
+# (Server-Timing header + one JSON log line per request with DB query count/time,
+#  serialization and Nepali date conversion time; N+1 patterns logged as warnings)
+# ----------------------------------------
+REQUEST_TIMING = {
+    'ENABLED': True,
+    'HEADER': True,
+    'LOG': True,
+    'N_PLUS_ONE_THRESHOLD': 5, # Same SQL template repeated more than N times in one request
+}
+
+# ----------------------------------------
+# PROMETHEUS METRICS SETTINGS
+# (/metrics, aggregated over all workers through BASE_DIR/cache/metrics.sqlite3;
+#  scrapers send METRICS_TOKEN as a bearer token; staff sessions are also accepted.
+#  Without a token only staff can read it. ALLOWED_IPS is an opt-in allowlist of
+#  REMOTE_ADDRs and must stay empty behind a reverse proxy)
+# ----------------------------------------
+METRICS = {
+    'ENABLED': True,
+    'FLUSH_INTERVAL': 1.0,     # Seconds between writes of a worker's samples to the shared store
+    'TOKEN': config('METRICS_TOKEN', default=None),
+    'ALLOWED_IPS': (),
+}
+
+# ----------------------------------------
+# PROFILING SETTINGS
+# (staff add `X-Profile: cprofile|sample[,text]` or ?_profile=... to a request behind
+#  login_required_dual; .pstats + .collapsed files go to BASE_DIR/profiles/, which is
+#  not publicly served: staff list them at /profiles/ and download them from there)
+# ----------------------------------------
+PROFILING = {
+    'ENABLED': True,
+    'SAMPLE_RATE': 0.0,        # Fraction of requests profiled in the background (0 = off)
+    'SAMPLE_MODE': 'sample',   # 'sample' (low overhead stack sampler) or 'cprofile'
+    'MAX_FILES': 200,
+}
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'console': {'format': '%(asctime)s %(levelname)s %(name)s %(message)s'},
+    },
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler', 'formatter': 'console'},
+    },
+    'loggers': {
+        'dus_reception.request_timing': {'handlers': ['console'], 'level': 'INFO', 'propagate': False},
+        'dus_reception.metrics': {'handlers': ['console'], 'level': 'WARNING', 'propagate': False},
+        'managementapp.activity_logger': {'handlers': ['console'], 'level': 'WARNING', 'propagate': False},
+    },
+}
+
+# Reverse proxies in front of the app that append the client address to
+# X-Forwarded-For (e.g. 1 for nginx with proxy_add_x_forwarded_for). 0 = use
+# REMOTE_ADDR; the header is client controlled otherwise. Used for auth
+# throttling and activity log IPs.
+TRUSTED_PROXY_COUNT = 0
+
 # Optional: Database connection optimization
 DATABASES['default']['CONN_MAX_AGE'] = 60
 
@@ -2,9 +2,14 @@ from django.contrib import admin
 from django.urls import path , include
 from django.conf import settings
 from django.conf.urls.static import static
+from .metrics import metrics_view
+from .profiling import list_profiles, download_profile
 
 urlpatterns = [
     path('custom/madin/admin/', admin.site.urls),
+    path('metrics', metrics_view, name='metrics'),
+    path('profiles/', list_profiles, name='list_profiles'),
+    path('profiles/<str:filename>', download_profile, name='download_profile'),
 
 
     # API URLS
@@ -0,0 +1,212 @@
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+from datetime import datetime
+import gzip
+import json
+import os
+
+
+# ============================================================
+# ACTIVITY LOG ARCHIVE (gzip NDJSON, one file per month)
+# ============================================================
+def get_archive_dir():
+    return getattr(settings, 'ACTIVITY_ARCHIVE_DIR', os.path.join(settings.BASE_DIR, 'archives', 'activity_logs'))
+
+
+def get_archive_path(month_key):
+    """month_key is 'YYYY-MM'"""
+    return os.path.join(get_archive_dir(), f'activity_logs_{month_key}.ndjson.gz')
+
+
+def get_index_path(month_key):
+    return os.path.join(get_archive_dir(), f'activity_logs_{month_key}.index.json')
+
+
+def serialize_log(log):
+    """Self-contained archive record (performer name is kept in case the user is deleted later)"""
+    return {
+        'id': log.id,
+        'action': log.action,
+        'entity_type': log.entity_type,
+        'entity_id': log.entity_id,
+        'entity_name': log.entity_name,
+        'description': log.description,
+        'performed_by_user_id': log.performed_by_user_id,
+        'performed_by_custom_id': log.performed_by_custom_id,
+        'performed_by': log.get_performer_name(),
+        'ip_address': log.ip_address,
+        'user_agent': log.user_agent,
+        'hit_count': log.hit_count,
+        'changes': log.changes,
+        'created_at': log.created_at,
+        'last_seen_at': log.last_seen_at,
+    }
+
+
+def archive_logs(logs):
+    """
+    Append activity logs to their monthly archive files.
+    Each call appends a new gzip member, which gzip readers handle transparently.
+    Returns the number of archived rows.
+    """
+    by_month = {}
+    for log in logs:
+        month_key = timezone.localtime(log.created_at).strftime('%Y-%m')
+        by_month.setdefault(month_key, []).append(serialize_log(log))
+
+    os.makedirs(get_archive_dir(), exist_ok=True)
+    for month_key, records in by_month.items():
+        with gzip.open(get_archive_path(month_key), 'at', encoding='utf-8') as archive:
+            for record in records:
+                archive.write(json.dumps(record, cls=DjangoJSONEncoder) + '\n')
+        update_archive_index(month_key, records)
+
+    return sum(len(records) for records in by_month.values())
+
+
+# ============================================================
+# MONTHLY INDEX
+# ============================================================
+def _empty_index(month_key):
+    return {
+        'month': month_key,
+        'count': 0,
+        'min_created_at': None,
+        'max_created_at': None,
+        'actions': {},
+        'entity_types': {},
+        'performers': [],
+    }
+
+
+def _add_to_index(index, records):
+    performers = set(index['performers'])
+    for record in records:
+        created_at = record['created_at']
+        if isinstance(created_at, str):
+            created_at = datetime.fromisoformat(created_at)
+        index['count'] += 1
+        if not index['min_created_at'] or created_at < datetime.fromisoformat(index['min_created_at']):
+            index['min_created_at'] = created_at.isoformat()
+        if not index['max_created_at'] or created_at > datetime.fromisoformat(index['max_created_at']):
+            index['max_created_at'] = created_at.isoformat()
+        index['actions'][record['action']] = index['actions'].get(record['action'], 0) + 1
+        index['entity_types'][record['entity_type']] = index['entity_types'].get(record['entity_type'], 0) + 1
+        performers.add(get_record_performer_key(record))
+    index['performers'] = sorted(performers)
+    return index
+
+
+def update_archive_index(month_key, records):
+    index = load_archive_index(month_key) or _empty_index(month_key)
+    _add_to_index(index, records)
+    with open(get_index_path(month_key), 'w', encoding='utf-8') as index_file:
+        json.dump(index, index_file)
+
+
+def rebuild_archive_index(month_key):
+    """Recreate a month's index by scanning its archive file"""
+    index = _add_to_index(_empty_index(month_key), read_archive(month_key))
+    with open(get_index_path(month_key), 'w', encoding='utf-8') as index_file:
+        json.dump(index, index_file)
+    return index
+
+
+def load_archive_index(month_key):
+    try:
+        with open(get_index_path(month_key), encoding='utf-8') as index_file:
+            return json.load(index_file)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def list_archive_months():
+    """Archived months, newest first"""
+    if not os.path.isdir(get_archive_dir()):
+        return []
+    months = [
+        name[len('activity_logs_'):-len('.ndjson.gz')]
+        for name in os.listdir(get_archive_dir())
+        if name.startswith('activity_logs_') and name.endswith('.ndjson.gz')
+    ]
+    return sorted(months, reverse=True)
+
+
+# ============================================================
+# SEARCHING THE ARCHIVE
+# ============================================================
+def get_record_performer_key(record):
+    if record.get('performed_by_user_id'):
+        return f"user_{record['performed_by_user_id']}"
+    if record.get('performed_by_custom_id'):
+        return f"custom_{record['performed_by_custom_id']}"
+    return 'system'
+
+
+def read_archive(month_key):
+    with gzip.open(get_archive_path(month_key), 'rt', encoding='utf-8') as archive:
+        for line in archive:
+            if line.strip():
+                yield json.loads(line)
+
+
+def _month_may_match(index, action=None, entity_type=None, performer=None, date_from=None, date_to=None):
+    """Use the month index to skip files that cannot contain matching rows"""
+    if not index or not index['count']:
+        return index is None
+    if action and action not in index['actions']:
+        return False
+    if entity_type and entity_type not in index['entity_types']:
+        return False
+    if performer and performer not in index['performers']:
+        return False
+    if date_from and datetime.fromisoformat(index['max_created_at']) < date_from:
+        return False
+    if date_to and datetime.fromisoformat(index['min_created_at']) >= date_to:
+        return False
+    return True
+
+
+def iter_archive(action=None, entity_type=None, performer=None, date_from=None, date_to=None, search=None):
+    """
+    Archived activity records matching the filters, newest first, one month at a time
+    (only a single month is held in memory). date_from / date_to are aware datetimes
+    (date_to exclusive).
+    """
+    search = search.lower() if search else None
+
+    for month_key in list_archive_months():
+        index = load_archive_index(month_key)
+        if index is None:
+            index = rebuild_archive_index(month_key)
+        if not _month_may_match(index, action, entity_type, performer, date_from, date_to):
+            continue
+
+        results = []
+        seen_ids = set()
+        for record in read_archive(month_key):
+            # A resumed retention job may have archived a batch twice
+            if record['id'] in seen_ids:
+                continue
+            seen_ids.add(record['id'])
+
+            if action and record['action'] != action:
+                continue
+            if entity_type and record['entity_type'] != entity_type:
+                continue
+            if performer and get_record_performer_key(record) != performer:
+                continue
+            created_at = datetime.fromisoformat(record['created_at'])
+            if date_from and created_at < date_from:
+                continue
+            if date_to and created_at >= date_to:
+                continue
+            if search and search not in (record['entity_name'] or '').lower() \
+                    and search not in (record['description'] or '').lower():
+                continue
+            results.append((created_at, record))
+
+        results.sort(key=lambda item: (item[0], -item[1]['id']), reverse=True)
+        for _, record in results:
+            yield record
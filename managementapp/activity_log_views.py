@@ -1,140 +1,251 @@
+from asgiref.sync import sync_to_async
 from django.shortcuts import render
-from django.http import JsonResponse
+from django.http import JsonResponse, StreamingHttpResponse
 from django.views.decorators.http import require_http_methods
 from django.db.models import Q, Count
 from django.core.paginator import Paginator
-from datetime import datetime, timedelta
+from django.core.handlers.asgi import ASGIRequest
+from datetime import datetime, timedelta, timezone as dt_timezone
+from django.utils import timezone
 from authapp.decorators import login_required_dual
+from authapp.principal import get_request_actor, is_staff_actor
 from .models import ActivityLog
+from .pagination import keyset_paginate, InvalidCursor, paginate_followed_by, apaginate, get_page_info, build_seek_filter
+from .async_utils import aiter_blocking
+from .activity_logger import log_activity, activity_log_writer
+from .activity_rollups import get_rollup_stats, aget_rollup_stats
+from .activity_retention import (
+    start_retention_job, run_retention_job_in_background, cancel_retention_job,
+    get_retention_status, get_retention_settings, RetentionJobRunning
+)
+from .activity_archive import iter_archive
+from .single_flight import single_flight, single_flight_group
+from django.core.serializers.json import DjangoJSONEncoder
+from dus_reception.request_timing import timed
+import csv
 import json
+import zlib
 
 
-def get_client_ip(request):
-    """Get client IP address from request"""
-    x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
-    if x_forwarded_for:
-        ip = x_forwarded_for.split(',')[0]
-    else:
-        ip = request.META.get('REMOTE_ADDR')
-    return ip
+ACTIVITY_LOG_ORDERING = ('-created_at', 'id')
+
+# Live rows read per keyset query by the streaming export
+EXPORT_CHUNK_SIZE = 2000
+
+EXPORT_FIELDS = [
+    'id', 'created_at', 'action', 'entity_type', 'entity_id', 'entity_name', 'description',
+    'performed_by', 'performed_by_user_id', 'performed_by_custom_id', 'ip_address', 'user_agent',
+    'hit_count', 'archived',
+]
+
+
+def serialize_activity_log(log):
+    """JSON representation of a live ActivityLog row"""
+    return {
+        'id': log.id,
+        'action': log.action,
+        'action_display': log.get_action_display(),
+        'action_icon': log.get_action_icon(),
+        'action_color': log.get_action_color(),
+        'entity_type': log.entity_type,
+        'entity_type_display': log.get_entity_type_display(),
+        'entity_id': log.entity_id,
+        'entity_name': log.entity_name,
+        'description': log.description,
+        'performed_by': log.get_performer_name(),
+        'ip_address': log.ip_address,
+        'hit_count': log.hit_count,
+        'changes': log.changes,
+        'created_at': log.created_at.strftime('%Y-%m-%d %H:%M:%S'),
+        'created_at_readable': log.created_at.strftime('%B %d, %Y at %I:%M %p')
+    }
+
+
+def serialize_archived_log(record):
+    """Same JSON representation for a record read from the cold archive"""
+    log = ActivityLog(action=record['action'], entity_type=record['entity_type'])
+    created_at = datetime.fromisoformat(record['created_at']).astimezone(dt_timezone.utc)
+    return {
+        'id': record['id'],
+        'action': record['action'],
+        'action_display': log.get_action_display(),
+        'action_icon': log.get_action_icon(),
+        'action_color': log.get_action_color(),
+        'entity_type': record['entity_type'],
+        'entity_type_display': log.get_entity_type_display(),
+        'entity_id': record['entity_id'],
+        'entity_name': record['entity_name'],
+        'description': record['description'],
+        'performed_by': record['performed_by'],
+        'ip_address': record['ip_address'],
+        'hit_count': record.get('hit_count', 1),
+        'changes': record.get('changes'),
+        'created_at': created_at.strftime('%Y-%m-%d %H:%M:%S'),
+        'created_at_readable': created_at.strftime('%B %d, %Y at %I:%M %p'),
+        'archived': True
+    }
 
 
-def log_activity(action, entity_type, entity_id=None, entity_name='', description='', request=None, performed_by_user=None, performed_by_custom=None):
+def filter_activity_logs(request):
     """
-    Helper function to create activity logs
-    Usage: log_activity('create', 'booking', booking.id, booking.client_name, 'Created new booking', request)
+    Apply the activity log filters from the query string.
+    Returns (live queryset, filters for the cold archive, whether the archive should be searched)
     """
-    ip_address = get_client_ip(request) if request else None
-    user_agent = request.META.get('HTTP_USER_AGENT', '') if request else ''
-    
-    ActivityLog.objects.create(
-        action=action,
-        entity_type=entity_type,
-        entity_id=entity_id,
-        entity_name=entity_name,
-        description=description,
-        performed_by_user=performed_by_user,
-        performed_by_custom=performed_by_custom,
-        ip_address=ip_address,
-        user_agent=user_agent
-    )
+    # Get filter parameters
+    action_filter = request.GET.get('action', None)
+    entity_filter = request.GET.get('entity_type', None)
+    performer_filter = request.GET.get('performer', None)
+    date_from = request.GET.get('date_from', None)
+    date_to = request.GET.get('date_to', None)
+    search_query = request.GET.get('search', '').strip()
+    
+    # Rows older than the retention window live in the cold archive
+    include_archive = request.GET.get('include_archive') == '1'
+    date_from_obj = None
+    date_to_obj = None
+    
+    # Start with all logs (performers joined for serialize_activity_log)
+    logs = ActivityLog.objects.select_related('performed_by_user', 'performed_by_custom')
+    
+    # Apply filters
+    if action_filter:
+        logs = logs.filter(action=action_filter)
+    
+    if entity_filter:
+        logs = logs.filter(entity_type=entity_filter)
+    
+    if performer_filter:
+        if performer_filter.startswith('user_'):
+            user_id = performer_filter.replace('user_', '')
+            logs = logs.filter(performed_by_user_id=user_id)
+        elif performer_filter.startswith('custom_'):
+            custom_id = performer_filter.replace('custom_', '')
+            logs = logs.filter(performed_by_custom_id=custom_id)
+    
+    if date_from:
+        date_from_obj = timezone.make_aware(datetime.strptime(date_from, '%Y-%m-%d'))
+        logs = logs.filter(created_at__gte=date_from_obj)
+    
+    if date_to:
+        date_to_obj = timezone.make_aware(datetime.strptime(date_to, '%Y-%m-%d'))
+        # Add one day to include the entire end date
+        date_to_obj = date_to_obj + timedelta(days=1)
+        logs = logs.filter(created_at__lt=date_to_obj)
+    
+    hot_window_start = timezone.now() - timedelta(days=get_retention_settings()['DAYS'])
+    if date_from_obj and date_from_obj < hot_window_start:
+        include_archive = True
+    
+    if search_query:
+        logs = logs.filter(
+            Q(entity_name__icontains=search_query) |
+            Q(description__icontains=search_query)
+        )
+    
+    archive_filters = {
+        'action': action_filter,
+        'entity_type': entity_filter,
+        'performer': performer_filter,
+        'date_from': date_from_obj,
+        'date_to': date_to_obj,
+        'search': search_query,
+    }
+    return logs, archive_filters, include_archive
+
+
+def build_activity_page(logs, page, per_page):
+    """One page of logs plus page-mode pagination info (the paginator's COUNT is reused for the total)"""
+    paginator = Paginator(logs, per_page)
+    page_obj = paginator.get_page(page)
+    
+    return {
+        'logs': [
+            serialize_archived_log(log) if isinstance(log, dict) else serialize_activity_log(log)
+            for log in page_obj
+        ],
+        'pagination': get_page_info(page_obj)
+    }
+
+
+def get_activity_bootstrap(days=30, per_page=20):
+    """Initial data of the activity page: the stats cards and the first, unfiltered page of logs"""
+    logs = ActivityLog.objects.select_related('performed_by_user', 'performed_by_custom')
+    return {
+        'stats': {**get_rollup_stats(days), 'date_range_days': days},
+        **build_activity_page(logs, 1, per_page),
+    }
 
 
 @login_required_dual(login_url='/unauthorized/')
 def activity_log_view(request):
     """Render the activity log page"""
-    return render(request, 'admin/activity_log.html')
+    # Embedded with json_script so the first paint needs no XHRs
+    return render(request, 'admin/activity_log.html', {'activity_bootstrap': get_activity_bootstrap()})
 
 
 @login_required_dual(login_url='/unauthorized/')
 @require_http_methods(["GET"])
-def get_activity_logs(request):
-    """API endpoint to get activity logs with filters and pagination"""
+def get_activity_bootstrap_data(request):
+    """API endpoint returning the activity page's stats and first page of logs in one response"""
     try:
-        # Get filter parameters
-        action_filter = request.GET.get('action', None)
-        entity_filter = request.GET.get('entity_type', None)
-        performer_filter = request.GET.get('performer', None)
-        date_from = request.GET.get('date_from', None)
-        date_to = request.GET.get('date_to', None)
-        search_query = request.GET.get('search', '').strip()
+        days = int(request.GET.get('days', 30))
+        per_page = int(request.GET.get('per_page', 20))
         
+        return JsonResponse(get_activity_bootstrap(days, per_page), status=200)
+    
+    except Exception as e:
+        return JsonResponse({'error': str(e)}, status=500)
+
+
+@login_required_dual(login_url='/unauthorized/')
+@require_http_methods(["GET"])
+async def get_activity_logs(request):
+    """API endpoint to get activity logs with filters and pagination"""
+    try:
         # Get pagination parameters
         page = int(request.GET.get('page', 1))
         per_page = int(request.GET.get('per_page', 20))
         
-        # Start with all logs
-        logs = ActivityLog.objects.all()
-        
-        # Apply filters
-        if action_filter:
-            logs = logs.filter(action=action_filter)
-        
-        if entity_filter:
-            logs = logs.filter(entity_type=entity_filter)
-        
-        if performer_filter:
-            if performer_filter.startswith('user_'):
-                user_id = performer_filter.replace('user_', '')
-                logs = logs.filter(performed_by_user_id=user_id)
-            elif performer_filter.startswith('custom_'):
-                custom_id = performer_filter.replace('custom_', '')
-                logs = logs.filter(performed_by_custom_id=custom_id)
-        
-        if date_from:
-            date_from_obj = datetime.strptime(date_from, '%Y-%m-%d')
-            logs = logs.filter(created_at__gte=date_from_obj)
-        
-        if date_to:
-            date_to_obj = datetime.strptime(date_to, '%Y-%m-%d')
-            # Add one day to include the entire end date
-            date_to_obj = date_to_obj + timedelta(days=1)
-            logs = logs.filter(created_at__lt=date_to_obj)
-        
-        if search_query:
-            logs = logs.filter(
-                Q(entity_name__icontains=search_query) |
-                Q(description__icontains=search_query)
-            )
+        # Cursor mode: seek on (-created_at, id) instead of OFFSET + COUNT
+        pagination_mode = request.GET.get('mode', 'page')
+        cursor = request.GET.get('cursor', None)
+        with_count = request.GET.get('with_count', 'none')
         
-        # Get total count before pagination
-        total_count = logs.count()
+        logs, archive_filters, include_archive = filter_activity_logs(request)
         
-        # Paginate
-        paginator = Paginator(logs, per_page)
-        page_obj = paginator.get_page(page)
+        if pagination_mode == 'cursor' and include_archive:
+            return JsonResponse({'error': 'Archived logs can only be browsed in page mode'}, status=400)
         
-        # Prepare response data
-        logs_data = []
-        for log in page_obj:
-            logs_data.append({
-                'id': log.id,
-                'action': log.action,
-                'action_display': log.get_action_display(),
-                'action_icon': log.get_action_icon(),
-                'action_color': log.get_action_color(),
-                'entity_type': log.entity_type,
-                'entity_type_display': log.get_entity_type_display(),
-                'entity_id': log.entity_id,
-                'entity_name': log.entity_name,
-                'description': log.description,
-                'performed_by': log.get_performer_name(),
-                'ip_address': log.ip_address,
-                'created_at': log.created_at.strftime('%Y-%m-%d %H:%M:%S'),
-                'created_at_readable': log.created_at.strftime('%B %d, %Y at %I:%M %p')
-            })
+        if include_archive:
+            # Archived rows are always older than live ones, so they simply follow them;
+            # the archive is streamed only up to the next page. Reading it is blocking work.
+            def build_archive_page():
+                rows, pagination = paginate_followed_by(logs, lambda: iter_archive(**archive_filters), page, per_page)
+                return {
+                    'logs': [serialize_archived_log(log) if isinstance(log, dict) else serialize_activity_log(log) for log in rows],
+                    'pagination': pagination
+                }
+            return JsonResponse(await sync_to_async(build_archive_page)(), status=200)
         
-        return JsonResponse({
-            'logs': logs_data,
-            'pagination': {
-                'current_page': page_obj.number,
-                'total_pages': paginator.num_pages,
-                'total_count': total_count,
-                'has_next': page_obj.has_next(),
-                'has_previous': page_obj.has_previous(),
-                'per_page': per_page
-            }
-        }, status=200)
+        if pagination_mode != 'cursor':
+            page_rows, pagination = await apaginate(logs, page, per_page)
+        else:
+            try:
+                page_rows, pagination = await sync_to_async(keyset_paginate)(
+                    logs, ACTIVITY_LOG_ORDERING, cursor=cursor, per_page=per_page, with_count=with_count
+                )
+            except InvalidCursor as e:
+                return JsonResponse({'error': str(e)}, status=400)
+        
+        # Prepare response data
+        with timed('serialize'):
+            logs_data = [serialize_activity_log(log) for log in page_rows]
+            
+            response = JsonResponse({
+                'logs': logs_data,
+                'pagination': pagination
+            }, status=200)
+        return response
     
     except Exception as e:
         return JsonResponse({'error': str(e)}, status=500)
@@ -142,80 +253,228 @@ def get_activity_logs(request):
 
 @login_required_dual(login_url='/unauthorized/')
 @require_http_methods(["GET"])
-def get_activity_stats(request):
+@single_flight()
+async def get_activity_stats(request):
     """API endpoint to get activity statistics"""
     try:
         # Get date range (default: last 30 days)
         days = int(request.GET.get('days', 30))
-        date_from = datetime.now() - timedelta(days=days)
         
-        logs = ActivityLog.objects.filter(created_at__gte=date_from)
+        # Served from hourly rollups; only the not-yet-rolled-up tail is read raw
+        stats = await aget_rollup_stats(days)
         
-        # Count by action type
-        action_stats = logs.values('action').annotate(count=Count('id'))
+        return JsonResponse({
+            **stats,
+            'date_range_days': days
+        }, status=200)
+    
+    except Exception as e:
+        return JsonResponse({'error': str(e)}, status=500)
+
+
+@login_required_dual(login_url='/unauthorized/')
+@require_http_methods(["GET", "DELETE"])
+def clear_old_logs(request):
+    """
+    API endpoint to clear logs older than specified days (admin only).
+    DELETE starts (or resumes / cancels) a chunked background retention job, GET reports its progress.
+    """
+    try:
+        # Only allow admins (session or JWT) to clear logs
+        user, _ = get_request_actor(request)
+        if not is_staff_actor(user):
+            return JsonResponse({'error': 'Unauthorized'}, status=403)
         
-        # Count by entity type
-        entity_stats = logs.values('entity_type').annotate(count=Count('id'))
+        if request.method == 'GET':
+            return JsonResponse({'job': get_retention_status()}, status=200)
         
-        # Total activities
-        total_activities = logs.count()
+        data = json.loads(request.body) if request.body else {}
         
-        # Today's activities
-        today_start = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
-        today_activities = logs.filter(created_at__gte=today_start).count()
+        if data.get('cancel'):
+            return JsonResponse({
+                'success': True,
+                'message': 'Retention job cancellation requested',
+                'job': cancel_retention_job()
+            }, status=200)
         
-        # Most active users
-        user_activity = logs.filter(performed_by_user__isnull=False).values(
-            'performed_by_user__username', 'performed_by_user__first_name', 'performed_by_user__last_name'
-        ).annotate(count=Count('id')).order_by('-count')[:5]
+        try:
+            job = start_retention_job(
+                days=int(data['days']) if 'days' in data else None,
+                archive=bool(data['archive']) if 'archive' in data else None,
+                resume=bool(data.get('resume', False)),
+                requested_by=user
+            )
+        except RetentionJobRunning as e:
+            return JsonResponse({'error': str(e), 'job': get_retention_status()}, status=409)
         
-        custom_activity = logs.filter(performed_by_custom__isnull=False).values(
-            'performed_by_custom__full_name'
-        ).annotate(count=Count('id')).order_by('-count')[:5]
+        run_retention_job_in_background()
         
         return JsonResponse({
-            'total_activities': total_activities,
-            'today_activities': today_activities,
-            'action_stats': list(action_stats),
-            'entity_stats': list(entity_stats),
-            'top_admin_users': list(user_activity),
-            'top_custom_users': list(custom_activity),
-            'date_range_days': days
-        }, status=200)
+            'success': True,
+            'message': f'Started clearing activity logs older than {job["days"]} days',
+            'job': job
+        }, status=202)
     
     except Exception as e:
         return JsonResponse({'error': str(e)}, status=500)
 
 
 @login_required_dual(login_url='/unauthorized/')
-@require_http_methods(["DELETE"])
-def clear_old_logs(request):
-    """API endpoint to clear logs older than specified days (admin only)"""
+@require_http_methods(["GET"])
+def get_activity_queue_metrics(request):
+    """API endpoint to inspect the batched activity log writer (admin only)"""
+    if not is_staff_actor(get_request_actor(request)[0]):
+        return JsonResponse({'error': 'Unauthorized'}, status=403)
+    
+    return JsonResponse(activity_log_writer.get_metrics(), status=200)
+
+
+@login_required_dual(login_url='/unauthorized/')
+@require_http_methods(["GET"])
+def get_single_flight_metrics(request):
+    """API endpoint to inspect request coalescing per key in this process (admin only)"""
+    if not is_staff_actor(get_request_actor(request)[0]):
+        return JsonResponse({'error': 'Unauthorized'}, status=403)
+    
+    return JsonResponse(single_flight_group.get_metrics(), status=200)
+
+
+# ============================================================
+# STREAMING ACTIVITY LOG EXPORT
+# ============================================================
+class Echo:
+    """Pseudo-buffer for csv.writer: returns each written line instead of storing it"""
+    def write(self, value):
+        return value
+
+
+def iter_keyset_chunks(rows, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Yield .values() rows in ACTIVITY_LOG_ORDERING, one bounded keyset query per
+    chunk. QuerySet.iterator() does not stream on every driver (mysqlclient
+    buffers the whole result set client-side), this keeps memory constant.
+    """
+    last_values = None
+    while True:
+        chunk = rows
+        if last_values is not None:
+            chunk = chunk.filter(build_seek_filter(ACTIVITY_LOG_ORDERING, last_values))
+        chunk = list(chunk[:chunk_size])
+        yield from chunk
+        if len(chunk) < chunk_size:
+            return
+        last_values = [chunk[-1][field.lstrip('-')] for field in ACTIVITY_LOG_ORDERING]
+
+
+def iter_export_records(logs, archive_filters, include_archive):
+    """Yield export records for live rows (joined, read in keyset chunks) followed by archived ones"""
+    rows = logs.order_by(*ACTIVITY_LOG_ORDERING).values(
+        'id', 'created_at', 'action', 'entity_type', 'entity_id', 'entity_name', 'description',
+        'performed_by_user_id', 'performed_by_custom_id', 'ip_address', 'hit_count',
+        'performed_by_user__username', 'performed_by_user__first_name', 'performed_by_user__last_name',
+        'performed_by_custom__full_name', 'agent__value'
+    )
+    for row in iter_keyset_chunks(rows):
+        # Same wording as ActivityLog.get_performer_name()
+        if row['performed_by_user_id']:
+            full_name = f"{row['performed_by_user__first_name']} {row['performed_by_user__last_name']}".strip()
+            performed_by = f"{full_name or row['performed_by_user__username']} (Admin)"
+        elif row['performed_by_custom_id']:
+            performed_by = f"{row['performed_by_custom__full_name']} (User)"
+        else:
+            performed_by = 'System'
+        
+        yield {
+            'id': row['id'],
+            'created_at': row['created_at'].isoformat(),
+            'action': row['action'],
+            'entity_type': row['entity_type'],
+            'entity_id': row['entity_id'],
+            'entity_name': row['entity_name'],
+            'description': row['description'],
+            'performed_by': performed_by,
+            'performed_by_user_id': row['performed_by_user_id'],
+            'performed_by_custom_id': row['performed_by_custom_id'],
+            'ip_address': row['ip_address'],
+            'user_agent': row['agent__value'] or '',
+            'hit_count': row['hit_count'],
+            'archived': False,
+        }
+    
+    if include_archive:
+        for record in iter_archive(**archive_filters):
+            yield {**{field: record.get(field) for field in EXPORT_FIELDS}, 'archived': True}
+
+
+def iter_export_lines(records, export_format):
+    if export_format == 'csv':
+        writer = csv.writer(Echo())
+        yield writer.writerow(EXPORT_FIELDS)
+        for record in records:
+            yield writer.writerow([record[field] for field in EXPORT_FIELDS])
+    else:
+        for record in records:
+            yield json.dumps(record, cls=DjangoJSONEncoder) + '\n'
+
+
+def gzip_stream(lines, flush_every=256 * 1024):
+    """Compress an iterator of text lines on the fly"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    pending = 0
+    for line in lines:
+        data = line.encode('utf-8')
+        pending += len(data)
+        chunk = compressor.compress(data)
+        if pending >= flush_every:
+            chunk += compressor.flush(zlib.Z_SYNC_FLUSH)
+            pending = 0
+        if chunk:
+            yield chunk
+    yield compressor.flush()
+
+
+@login_required_dual(login_url='/unauthorized/')
+@require_http_methods(["GET"])
+def export_activity_logs(request):
+    """
+    Stream the filtered activity log as NDJSON or CSV (optionally gzipped) with constant memory.
+    Accepts the same filters as get_activity_logs plus format=ndjson|csv and gzip=1.
+    """
     try:
-        # Only allow admins to clear logs
-        if not request.user.is_authenticated or not (request.user.is_superuser or request.user.is_staff):
-            return JsonResponse({'error': 'Unauthorized'}, status=403)
+        export_format = request.GET.get('format', 'ndjson')
+        if export_format not in ('ndjson', 'csv'):
+            return JsonResponse({'error': 'format must be ndjson or csv'}, status=400)
+        use_gzip = request.GET.get('gzip') == '1'
         
-        data = json.loads(request.body)
-        days = int(data.get('days', 90))
+        logs, archive_filters, include_archive = filter_activity_logs(request)
         
-        date_threshold = datetime.now() - timedelta(days=days)
-        deleted_count = ActivityLog.objects.filter(created_at__lt=date_threshold).delete()[0]
+        content = iter_export_lines(iter_export_records(logs, archive_filters, include_archive), export_format)
         
-        # Log this action
+        content_type = 'text/csv' if export_format == 'csv' else 'application/x-ndjson'
+        filename = f'activity_logs_{timezone.localdate()}.{export_format}'
+        if use_gzip:
+            content = gzip_stream(content)
+            content_type = 'application/gzip'
+            filename += '.gz'
+        if isinstance(request, ASGIRequest):
+            # Under ASGI a sync iterator is collected whole before sending; stream it batch by batch
+            content = aiter_blocking(content)
+        response = StreamingHttpResponse(content, content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        
+        performed_by_user, performed_by_custom = get_request_actor(request)
         log_activity(
-            'delete',
+            'export',
             'system',
-            description=f'Cleared {deleted_count} activity logs older than {days} days',
+            description=f'Exported activity logs ({export_format}{", gzip" if use_gzip else ""})',
             request=request,
-            performed_by_user=request.user
+            performed_by_user=performed_by_user,
+            performed_by_custom=performed_by_custom,
+            coalesce_key=sorted(request.GET.items())
         )
         
-        return JsonResponse({
-            'success': True,
-            'message': f'Successfully cleared {deleted_count} old activity logs',
-            'deleted_count': deleted_count
-        }, status=200)
+        return response
     
     except Exception as e:
-        return JsonResponse({'error': str(e)}, status=500)
\ No newline at end of file
+        return JsonResponse({'error': str(e)}, status=500)
+
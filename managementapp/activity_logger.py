@@ -0,0 +1,414 @@
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import F
+from django.utils import timezone
+from collections import OrderedDict
+from threading import Thread, Lock, Event
+from dus_reception.metrics import metrics_store
+import atexit
+import hashlib
+import json
+import logging
+import os
+import queue
+import random
+import time
+
+
+logger = logging.getLogger('managementapp.activity_logger')
+
+
+# ============================================================
+# ACTIVITY LOG PIPELINE SETTINGS
+# ============================================================
+DEFAULT_ACTIVITY_LOG_SETTINGS = {
+    'ASYNC': True,             # False = write every event synchronously
+    'QUEUE_SIZE': 10000,       # Bounded in-process queue
+    'BATCH_SIZE': 100,         # Flush when this many events are waiting
+    'FLUSH_INTERVAL': 1.0,     # ... or after this many seconds
+    'ON_FULL': 'drop',         # 'drop' or 'sync' when the queue is full
+    # Per-action policy for high-frequency events:
+    # 'log' (every event), 'coalesce' (one row per window with hit_count),
+    # 'sample' (keep SAMPLE_RATE of events) or 'drop'
+    'HIGH_FREQUENCY_ACTIONS': {
+        'view': {'POLICY': 'coalesce', 'WINDOW': 300, 'SAMPLE_RATE': 1.0},
+        'export': {'POLICY': 'coalesce', 'WINDOW': 300, 'SAMPLE_RATE': 1.0},
+    },
+}
+
+
+def get_activity_log_settings():
+    return {**DEFAULT_ACTIVITY_LOG_SETTINGS, **getattr(settings, 'ACTIVITY_LOG', {})}
+
+
+# ============================================================
+# REQUEST HELPERS
+# ============================================================
+def get_client_ip(request):
+    """
+    Get client IP address from request.
+    X-Forwarded-For is client controlled, so it is only read when settings.TRUSTED_PROXY_COUNT
+    proxies in front of the app append to it; the address the outermost trusted proxy added is used.
+    """
+    trusted_proxies = getattr(settings, 'TRUSTED_PROXY_COUNT', 0)
+    if trusted_proxies:
+        forwarded = [ip.strip() for ip in request.META.get('HTTP_X_FORWARDED_FOR', '').split(',') if ip.strip()]
+        if len(forwarded) >= trusted_proxies:
+            return forwarded[-trusted_proxies]
+    return request.META.get('REMOTE_ADDR')
+
+
+# ============================================================
+# USER-AGENT INTERNING
+# ============================================================
+class UserAgentInterner:
+    """
+    Maps user-agent strings to UserAgent row ids through a small in-process LRU,
+    so logging only touches the user_agents table for a browser it has not seen yet.
+    """
+
+    def __init__(self, max_entries=256):
+        self._lock = Lock()
+        self._cache = OrderedDict()
+        self.max_entries = max_entries
+
+    def resolve(self, value):
+        if not value:
+            return None
+
+        with self._lock:
+            if value in self._cache:
+                self._cache.move_to_end(value)
+                return self._cache[value]
+
+        from .models import UserAgent
+
+        value_hash = hashlib.sha1(value.encode()).hexdigest()
+        agent_id = UserAgent.objects.filter(value_hash=value_hash).values_list('id', flat=True).first()
+        if agent_id is None:
+            agent_id = UserAgent.objects.get_or_create(value_hash=value_hash, defaults={'value': value})[0].id
+
+        with self._lock:
+            self._cache[value] = agent_id
+            self._cache.move_to_end(value)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+        return agent_id
+
+
+user_agent_interner = UserAgentInterner()
+
+
+# ============================================================
+# COALESCING OF HIGH-FREQUENCY EVENTS
+# ============================================================
+def make_fingerprint(event, coalesce_key):
+    """Identify 'the same thing by the same performer' for coalescing"""
+    raw = json.dumps([
+        event['action'],
+        event['entity_type'],
+        event['performed_by_user_id'],
+        event['performed_by_custom_id'],
+        coalesce_key if coalesce_key is not None else event['description'],
+    ], sort_keys=True, default=str)
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+
+class ActivityCoalescer:
+    """
+    Keeps one open window per fingerprint. The first event of a window is
+    written as a row, later ones only bump an in-memory counter that is
+    added to the row's hit_count when the window closes.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._windows = {}
+        self._closed = []
+
+    def admit(self, event, window_seconds):
+        """Return True if the event should be written as a new row"""
+        now = time.monotonic()
+        fingerprint = event['fingerprint']
+        with self._lock:
+            entry = self._windows.get(fingerprint)
+            if entry is not None and entry['expires'] > now:
+                entry['extra_hits'] += 1
+                entry['last_seen_at'] = event['created_at']
+                return False
+            if entry is not None:
+                self._closed.append((fingerprint, entry))
+            self._windows[fingerprint] = {
+                'created_at': event['created_at'],
+                'expires': now + window_seconds,
+                'extra_hits': 0,
+                'last_seen_at': None,
+            }
+            return True
+
+    def flush_expired(self, force=False):
+        """Write the counters of closed windows to their rows"""
+        from .models import ActivityLog
+
+        now = time.monotonic()
+        with self._lock:
+            closed, self._closed = self._closed, []
+            for fingerprint, entry in list(self._windows.items()):
+                if force or entry['expires'] <= now:
+                    closed.append((fingerprint, self._windows.pop(fingerprint)))
+
+        for fingerprint, entry in closed:
+            if not entry['extra_hits']:
+                continue
+            try:
+                ActivityLog.objects.filter(
+                    fingerprint=fingerprint, created_at=entry['created_at']
+                ).update(
+                    hit_count=F('hit_count') + entry['extra_hits'],
+                    last_seen_at=entry['last_seen_at'],
+                )
+            except Exception:
+                logger.exception('Failed to update the hit count of a coalesced activity log')
+
+
+# ============================================================
+# BATCHED WRITER
+# ============================================================
+class FlushRequest:
+    """Queued by flush(): the writer thread sets `done` once every earlier event is written"""
+
+    def __init__(self):
+        self.done = Event()
+
+
+class ActivityLogWriter:
+    """
+    Collects activity events in a bounded queue and writes them with
+    bulk_create from a background thread, on batch size or time.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._metrics_lock = Lock()
+        self._pid = None
+        self._queue = None
+        self._thread = None
+        self._stop = Event()
+        self.metrics = {
+            'enqueued': 0,
+            'written': 0,
+            'dropped': 0,
+            'failed': 0,
+            'flushes': 0,
+            'sync_writes': 0,
+            'coalesced': 0,
+            'sampled_out': 0,
+            'policy_dropped': 0,
+        }
+        self.coalescer = ActivityCoalescer()
+
+    # --------------------------------------------------------
+    # Lifecycle
+    # --------------------------------------------------------
+    def _ensure_started(self):
+        # Restart after fork so every worker process gets its own flusher
+        if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+                return
+            config = get_activity_log_settings()
+            self._pid = os.getpid()
+            self._queue = queue.Queue(maxsize=config['QUEUE_SIZE'])
+            self._stop.clear()
+            self._thread = Thread(target=self._run, name='activity-log-writer', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        config = get_activity_log_settings()
+        batch = []
+        deadline = time.monotonic() + config['FLUSH_INTERVAL']
+
+        while not self._stop.is_set():
+            timeout = max(deadline - time.monotonic(), 0)
+            flush_request = None
+            try:
+                event = self._queue.get(timeout=timeout)
+                if isinstance(event, FlushRequest):
+                    flush_request = event
+                else:
+                    batch.append(event)
+            except queue.Empty:
+                pass
+
+            if flush_request is not None or len(batch) >= config['BATCH_SIZE'] or time.monotonic() >= deadline:
+                if batch:
+                    self._write(batch)
+                    batch = []
+                # Windows are only closed once their first rows are written
+                self.coalescer.flush_expired(force=flush_request is not None)
+                if flush_request is not None:
+                    flush_request.done.set()
+                deadline = time.monotonic() + config['FLUSH_INTERVAL']
+
+        if batch:
+            self._write(batch)
+
+    def _write(self, events):
+        from .models import ActivityLog
+
+        close_old_connections()
+        try:
+            rows = []
+            for event in events:
+                event = dict(event)
+                event['agent_id'] = user_agent_interner.resolve(event.pop('user_agent', ''))
+                rows.append(ActivityLog(**event))
+            ActivityLog.objects.bulk_create(rows)
+            self._count('written', len(events))
+            self._count('flushes')
+        except Exception:
+            self._count('failed', len(events))
+            logger.exception('Failed to write %d activity log(s)', len(events))
+
+    def flush(self, timeout=5):
+        """
+        Write everything queued so far, then close every coalescing window
+        (used at shutdown and by tests/commands). While the writer thread runs
+        the flush is handed to it, so the batch it already took is written
+        before the windows' hit counts are added to those rows.
+        """
+        if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+            flush_request = FlushRequest()
+            try:
+                self._queue.put(flush_request, timeout=timeout)
+            except queue.Full:
+                pass
+            else:
+                if flush_request.done.wait(timeout):
+                    return
+
+        if self._queue is not None and self._pid == os.getpid():
+            events = []
+            while True:
+                try:
+                    event = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if isinstance(event, FlushRequest):
+                    event.done.set()
+                else:
+                    events.append(event)
+            if events:
+                self._write(events)
+        self.coalescer.flush_expired(force=True)
+
+    def shutdown(self):
+        self._stop.set()
+        if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+            self._thread.join(timeout=5)
+        self.flush()
+
+    # --------------------------------------------------------
+    # Producer side
+    # --------------------------------------------------------
+    def _apply_policy(self, event, coalesce_key, config):
+        """Return True if the event should be written as a new row"""
+        policy = config['HIGH_FREQUENCY_ACTIONS'].get(event['action'])
+        if not policy or policy.get('POLICY', 'log') == 'log':
+            return True
+
+        mode = policy['POLICY']
+        if mode == 'drop':
+            self._count('policy_dropped')
+            return False
+        if mode == 'sample':
+            if random.random() >= policy.get('SAMPLE_RATE', 1.0):
+                self._count('sampled_out')
+                return False
+            return True
+
+        event['fingerprint'] = make_fingerprint(event, coalesce_key)
+        if not self.coalescer.admit(event, policy.get('WINDOW', 300)):
+            self._count('coalesced')
+            return False
+        return True
+
+    def submit(self, event, coalesce_key=None):
+        config = get_activity_log_settings()
+
+        if not self._apply_policy(event, coalesce_key, config):
+            if not config['ASYNC']:
+                self.coalescer.flush_expired()
+            return
+
+        if not config['ASYNC']:
+            self._count('sync_writes')
+            self._write([event])
+            self.coalescer.flush_expired()
+            return
+
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(event)
+            self._count('enqueued')
+        except queue.Full:
+            if config['ON_FULL'] == 'sync':
+                self._count('sync_writes')
+                self._write([event])
+            else:
+                self._count('dropped')
+
+    def _count(self, name, amount=1):
+        # Incremented by request threads and the writer thread
+        with self._metrics_lock:
+            self.metrics[name] += amount
+
+    def get_metrics(self):
+        with self._metrics_lock:
+            metrics = dict(self.metrics)
+        return {
+            **metrics,
+            'queue_depth': self._queue.qsize() if self._queue is not None else 0,
+            'queue_size': get_activity_log_settings()['QUEUE_SIZE'],
+        }
+
+
+activity_log_writer = ActivityLogWriter()
+atexit.register(activity_log_writer.shutdown)
+metrics_store.register_gauge(
+    'dus_activity_log_queue_depth', {}, lambda: activity_log_writer.get_metrics()['queue_depth']
+)
+
+
+# ============================================================
+# PUBLIC LOGGING HELPER
+# ============================================================
+def log_activity(action, entity_type, entity_id=None, entity_name='', description='', request=None, performed_by_user=None, performed_by_custom=None, coalesce_key=None, changes=None):
+    """
+    Helper function to create activity logs
+    Usage: log_activity('create', 'booking', booking.id, booking.client_name, 'Created new booking', request)
+    `coalesce_key` identifies repeated view/export events (e.g. the active filters);
+    the description is used when it is not given.
+    `changes` is an optional {field: [old, new]} diff of the affected entity.
+    """
+    try:
+        ip_address = get_client_ip(request) if request else None
+        user_agent = request.META.get('HTTP_USER_AGENT', '') if request else ''
+
+        activity_log_writer.submit({
+            'action': action,
+            'entity_type': entity_type,
+            'entity_id': entity_id,
+            'entity_name': entity_name,
+            'description': description,
+            'performed_by_user_id': getattr(performed_by_user, 'pk', None),
+            'performed_by_custom_id': getattr(performed_by_custom, 'pk', None),
+            'ip_address': ip_address,
+            'user_agent': user_agent,
+            'changes': changes or None,
+            'created_at': timezone.now(),
+        }, coalesce_key=coalesce_key)
+    except Exception:
+        # Don't break main functionality if logging fails
+        logger.exception('Activity logging error')
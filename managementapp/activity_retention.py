@@ -0,0 +1,180 @@
+from datetime import datetime, timedelta
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import transaction, close_old_connections
+from django.utils import timezone
+from threading import Thread
+import time
+from .models import ActivityLog, SystemState
+from .activity_archive import archive_logs
+from .activity_logger import log_activity
+
+
+# ============================================================
+# CHUNKED ACTIVITY LOG RETENTION
+# ============================================================
+RETENTION_STATE_KEY = 'activity_retention'
+
+DEFAULT_RETENTION_SETTINGS = {
+    'DAYS': 90,            # Keep this many days of activity logs
+    'BATCH_SIZE': 1000,    # Rows deleted per statement
+    'PAUSE': 0.1,          # Seconds to sleep between batches
+    'ARCHIVE': False,      # Archive each batch before deleting it
+}
+
+# A 'running' job without a heartbeat for this long is treated as dead
+STALE_AFTER = timedelta(minutes=5)
+
+
+class RetentionJobRunning(Exception):
+    """Raised when a retention job is already running"""
+    pass
+
+
+def get_retention_settings():
+    return {**DEFAULT_RETENTION_SETTINGS, **getattr(settings, 'ACTIVITY_LOG_RETENTION', {})}
+
+
+def get_retention_status():
+    state = SystemState.objects.filter(key=RETENTION_STATE_KEY).first()
+    return state.value if state else {'status': 'idle'}
+
+
+def _is_active(job):
+    if job.get('status') != 'running':
+        return False
+    heartbeat = job.get('heartbeat')
+    return bool(heartbeat) and timezone.now() - datetime.fromisoformat(heartbeat) < STALE_AFTER
+
+
+def _save_state(job):
+    """Persist progress without overwriting a cancellation requested meanwhile"""
+    with transaction.atomic():
+        state, _ = SystemState.objects.select_for_update().get_or_create(key=RETENTION_STATE_KEY)
+        if state.value.get('status') == 'cancelled' and job['status'] == 'running':
+            job['status'] = 'cancelled'
+        job['heartbeat'] = timezone.now().isoformat()
+        state.value = job
+        state.save()
+
+
+def start_retention_job(days=None, batch_size=None, pause=None, archive=None, resume=False, requested_by=None):
+    """
+    Register a new retention job (or resume an interrupted one) and return its state.
+    The cutoff is fixed when the job is created so a resumed job deletes the same range.
+    """
+    config = get_retention_settings()
+
+    with transaction.atomic():
+        state, _ = SystemState.objects.select_for_update().get_or_create(key=RETENTION_STATE_KEY)
+        job = state.value or {}
+
+        if _is_active(job):
+            raise RetentionJobRunning('A retention job is already running')
+
+        if resume and job.get('status') in ('running', 'failed', 'cancelled'):
+            job['status'] = 'running'
+            job['error'] = None
+        else:
+            days = config['DAYS'] if days is None else days
+            job = {
+                'status': 'running',
+                'days': days,
+                'cutoff': (timezone.now() - timedelta(days=days)).isoformat(),
+                'batch_size': batch_size or config['BATCH_SIZE'],
+                'pause': config['PAUSE'] if pause is None else pause,
+                'archive': config['ARCHIVE'] if archive is None else archive,
+                'requested_by_user_id': getattr(requested_by, 'pk', None),
+                'deleted': 0,
+                'archived': 0,
+                'batches': 0,
+                'started_at': timezone.now().isoformat(),
+                'finished_at': None,
+                'error': None,
+            }
+
+        job['heartbeat'] = timezone.now().isoformat()
+        state.value = job
+        state.save()
+
+    return job
+
+
+def run_retention_job(progress=None):
+    """
+    Delete activity logs older than the job cutoff in primary-key batches,
+    pausing between batches so regular inserts are never blocked for long.
+    `progress` is an optional callback receiving the job state after each batch.
+    """
+    job = get_retention_status()
+    if job.get('status') != 'running':
+        return job
+
+    cutoff = datetime.fromisoformat(job['cutoff'])
+
+    try:
+        while job['status'] == 'running':
+            batch = list(
+                ActivityLog.objects.filter(created_at__lt=cutoff)
+                .select_related('performed_by_user', 'performed_by_custom', 'agent')
+                .order_by('id')[:job['batch_size']]
+            )
+            if not batch:
+                job['status'] = 'completed'
+                break
+
+            if job['archive']:
+                job['archived'] += archive_logs(batch)
+
+            ids = [log.id for log in batch]
+            deleted = ActivityLog.objects.filter(id__in=ids).delete()[0]
+
+            job['deleted'] += deleted
+            job['batches'] += 1
+            _save_state(job)
+            if progress:
+                progress(job)
+
+            time.sleep(job['pause'])
+
+    except Exception as e:
+        job['status'] = 'failed'
+        job['error'] = str(e)
+
+    job['finished_at'] = timezone.now().isoformat()
+    _save_state(job)
+    if progress:
+        progress(job)
+
+    if job['status'] == 'completed':
+        log_activity(
+            'delete',
+            'system',
+            description=f'Cleared {job["deleted"]} activity logs older than {job["days"]} days',
+            performed_by_user=User.objects.filter(pk=job.get('requested_by_user_id')).first(),
+        )
+
+    return job
+
+
+def run_retention_job_in_background():
+    """Run the registered job on a daemon thread (used by the HTTP endpoint)"""
+    def target():
+        try:
+            run_retention_job()
+        finally:
+            close_old_connections()
+
+    thread = Thread(target=target, name='activity-retention', daemon=True)
+    thread.start()
+    return thread
+
+
+def cancel_retention_job():
+    with transaction.atomic():
+        state = SystemState.objects.select_for_update().filter(key=RETENTION_STATE_KEY).first()
+        if state and state.value.get('status') == 'running':
+            state.value = {**state.value, 'status': 'cancelled'}
+            state.save()
+    return get_retention_status()
+
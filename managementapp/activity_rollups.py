@@ -0,0 +1,237 @@
+from asgiref.sync import sync_to_async
+from collections import Counter
+from datetime import datetime, timedelta
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.db.models import Sum, Count
+from django.utils import timezone
+from authapp.models import CustomUser
+from .models import ActivityLog, ActivityHourlyRollup, SystemState
+from .async_utils import run_concurrently
+
+
+# ============================================================
+# HOURLY ACTIVITY ROLLUPS
+# ============================================================
+ROLLUP_STATE_KEY = 'activity_rollup'
+
+# Only roll up hours that ended at least this long ago, so events still
+# waiting in the batched writer queue are not missed.
+ROLLUP_GRACE = timedelta(minutes=2)
+
+# Hours before the watermark that every compaction rolls up again. Rows can be
+# inserted after their hour was rolled up (coalesced events are written when
+# their window closes, a writer backlog, the ON_FULL='sync' fallback); they are
+# counted once a later compaction re-rolls their hour.
+LATE_EVENT_WINDOW = timedelta(hours=6)
+
+# Upper bound on hours compacted inline by a stats request; the management
+# command has no limit and is used for backfills (run it once on first deploy).
+MAX_INLINE_HOURS = 48
+
+GROUP_FIELDS = ('action', 'entity_type', 'performed_by_user_id', 'performed_by_custom_id')
+
+
+def floor_hour(value):
+    """Start of the local hour containing `value` (local hours keep 'today' aligned)"""
+    return timezone.localtime(value).replace(minute=0, second=0, microsecond=0)
+
+
+def get_performer_key(user_id, custom_id):
+    if user_id:
+        return f'user_{user_id}'
+    if custom_id:
+        return f'custom_{custom_id}'
+    return 'system'
+
+
+def get_rollup_watermark():
+    """Everything before the returned datetime is available in the rollup table"""
+    state = SystemState.objects.filter(key=ROLLUP_STATE_KEY).first()
+    if state and state.value.get('rolled_up_until'):
+        return datetime.fromisoformat(state.value['rolled_up_until'])
+    return None
+
+
+def get_rollup_cutoff():
+    """End of the last hour that is complete enough to be rolled up"""
+    return floor_hour(timezone.now() - ROLLUP_GRACE)
+
+
+def is_rollup_stale():
+    watermark = get_rollup_watermark()
+    return watermark is None or watermark < get_rollup_cutoff()
+
+
+def compact_activity_rollups(max_hours=None, rebuild=False, wait=True):
+    """
+    Aggregate complete hours of raw activity logs into ActivityHourlyRollup,
+    re-rolling the LATE_EVENT_WINDOW before the watermark.
+    Idempotent: buckets in the processed range are replaced.
+    With wait=False, returns 0 at once if another process is compacting
+    instead of queueing behind its lock.
+    Returns the number of hours processed.
+    """
+    cutoff = get_rollup_cutoff()
+    # skip_locked only skips existing rows
+    SystemState.objects.get_or_create(key=ROLLUP_STATE_KEY)
+    skip_locked = not wait and connection.features.has_select_for_update_skip_locked
+
+    with transaction.atomic():
+        state = SystemState.objects.select_for_update(skip_locked=skip_locked).filter(key=ROLLUP_STATE_KEY).first()
+        if state is None:
+            return 0
+
+        watermark = None
+        if not rebuild and state.value.get('rolled_up_until'):
+            watermark = datetime.fromisoformat(state.value['rolled_up_until'])
+        if watermark is not None:
+            start = watermark - LATE_EVENT_WINDOW
+        else:
+            first_log = ActivityLog.objects.order_by('created_at').values_list('created_at', flat=True).first()
+            watermark = start = floor_hour(first_log) if first_log else cutoff
+
+        end = cutoff
+        if max_hours is not None:
+            end = min(cutoff, watermark + timedelta(hours=max_hours))
+        if end <= watermark:
+            return 0
+
+        counts = Counter()
+        rows = ActivityLog.objects.filter(created_at__gte=start, created_at__lt=end) \
+            .order_by().values_list('created_at', *GROUP_FIELDS).iterator(chunk_size=2000)
+        for created_at, action, entity_type, user_id, custom_id in rows:
+            counts[(floor_hour(created_at), action, entity_type, user_id, custom_id)] += 1
+
+        if rebuild:
+            ActivityHourlyRollup.objects.filter(hour__lt=end).delete()
+        else:
+            ActivityHourlyRollup.objects.filter(hour__gte=start, hour__lt=end).delete()
+
+        ActivityHourlyRollup.objects.bulk_create([
+            ActivityHourlyRollup(
+                hour=hour,
+                action=action,
+                entity_type=entity_type,
+                performer_key=get_performer_key(user_id, custom_id),
+                performed_by_user_id=user_id,
+                performed_by_custom_id=custom_id,
+                count=count,
+            )
+            for (hour, action, entity_type, user_id, custom_id), count in counts.items()
+        ], batch_size=1000)
+
+        state.value = {**state.value, 'rolled_up_until': end.isoformat()}
+        state.save()
+
+    return int((end - start).total_seconds() // 3600)
+
+
+def get_stats_queries(days):
+    """
+    The four independent queries behind the stats for the last `days` days
+    (window start rounded down to the hour), as callables: grouped rollup rows,
+    grouped raw rows, today's rollup total and today's raw count.
+    Complete hours come from the rollup table, the rest from raw rows.
+    """
+    now = timezone.now()
+    window_start = floor_hour(now - timedelta(days=days))
+    today_start = timezone.localtime(now).replace(hour=0, minute=0, second=0, microsecond=0)
+    raw_from = max(get_rollup_watermark() or window_start, window_start)
+
+    rollups = ActivityHourlyRollup.objects.filter(hour__gte=window_start, hour__lt=raw_from)
+    raw_logs = ActivityLog.objects.filter(created_at__gte=raw_from)
+
+    # One grouped query per source, merged in python
+    return (
+        lambda: list(rollups.values(*GROUP_FIELDS).annotate(total=Sum('count')).order_by()),
+        lambda: list(raw_logs.values(*GROUP_FIELDS).annotate(total=Count('id')).order_by()),
+        lambda: rollups.filter(hour__gte=today_start).aggregate(total=Sum('count'))['total'] or 0,
+        lambda: raw_logs.filter(created_at__gte=today_start).count(),
+    )
+
+
+def count_stats(rollup_rows, raw_rows):
+    """Merge the grouped rows into per action / entity / performer counters"""
+    totals = Counter()
+    for row in rollup_rows:
+        totals[tuple(row[field] for field in GROUP_FIELDS)] += row['total']
+    for row in raw_rows:
+        totals[tuple(row[field] for field in GROUP_FIELDS)] += row['total']
+
+    counts = {'total': sum(totals.values()), 'action': Counter(), 'entity': Counter(), 'user': Counter(), 'custom': Counter()}
+    for (action, entity_type, user_id, custom_id), total in totals.items():
+        counts['action'][action] += total
+        counts['entity'][entity_type] += total
+        if user_id:
+            counts['user'][user_id] += total
+        if custom_id:
+            counts['custom'][custom_id] += total
+    return counts
+
+
+def get_top_performer_queries(counts):
+    """Name lookups for the five most active admins and custom users, as callables"""
+    top_user_ids = [user_id for user_id, _ in counts['user'].most_common(5)]
+    top_custom_ids = [custom_id for custom_id, _ in counts['custom'].most_common(5)]
+    return (
+        lambda: User.objects.only('username', 'first_name', 'last_name').in_bulk(top_user_ids),
+        lambda: CustomUser.objects.only('full_name').in_bulk(top_custom_ids),
+    )
+
+
+def format_stats(counts, today_activities, users, custom_users):
+    top_admin_users = [
+        {
+            'performed_by_user__username': users[user_id].username,
+            'performed_by_user__first_name': users[user_id].first_name,
+            'performed_by_user__last_name': users[user_id].last_name,
+            'count': count,
+        }
+        for user_id, count in counts['user'].most_common(5) if user_id in users
+    ]
+
+    top_custom_users = [
+        {
+            'performed_by_custom__full_name': custom_users[custom_id].full_name,
+            'count': count,
+        }
+        for custom_id, count in counts['custom'].most_common(5) if custom_id in custom_users
+    ]
+
+    return {
+        'total_activities': counts['total'],
+        'today_activities': today_activities,
+        'action_stats': [{'action': action, 'count': count} for action, count in counts['action'].items()],
+        'entity_stats': [{'entity_type': entity, 'count': count} for entity, count in counts['entity'].items()],
+        'top_admin_users': top_admin_users,
+        'top_custom_users': top_custom_users,
+    }
+
+
+def compact_if_stale():
+    """Inline compaction for stats requests: only once per hour, never waiting for another compaction"""
+    if is_rollup_stale():
+        compact_activity_rollups(max_hours=MAX_INLINE_HOURS, wait=False)
+
+
+def get_rollup_stats(days):
+    """Activity statistics for the last `days` days (see get_stats_queries)"""
+    compact_if_stale()
+
+    rollup_rows, raw_rows, rollup_today, raw_today = [query() for query in get_stats_queries(days)]
+    counts = count_stats(rollup_rows, raw_rows)
+    users, custom_users = [query() for query in get_top_performer_queries(counts)]
+    return format_stats(counts, rollup_today + raw_today, users, custom_users)
+
+
+async def aget_rollup_stats(days):
+    """get_rollup_stats for async views: the independent queries run concurrently"""
+    await sync_to_async(compact_if_stale)()
+
+    # Building the queries reads the rollup watermark
+    queries = await sync_to_async(get_stats_queries)(days)
+    rollup_rows, raw_rows, rollup_today, raw_today = await run_concurrently(*queries)
+    counts = count_stats(rollup_rows, raw_rows)
+    users, custom_users = await run_concurrently(*get_top_performer_queries(counts))
+    return format_stats(counts, rollup_today + raw_today, users, custom_users)
@@ -0,0 +1,49 @@
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections
+import asyncio
+import itertools
+
+
+# ============================================================
+# CONCURRENT QUERIES FOR ASYNC VIEWS
+# ============================================================
+def _run_in_worker_thread(func):
+    # Worker threads live outside the request cycle, so they expire their own
+    # connections the way request_started / request_finished do (CONN_MAX_AGE)
+    close_old_connections()
+    try:
+        return func()
+    finally:
+        close_old_connections()
+
+
+async def run_concurrently(*funcs):
+    """
+    Run independent blocking ORM calls (e.g. aggregates over the same filters) in
+    parallel worker threads, each with its own database connection.
+    Django's async ORM methods (acount, aaggregate, ...) all share the one
+    thread-sensitive thread, so gathering them would still run them one by one.
+    Returns the results in argument order.
+    """
+    return await asyncio.gather(*(
+        sync_to_async(_run_in_worker_thread, thread_sensitive=False)(func) for func in funcs
+    ))
+
+
+# ============================================================
+# ASYNC STREAMING OF BLOCKING ITERATORS
+# ============================================================
+async def aiter_blocking(iterator, batch_size=256):
+    """
+    Async iterator over a blocking (e.g. ORM-backed) iterator, advanced in the
+    thread-sensitive thread a batch at a time. Lets StreamingHttpResponse stream
+    under ASGI, where a sync iterator would be consumed whole before sending.
+    """
+    iterator = iter(iterator)
+    next_batch = sync_to_async(lambda: list(itertools.islice(iterator, batch_size)))
+    while True:
+        batch = await next_batch()
+        if not batch:
+            return
+        for item in batch:
+            yield item
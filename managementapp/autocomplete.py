@@ -0,0 +1,138 @@
+from bisect import bisect_left, insort
+from threading import Lock
+import time
+
+from django.db.models import Count
+
+
+# ============================================================
+# IN-MEMORY PREFIX INDEX FOR BOOKING FORM AUTOCOMPLETE
+# ============================================================
+AUTOCOMPLETE_FIELDS = ('client_name', 'menu_type')
+
+# Rebuild from the database after this many seconds so that writes made by
+# other worker processes eventually show up in this process too.
+REBUILD_INTERVAL_SECONDS = 600
+
+
+class PrefixIndex:
+    """
+    Case-insensitive prefix index backed by a sorted list and bisect.
+    Keeps a usage count per value so the most common spelling wins.
+    """
+
+    def __init__(self):
+        self._keys = []        # sorted list of (lowercase_value, value)
+        self._counts = {}      # value -> number of bookings using it
+
+    def add(self, value, count=1):
+        value = (value or '').strip()
+        if not value:
+            return
+        if value not in self._counts:
+            insort(self._keys, (value.lower(), value))
+            self._counts[value] = 0
+        self._counts[value] += count
+
+    def remove(self, value):
+        value = (value or '').strip()
+        if value not in self._counts:
+            return
+        self._counts[value] -= 1
+        if self._counts[value] <= 0:
+            del self._counts[value]
+            position = bisect_left(self._keys, (value.lower(), value))
+            if position < len(self._keys) and self._keys[position][1] == value:
+                del self._keys[position]
+
+    def search(self, prefix, limit=8):
+        prefix = (prefix or '').strip().lower()
+        if not prefix:
+            return []
+
+        matches = []
+        position = bisect_left(self._keys, (prefix, ''))
+        while position < len(self._keys) and self._keys[position][0].startswith(prefix):
+            matches.append(self._keys[position][1])
+            position += 1
+
+        matches.sort(key=lambda value: (-self._counts[value], value.lower()))
+        return matches[:limit]
+
+
+class BookingAutocomplete:
+    """
+    Lazily built prefix indexes for the booking form text fields. Rebuilds run
+    outside the lock (one thread at a time) while requests keep using the
+    previous indexes; until the first build finishes, suggestions are empty.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._indexes = {}
+        self._built_at = None
+        self._building = False
+
+    def _build_indexes(self):
+        from .models import Booking
+
+        indexes = {}
+        for field in AUTOCOMPLETE_FIELDS:
+            index = PrefixIndex()
+            rows = Booking.objects.exclude(**{f'{field}__isnull': True}).exclude(**{field: ''}) \
+                .values(field).annotate(count=Count('id')).order_by()
+            for row in rows:
+                index.add(row[field], row['count'])
+            indexes[field] = index
+        return indexes
+
+    def _refresh_if_stale(self):
+        with self._lock:
+            stale = self._built_at is None or time.monotonic() - self._built_at > REBUILD_INTERVAL_SECONDS
+            if not stale or self._building:
+                return
+            self._building = True
+
+        started = time.monotonic()
+        try:
+            indexes = self._build_indexes()
+        except BaseException:
+            with self._lock:
+                self._building = False
+            raise
+        with self._lock:
+            self._indexes = indexes
+            self._built_at = started
+            self._building = False
+
+    def suggest(self, field, query, limit=8):
+        self._refresh_if_stale()
+        with self._lock:
+            index = self._indexes.get(field)
+            return index.search(query, limit) if index is not None else []
+
+    def record_booking(self, booking, previous=None):
+        """Update indexes after a booking write. `previous` holds the old field values on update."""
+        with self._lock:
+            if self._built_at is None:
+                return  # Nothing built yet, the lazy build will pick it up
+            for field in AUTOCOMPLETE_FIELDS:
+                if previous is not None:
+                    self._indexes[field].remove(previous.get(field))
+                self._indexes[field].add(getattr(booking, field))
+
+    def forget_booking(self, booking):
+        """Update indexes after a booking is deleted"""
+        with self._lock:
+            if self._built_at is None:
+                return
+            for field in AUTOCOMPLETE_FIELDS:
+                self._indexes[field].remove(getattr(booking, field))
+
+    def reset(self):
+        with self._lock:
+            self._indexes = {}
+            self._built_at = None
+
+
+booking_autocomplete = BookingAutocomplete()
@@ -0,0 +1,87 @@
+from django.db.models import DecimalField
+from .models import Booking, ActivityLog
+
+
+# ============================================================
+# BOOKING FIELD DIFFS
+# ============================================================
+# Fields whose changes are recorded on the booking's activity log rows
+TRACKED_BOOKING_FIELDS = (
+    'client_name', 'booking_date', 'start_time', 'end_time', 'phone_number', 'email',
+    'event_type', 'menu_type', 'no_of_packs', 'advance_given',
+)
+
+
+def _json_value(field, value):
+    """
+    JSON-friendly value as the field stores it, so a value assigned from the
+    request compares equal to the one read back (10 vs '10' in a CharField,
+    '10:00' vs time(10, 0), 500.0 vs Decimal('500.00')).
+    """
+    if value is None:
+        return None
+    if isinstance(field, DecimalField):
+        return f'{field.to_python(str(value)):.{field.decimal_places}f}'
+    value = field.to_python(value)
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return value
+
+
+def snapshot_booking(booking):
+    """Tracked field values of an already loaded booking (no query)"""
+    return {
+        name: _json_value(Booking._meta.get_field(name), getattr(booking, name))
+        for name in TRACKED_BOOKING_FIELDS
+    }
+
+
+def diff_snapshots(before, after):
+    """
+    Compact diff of the changed fields only: {field: [old, new]}.
+    Pass before=None for a creation and after=None for a deletion.
+    """
+    before = before or {}
+    after = after or {}
+    return {
+        name: [before.get(name), after.get(name)]
+        for name in TRACKED_BOOKING_FIELDS
+        if before.get(name) != after.get(name)
+    }
+
+
+# ============================================================
+# POINT-IN-TIME REPLAY
+# ============================================================
+def replay_booking(booking_id, at):
+    """
+    Rebuild a booking's tracked fields as they were at `at` (aware datetime).
+    Starts from the current row (or the snapshot stored on its delete log) and
+    undoes, newest first, every logged diff made after `at`.
+    Returns (state or None if the booking did not exist at `at`, applied log rows).
+    """
+    history = list(
+        ActivityLog.objects.filter(entity_type='booking', entity_id=booking_id, changes__isnull=False)
+        .only('id', 'action', 'changes', 'created_at')
+        .order_by('created_at', 'id')
+    )
+
+    booking = Booking.objects.filter(id=booking_id).first()
+    if booking is not None:
+        if at < booking.created_at:
+            return None, []
+        state = snapshot_booking(booking)
+    elif history and history[-1].action == 'delete':
+        if history[-1].created_at <= at:
+            return None, history
+        state = {name: old for name, (old, new) in history[-1].changes.items()}
+    else:
+        return None, []
+
+    for log in reversed([log for log in history if log.created_at > at]):
+        if log.action == 'create':
+            return None, []
+        for name, (old, new) in log.changes.items():
+            state[name] = old
+
+    return state, [log for log in history if log.created_at <= at]
@@ -0,0 +1,132 @@
+from datetime import date, timedelta
+from django.core.cache import cache
+from django.db.models import Count, Sum, Q
+from authapp.models import CustomUser
+from authapp.user_directory import get_user_name_map
+from .models import Booking
+
+
+# ============================================================
+# CACHED DASHBOARD BUNDLES
+# ============================================================
+DASHBOARD_CACHE_TIMEOUT = 300
+RECENT_BOOKINGS_LIMIT = 5
+UPCOMING_BOOKINGS_LIMIT = 10
+
+BOOKING_FIELDS = ('id', 'client_name', 'event_type', 'booking_date', 'start_time', 'advance_given')
+
+
+def _admin_key():
+    # Keyed by day so the "upcoming this week" window rolls over at midnight
+    return f'dashboard:admin:{date.today()}'
+
+
+def _user_key(custom_user_id):
+    return f'dashboard:user:{custom_user_id}:{date.today()}'
+
+
+def _get_creator_name(row):
+    """Same wording as Booking.get_creator_name() for a values() row"""
+    if row['created_by_user_id']:
+        full_name = f"{row['created_by_user__first_name']} {row['created_by_user__last_name']}".strip()
+        return f"{full_name or row['created_by_user__username']} (Admin)"
+    if row['created_by_custom_id']:
+        return f"{row['created_by_custom__full_name']} (User)"
+    return "System"
+
+
+def _booking_rows(queryset, with_creator=False):
+    fields = BOOKING_FIELDS
+    if with_creator:
+        fields += (
+            'created_by_user_id', 'created_by_custom_id', 'created_by_user__username',
+            'created_by_user__first_name', 'created_by_user__last_name', 'created_by_custom__full_name',
+        )
+    rows = list(queryset.values(*fields))
+    if with_creator:
+        for row in rows:
+            row['created_by'] = _get_creator_name(row)
+    return rows
+
+
+def _booking_kpis(bookings, today):
+    """Totals plus this week's count, in one aggregate query"""
+    week_end = today + timedelta(days=6)
+    return bookings.aggregate(
+        total_bookings=Count('id'),
+        total_advance=Sum('advance_given'),
+        upcoming_count=Count('id', filter=Q(booking_date__gte=today, booking_date__lte=week_end)),
+    )
+
+
+def get_admin_dashboard():
+    """KPIs, recent bookings and bookings in the next 7 days for admins (cached)"""
+    bundle = cache.get(_admin_key())
+    if bundle is not None:
+        return bundle
+
+    today = date.today()
+    bookings = Booking.objects.all()
+    kpis = _booking_kpis(bookings, today)
+
+    bundle = {
+        'total_bookings': kpis['total_bookings'],
+        'total_advance': kpis['total_advance'] or 0,
+        'total_users': len(get_user_name_map()),
+        'upcoming_count': kpis['upcoming_count'],
+        'recent_bookings': _booking_rows(bookings.order_by('-created_at')[:RECENT_BOOKINGS_LIMIT], with_creator=True),
+        'upcoming_bookings': _booking_rows(
+            bookings.filter(booking_date__gte=today, booking_date__lte=today + timedelta(days=6))
+            .order_by('booking_date', 'start_time')[:UPCOMING_BOOKINGS_LIMIT],
+            with_creator=True
+        ),
+    }
+    cache.set(_admin_key(), bundle, DASHBOARD_CACHE_TIMEOUT)
+    return bundle
+
+
+def get_user_dashboard(custom_user_id):
+    """Profile, KPIs, recent and upcoming bookings of one custom user (cached), None if the user is gone"""
+    key = _user_key(custom_user_id)
+    bundle = cache.get(key)
+    if bundle is not None:
+        return bundle
+
+    profile = CustomUser.objects.filter(id=custom_user_id).values(
+        'full_name', 'login_email', 'created_at', 'updated_at'
+    ).first()
+    if profile is None:
+        return None
+
+    today = date.today()
+    bookings = Booking.objects.filter(created_by_custom_id=custom_user_id)
+    kpis = _booking_kpis(bookings, today)
+
+    bundle = {
+        'full_name': profile['full_name'],
+        'email': profile['login_email'],
+        'created_at': profile['created_at'],
+        'updated_at': profile['updated_at'],
+        'total_bookings': kpis['total_bookings'],
+        'total_advance': kpis['total_advance'] or 0,
+        'upcoming_count': kpis['upcoming_count'],
+        'recent_bookings': _booking_rows(bookings.order_by('-created_at')[:RECENT_BOOKINGS_LIMIT]),
+        'upcoming_bookings': _booking_rows(
+            bookings.filter(booking_date__gte=today, booking_date__lte=today + timedelta(days=6))
+            .order_by('booking_date', 'start_time')[:UPCOMING_BOOKINGS_LIMIT]
+        ),
+    }
+    cache.set(key, bundle, DASHBOARD_CACHE_TIMEOUT)
+    return bundle
+
+
+def invalidate_dashboards(booking=None, custom_user_id=None):
+    """
+    Drop the admin bundle and the affected custom user's bundle.
+    Call after a booking is created/updated/deleted or a custom user changes.
+    """
+    keys = [_admin_key()]
+    custom_user_id = custom_user_id or getattr(booking, 'created_by_custom_id', None)
+    if custom_user_id:
+        keys.append(_user_key(custom_user_id))
+    cache.delete_many(keys)
@@ -0,0 +1,87 @@
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management.base import BaseCommand
+from dus_reception.cache_backends import SQLiteCache
+import multiprocessing
+import os
+import tempfile
+import time
+
+
+def build_backends(path, max_entries):
+    options = {'OPTIONS': {'MAX_ENTRIES': max_entries}}
+    return {
+        'LocMem': LocMemCache('benchmark', options),
+        'SQLite': SQLiteCache(path, options),
+    }
+
+
+def increment_many(backend, key, times):
+    for _ in range(times):
+        backend.incr(key)
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark the shared SQLite cache backend against LocMemCache '
+        '(per-operation latency) and check that counters and invalidations '
+        'are shared across worker processes'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--operations', type=int, default=5000, help='Operations per measurement')
+        parser.add_argument('--processes', type=int, default=4, help='Worker processes for the cross-process check')
+        parser.add_argument('--max-entries', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        operations = options['operations']
+        with tempfile.TemporaryDirectory() as directory:
+            backends = build_backends(os.path.join(directory, 'cache.sqlite3'), options['max_entries'])
+            payload = {'bookings': [{'id': i, 'client_name': f'Client {i}', 'advance_given': '1000.00'} for i in range(20)]}
+
+            self.stdout.write(self.style.MIGRATE_HEADING('Latency per operation (microseconds)'))
+            self.stdout.write(f'  {"operation":<14}' + ''.join(f'{name:>12}' for name in backends))
+            measurements = {
+                'get (hit)': lambda backend, i: backend.get(f'key:{i % 500}'),
+                'get (miss)': lambda backend, i: backend.get(f'missing:{i}'),
+                'set': lambda backend, i: backend.set(f'key:{i % 500}', payload),
+                'get_many(10)': lambda backend, i: backend.get_many([f'key:{(i + n) % 500}' for n in range(10)]),
+                'incr': lambda backend, i: backend.incr('counter'),
+            }
+            for backend in backends.values():
+                for i in range(500):
+                    backend.set(f'key:{i}', payload)
+                backend.set('counter', 0)
+
+            for label, operation in measurements.items():
+                row = f'  {label:<14}'
+                for backend in backends.values():
+                    started = time.perf_counter()
+                    for i in range(operations):
+                        operation(backend, i)
+                    row += f'{(time.perf_counter() - started) / operations * 1e6:>12.1f}'
+                self.stdout.write(row)
+
+            self.check_cross_process(backends, options['processes'], max(1, operations // 10))
+
+    def check_cross_process(self, backends, processes, increments):
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f'Cross-process: {processes} processes x {increments} incr() of one counter'
+        ))
+        context = multiprocessing.get_context('fork')
+        for name, backend in backends.items():
+            backend.set('shared_counter', 0, timeout=None)
+            workers = [
+                context.Process(target=increment_many, args=(backend, 'shared_counter', increments))
+                for _ in range(processes)
+            ]
+            started = time.perf_counter()
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+            elapsed = time.perf_counter() - started
+
+            expected = processes * increments
+            seen = backend.get('shared_counter')
+            status = self.style.SUCCESS('shared') if seen == expected else self.style.WARNING('not shared')
+            self.stdout.write(f'  {name:<8} parent sees {seen:>7} of {expected} ({status}, {elapsed:.2f}s)')
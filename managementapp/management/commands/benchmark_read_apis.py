@@ -0,0 +1,181 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from django.contrib.auth.models import User
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from threading import BoundedSemaphore, Lock
+from authapp.jwt_auth import get_admin_tokens
+import asyncio
+import io
+import statistics
+import sys
+import time
+
+
+def get_default_paths():
+    today = date.today()
+    return [
+        f'/api/calendar-data/?year={today.year}&month={today.month}',
+        f'/api/bookings/date/{today:%Y-%m-%d}/',
+        '/api/reports/?page=1&per_page=20',
+        '/activity/logs/?page=1&per_page=20',
+        '/activity/stats/?days=30',
+    ]
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare throughput of the read-heavy APIs served through the WSGI handler '
+        '(a fixed pool of sync workers) and the ASGI handler (one event loop), '
+        'with N concurrent clients. Both run in this process against the configured '
+        'database; for production numbers point a load generator at real servers.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, default=50, help='Concurrent clients')
+        parser.add_argument('--requests', type=int, default=500, help='Requests per handler and path')
+        parser.add_argument('--wsgi-workers', type=int, default=4, help='Sync workers (threads) serving WSGI requests')
+        parser.add_argument('--username', default=None, help='Admin user to authenticate as (default: first superuser)')
+        parser.add_argument('--path', action='append', dest='paths', help='Path to request (repeatable, default: all read APIs)')
+        parser.add_argument('--handler', choices=('wsgi', 'asgi', 'both'), default='both')
+
+    def handle(self, *args, **options):
+        users = User.objects.filter(is_superuser=True) if not options['username'] else User.objects.filter(username=options['username'])
+        user = users.order_by('id').first()
+        if user is None:
+            raise CommandError('No admin user to authenticate as')
+
+        # Bearer auth keeps session writes out of the measurement
+        authorization = f'Bearer {get_admin_tokens(user)["access"]}'
+        paths = options['paths'] or get_default_paths()
+
+        for path in paths:
+            self.stdout.write(self.style.MIGRATE_HEADING(path))
+            if options['handler'] in ('wsgi', 'both'):
+                self.report('WSGI', *self.run_wsgi(path, authorization, options))
+            if options['handler'] in ('asgi', 'both'):
+                self.report('ASGI', *asyncio.run(self.run_asgi(path, authorization, options)))
+
+    def report(self, label, elapsed, latencies, failures):
+        latencies.sort()
+        p95 = latencies[int(len(latencies) * 0.95) - 1] if latencies else 0
+        self.stdout.write(
+            f'  {label}: {len(latencies) / elapsed:8.1f} req/s   '
+            f'median {statistics.median(latencies) * 1000 if latencies else 0:7.1f} ms   '
+            f'p95 {p95 * 1000:7.1f} ms   failures {failures}'
+        )
+
+    # ============================================================
+    # WSGI: clients queue for a fixed number of sync workers
+    # ============================================================
+    def run_wsgi(self, path, authorization, options):
+        handler = WSGIHandler()
+        route, _, query = path.partition('?')
+
+        def call():
+            environ = {
+                'REQUEST_METHOD': 'GET',
+                'PATH_INFO': route,
+                'QUERY_STRING': query,
+                'SERVER_NAME': 'localhost',
+                'SERVER_PORT': '80',
+                'REMOTE_ADDR': '127.0.0.1',
+                'HTTP_AUTHORIZATION': authorization,
+                'wsgi.input': io.BytesIO(),
+                'wsgi.errors': sys.stderr,
+                'wsgi.url_scheme': 'http',
+                'wsgi.version': (1, 0),
+                'wsgi.multithread': True,
+                'wsgi.multiprocess': False,
+                'wsgi.run_once': False,
+            }
+            statuses = []
+            response = handler(environ, lambda status, headers, exc_info=None: statuses.append(status))
+            try:
+                b''.join(response)
+            finally:
+                response.close()
+            return statuses[0].startswith('200')
+
+        # Each client waits for a free worker, like a request queued in front of sync workers
+        workers = BoundedSemaphore(options['wsgi_workers'])
+        lock = Lock()
+        remaining = options['requests']
+        latencies = []
+        failures = 0
+
+        def client():
+            nonlocal remaining, failures
+            while True:
+                with lock:
+                    if remaining <= 0:
+                        return
+                    remaining -= 1
+                started = time.perf_counter()
+                with workers:
+                    ok = call()
+                with lock:
+                    latencies.append(time.perf_counter() - started)
+                    failures += 0 if ok else 1
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['clients']) as pool:
+            for _ in range(options['clients']):
+                pool.submit(client)
+        return time.perf_counter() - started, latencies, failures
+
+    # ============================================================
+    # ASGI: every client is a task on one event loop
+    # ============================================================
+    async def run_asgi(self, path, authorization, options):
+        handler = ASGIHandler()
+        route, _, query = path.partition('?')
+        remaining = options['requests']
+        latencies = []
+        failures = 0
+
+        async def call():
+            scope = {
+                'type': 'http',
+                'asgi': {'version': '3.0'},
+                'http_version': '1.1',
+                'method': 'GET',
+                'scheme': 'http',
+                'path': route,
+                'raw_path': route.encode(),
+                'query_string': query.encode(),
+                'root_path': '',
+                'headers': [(b'host', b'localhost'), (b'authorization', authorization.encode())],
+                'client': ('127.0.0.1', 0),
+                'server': ('localhost', 80),
+            }
+            messages = iter([{'type': 'http.request', 'body': b'', 'more_body': False}])
+            status = []
+
+            async def receive():
+                message = next(messages, None)
+                if message is None:
+                    # The client never disconnects; the handler cancels this wait when done
+                    await asyncio.Event().wait()
+                return message
+
+            async def send(message):
+                if message['type'] == 'http.response.start':
+                    status.append(message['status'])
+
+            started = time.perf_counter()
+            await handler(scope, receive, send)
+            return time.perf_counter() - started, status == [200]
+
+        async def client():
+            nonlocal remaining, failures
+            while remaining > 0:
+                remaining -= 1
+                latency, ok = await call()
+                latencies.append(latency)
+                failures += 0 if ok else 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(client() for _ in range(options['clients'])))
+        return time.perf_counter() - started, latencies, failures
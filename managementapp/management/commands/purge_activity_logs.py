@@ -0,0 +1,59 @@
+import argparse
+from django.core.management.base import BaseCommand, CommandError
+from managementapp.activity_retention import (
+    start_retention_job, run_retention_job, cancel_retention_job,
+    get_retention_status, RetentionJobRunning
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Delete old activity logs in bounded primary-key batches. '
+        'Safe to schedule daily from cron; an interrupted run can be continued with --resume.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=None, help='Keep this many days of logs')
+        parser.add_argument('--batch-size', type=int, default=None, help='Rows deleted per batch')
+        parser.add_argument('--pause', type=float, default=None, help='Seconds to sleep between batches')
+        parser.add_argument(
+            '--archive', action=argparse.BooleanOptionalAction, default=None,
+            help='Archive each batch before deleting it (default: the ARCHIVE setting)'
+        )
+        parser.add_argument('--resume', action='store_true', help='Continue an interrupted job with its original cutoff')
+        parser.add_argument('--status', action='store_true', help='Show the current job state and exit')
+        parser.add_argument('--cancel', action='store_true', help='Ask a running job to stop after its current batch')
+
+    def handle(self, *args, **options):
+        if options['status']:
+            self.stdout.write(str(get_retention_status()))
+            return
+
+        if options['cancel']:
+            self.stdout.write(str(cancel_retention_job()))
+            return
+
+        try:
+            job = start_retention_job(
+                days=options['days'],
+                batch_size=options['batch_size'],
+                pause=options['pause'],
+                archive=options['archive'],
+                resume=options['resume'],
+            )
+        except RetentionJobRunning as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(f'Deleting activity logs older than {job["cutoff"]} in batches of {job["batch_size"]}')
+
+        def progress(state):
+            self.stdout.write(f'  batches={state["batches"]} deleted={state["deleted"]} archived={state["archived"]}')
+
+        job = run_retention_job(progress=progress)
+
+        if job['status'] == 'completed':
+            self.stdout.write(self.style.SUCCESS(f'Deleted {job["deleted"]} activity logs'))
+        elif job['status'] == 'failed':
+            raise CommandError(f'Retention job failed: {job["error"]} (re-run with --resume)')
+        else:
+            self.stdout.write(self.style.WARNING(f'Retention job {job["status"]} after deleting {job["deleted"]} logs'))
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from managementapp.activity_rollups import compact_activity_rollups
+
+
+class Command(BaseCommand):
+    help = 'Aggregate complete hours of activity logs into the hourly rollup table'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rebuild',
+            action='store_true',
+            help='Recompute all rollups from the raw activity logs',
+        )
+        parser.add_argument(
+            '--max-hours',
+            type=int,
+            default=None,
+            help='Process at most this many hours in this run',
+        )
+
+    def handle(self, *args, **options):
+        hours = compact_activity_rollups(max_hours=options['max_hours'], rebuild=options['rebuild'])
+        self.stdout.write(self.style.SUCCESS(f'Rolled up {hours} hour(s) of activity logs'))
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-19 01:07
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('managementapp', '0003_booking_menu_type_booking_no_of_packs_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='activitylog',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
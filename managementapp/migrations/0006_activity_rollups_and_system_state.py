@@ -0,0 +1,51 @@
+# Generated by Django 5.2.18 on 2026-10-19 01:10
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authapp', '0001_initial'),
+        ('managementapp', '0005_activitylog_coalescing'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SystemState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=100, unique=True)),
+                ('value', models.JSONField(blank=True, default=dict)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'System State',
+                'verbose_name_plural': 'System State',
+                'db_table': 'system_state',
+            },
+        ),
+        migrations.CreateModel(
+            name='ActivityHourlyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hour', models.DateTimeField()),
+                ('action', models.CharField(max_length=50)),
+                ('entity_type', models.CharField(max_length=50)),
+                ('performer_key', models.CharField(max_length=50)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('performed_by_custom', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='activity_rollups', to='authapp.customuser')),
+                ('performed_by_user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='activity_rollups', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Activity Hourly Rollup',
+                'verbose_name_plural': 'Activity Hourly Rollups',
+                'db_table': 'activity_hourly_rollups',
+                'ordering': ['-hour'],
+                'constraints': [models.UniqueConstraint(fields=('hour', 'action', 'entity_type', 'performer_key'), name='unique_activity_rollup_bucket')],
+            },
+        ),
+    ]
@@ -0,0 +1,78 @@
+# Generated by Django 5.2.18 on 2026-10-19 01:13
+
+import hashlib
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+BATCH_SIZE = 1000
+
+
+def intern_existing_user_agents(apps, schema_editor):
+    """Point existing activity logs at interned user agents, one id batch at a time"""
+    ActivityLog = apps.get_model('managementapp', 'ActivityLog')
+    UserAgent = apps.get_model('managementapp', 'UserAgent')
+
+    interned = {}
+    last_id = 0
+    while True:
+        batch = list(
+            ActivityLog.objects.filter(id__gt=last_id)
+            .order_by('id')
+            .values_list('id', 'user_agent')[:BATCH_SIZE]
+        )
+        if not batch:
+            break
+        last_id = batch[-1][0]
+
+        ids_by_agent = {}
+        for log_id, user_agent in batch:
+            if user_agent:
+                ids_by_agent.setdefault(user_agent, []).append(log_id)
+
+        for user_agent, ids in ids_by_agent.items():
+            if user_agent not in interned:
+                value_hash = hashlib.sha1(user_agent.encode()).hexdigest()
+                agent, _ = UserAgent.objects.get_or_create(value_hash=value_hash, defaults={'value': user_agent})
+                interned[user_agent] = agent.id
+            ActivityLog.objects.filter(id__in=ids).update(agent_id=interned[user_agent])
+
+
+def restore_user_agents(apps, schema_editor):
+    ActivityLog = apps.get_model('managementapp', 'ActivityLog')
+    UserAgent = apps.get_model('managementapp', 'UserAgent')
+    for agent in UserAgent.objects.all():
+        ActivityLog.objects.filter(agent_id=agent.id).update(user_agent=agent.value)
+
+
+class Migration(migrations.Migration):
+
+    # Each batch commits on its own so large tables are not locked in one transaction
+    atomic = False
+
+    dependencies = [
+        ('managementapp', '0006_activity_rollups_and_system_state'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserAgent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('value_hash', models.CharField(max_length=40, unique=True)),
+                ('value', models.TextField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'User Agent',
+                'verbose_name_plural': 'User Agents',
+                'db_table': 'user_agents',
+            },
+        ),
+        migrations.AddField(
+            model_name='activitylog',
+            name='agent',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='activity_logs', to='managementapp.useragent'),
+        ),
+        migrations.RunPython(intern_existing_user_agents, restore_user_agents),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-19 01:13
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('managementapp', '0007_user_agent_interning'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='activitylog',
+            name='user_agent',
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-19 01:16
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authapp', '0001_initial'),
+        ('managementapp', '0008_remove_activitylog_user_agent'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='activitylog',
+            name='changes',
+            field=models.JSONField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='activitylog',
+            index=models.Index(fields=['entity_type', 'entity_id', 'created_at'], name='activity_lo_entity__8f0143_idx'),
+        ),
+    ]
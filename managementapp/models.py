@@ -1,6 +1,7 @@
 from django.core.validators import RegexValidator
 from django.contrib.auth.models import User
 from django.db import models
+from django.utils import timezone
 from authapp.models import CustomUser
 
 
@@ -106,6 +107,24 @@ class Booking(models.Model):
 
 
 
+class UserAgent(models.Model):
+    """
+    Interned browser user-agent strings referenced by ActivityLog,
+    so each log row stores a small foreign key instead of the full string
+    """
+    value_hash = models.CharField(max_length=40, unique=True)  # sha1 of value
+    value = models.TextField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        db_table = 'user_agents'
+        verbose_name = 'User Agent'
+        verbose_name_plural = 'User Agents'
+    
+    def __str__(self):
+        return self.value
+
+
 class ActivityLog(models.Model):
     """
     Activity Log model to track all actions in the system
@@ -116,6 +135,8 @@ class ActivityLog(models.Model):
         ('delete', 'Deleted'),
         ('login', 'Logged In'),
         ('logout', 'Logged Out'),
+        ('view', 'Viewed'),
+        ('export', 'Exported'),
     ]
     
     ENTITY_CHOICES = [
@@ -148,9 +169,23 @@ class ActivityLog(models.Model):
     )
     
     ip_address = models.GenericIPAddressField(null=True, blank=True)
-    user_agent = models.TextField(blank=True)
+    agent = models.ForeignKey(
+        UserAgent,
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        related_name='activity_logs'
+    )
     
-    created_at = models.DateTimeField(auto_now_add=True)
+    # Set when the event is captured, not when the batched writer flushes it
+    created_at = models.DateTimeField(default=timezone.now)
+    
+    # Coalesced high-frequency events (view/export): one row per window with a hit counter
+    hit_count = models.PositiveIntegerField(default=1)
+    last_seen_at = models.DateTimeField(null=True, blank=True)
+    fingerprint = models.CharField(max_length=40, blank=True, db_index=True)
+    # Compact before/after values of the changed fields: {field: [old, new]}
+    changes = models.JSONField(null=True, blank=True)
     
     class Meta:
         db_table = 'activity_logs'
@@ -161,11 +196,17 @@ class ActivityLog(models.Model):
             models.Index(fields=['-created_at']),
             models.Index(fields=['action']),
             models.Index(fields=['entity_type']),
+            models.Index(fields=['entity_type', 'entity_id', 'created_at']),
         ]
     
     def __str__(self):
         return f"{self.get_performer_name()} {self.get_action_display()} {self.entity_type} - {self.created_at}"
     
+    @property
+    def user_agent(self):
+        """Full user-agent string (select_related('agent') to avoid a query per row)"""
+        return self.agent.value if self.agent_id else ''
+    
     def get_performer_name(self):
         """Get the name of who performed this action"""
         if self.performed_by_user:
@@ -182,6 +223,8 @@ class ActivityLog(models.Model):
             'delete': 'ri-delete-bin-line',
             'login': 'ri-login-box-line',
             'logout': 'ri-logout-box-line',
+            'view': 'ri-eye-line',
+            'export': 'ri-download-2-line',
         }
         return icons.get(self.action, 'ri-information-line')
     
@@ -193,5 +236,67 @@ class ActivityLog(models.Model):
             'delete': 'red',
             'login': 'purple',
             'logout': 'gray',
+            'view': 'indigo',
+            'export': 'yellow',
         }
-        return colors.get(self.action, 'gray')
\ No newline at end of file
+        return colors.get(self.action, 'gray')
+
+
+class ActivityHourlyRollup(models.Model):
+    """
+    Pre-aggregated activity counts per (local) hour, action, entity type and performer.
+    Serves get_activity_stats without scanning raw activity_logs rows.
+    """
+    hour = models.DateTimeField()
+    action = models.CharField(max_length=50)
+    entity_type = models.CharField(max_length=50)
+    # 'user_<id>', 'custom_<id>' or 'system' - keeps the unique key free of NULLs
+    performer_key = models.CharField(max_length=50)
+    performed_by_user = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='activity_rollups'
+    )
+    performed_by_custom = models.ForeignKey(
+        CustomUser,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='activity_rollups'
+    )
+    count = models.PositiveIntegerField(default=0)
+    
+    class Meta:
+        db_table = 'activity_hourly_rollups'
+        ordering = ['-hour']
+        verbose_name = 'Activity Hourly Rollup'
+        verbose_name_plural = 'Activity Hourly Rollups'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['hour', 'action', 'entity_type', 'performer_key'],
+                name='unique_activity_rollup_bucket'
+            ),
+        ]
+    
+    def __str__(self):
+        return f"{self.hour} {self.action} {self.entity_type} {self.performer_key}: {self.count}"
+
+
+class SystemState(models.Model):
+    """
+    Small key/value store for background maintenance bookkeeping
+    (rollup watermarks, job progress, ...)
+    """
+    key = models.CharField(max_length=100, unique=True)
+    value = models.JSONField(default=dict, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'system_state'
+        verbose_name = 'System State'
+        verbose_name_plural = 'System State'
+    
+    def __str__(self):
+        return self.key
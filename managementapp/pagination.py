@@ -0,0 +1,194 @@
+from django.core.paginator import Paginator
+from django.db import connection
+from django.db.models import Q
+from itertools import islice
+from math import ceil
+import base64
+import json
+
+
+# ============================================================
+# KEYSET (CURSOR) PAGINATION HELPERS
+# ============================================================
+# Bounded COUNT used when an estimate is requested for a filtered queryset.
+ESTIMATE_COUNT_CAP = 10000
+
+
+class InvalidCursor(ValueError):
+    """Raised when a cursor cannot be decoded"""
+    pass
+
+
+def encode_cursor(values):
+    """Encode the ordering key values of the last row into an opaque cursor"""
+    raw = json.dumps([value.isoformat() if hasattr(value, 'isoformat') else value for value in values])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, model, ordering):
+    """Decode a cursor back into python values for the ordering fields"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        raw_values = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+    except (ValueError, TypeError):
+        raise InvalidCursor('Invalid cursor')
+
+    if not isinstance(raw_values, list) or len(raw_values) != len(ordering):
+        raise InvalidCursor('Invalid cursor')
+
+    try:
+        return [
+            model._meta.get_field(field.lstrip('-')).to_python(value)
+            for field, value in zip(ordering, raw_values)
+        ]
+    except Exception:
+        raise InvalidCursor('Invalid cursor')
+
+
+def build_seek_filter(ordering, values):
+    """
+    Build the WHERE clause that selects rows strictly after `values` for the given ordering.
+    e.g. ('-booking_date', '-start_time', 'id') ->
+         date < d OR (date = d AND start < s) OR (date = d AND start = s AND id > i)
+    """
+    seek = Q()
+    equal_so_far = Q()
+    for field, value in zip(ordering, values):
+        name = field.lstrip('-')
+        lookup = 'lt' if field.startswith('-') else 'gt'
+        seek |= equal_so_far & Q(**{f'{name}__{lookup}': value})
+        equal_so_far &= Q(**{name: value})
+    return seek
+
+
+def estimate_count(queryset):
+    """
+    Cheap row count estimate.
+    Unfiltered querysets use the database statistics; filtered ones use a capped COUNT.
+    Returns (count, is_estimate)
+    """
+    if not queryset.query.where:
+        table = queryset.model._meta.db_table
+        estimate = None
+        with connection.cursor() as cursor:
+            if connection.vendor == 'mysql':
+                cursor.execute(
+                    "SELECT TABLE_ROWS FROM information_schema.TABLES "
+                    "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s", [table]
+                )
+                row = cursor.fetchone()
+                estimate = row[0] if row else None
+            elif connection.vendor == 'postgresql':
+                cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE relname = %s", [table])
+                row = cursor.fetchone()
+                estimate = row[0] if row and row[0] >= 0 else None
+        if estimate is not None:
+            return int(estimate), True
+
+    capped = queryset.order_by()[:ESTIMATE_COUNT_CAP + 1].count()
+    if capped > ESTIMATE_COUNT_CAP:
+        return ESTIMATE_COUNT_CAP, True
+    return capped, False
+
+
+def keyset_paginate(queryset, ordering, cursor=None, per_page=20, with_count='none'):
+    """
+    Seek-based pagination: every page costs the same as the first one.
+    `with_count` is one of 'none', 'estimate' or 'exact'.
+    Returns (rows, pagination_dict)
+    """
+    queryset = queryset.order_by(*ordering)
+    unfiltered = queryset
+
+    if cursor:
+        values = decode_cursor(cursor, queryset.model, ordering)
+        queryset = queryset.filter(build_seek_filter(ordering, values))
+
+    rows = list(queryset[:per_page + 1])
+    has_next = len(rows) > per_page
+    rows = rows[:per_page]
+
+    next_cursor = None
+    if has_next:
+        last = rows[-1]
+        next_cursor = encode_cursor([getattr(last, field.lstrip('-')) for field in ordering])
+
+    pagination = {
+        'mode': 'cursor',
+        'cursor': cursor or None,
+        'next_cursor': next_cursor,
+        'has_next': has_next,
+        'per_page': per_page,
+    }
+
+    if with_count == 'exact':
+        pagination['total_count'] = unfiltered.count()
+        pagination['total_is_estimate'] = False
+    elif with_count == 'estimate':
+        pagination['total_count'], pagination['total_is_estimate'] = estimate_count(unfiltered)
+
+    return rows, pagination
+
+
+def paginate_followed_by(queryset, iter_extra, page, per_page):
+    """
+    Page-mode pagination over a queryset followed by the items of iter_extra()
+    (e.g. live rows followed by archived ones). The extra items are streamed and
+    only read up to the end of the next page, so until the last page is reached
+    total_count is a lower bound and total_is_estimate is True.
+    Returns (rows, pagination_dict)
+    """
+    page = max(page, 1)
+    start = (page - 1) * per_page
+    queryset_count = queryset.count()
+    rows = list(queryset[start:start + per_page]) if start < queryset_count else []
+
+    extra_start = max(start - queryset_count, 0)
+    extra_stop = start + 2 * per_page - queryset_count
+    extra = list(islice(iter_extra(), extra_start, extra_stop)) if extra_stop > 0 else []
+    exhausted = extra_stop > 0 and len(extra) < extra_stop - extra_start
+
+    if not rows and not extra and page > 1:
+        # Past the end: count everything once and clamp to the last page, like Paginator.get_page()
+        total = queryset_count + sum(1 for _ in iter_extra())
+        return paginate_followed_by(queryset, iter_extra, max(ceil(total / per_page), 1), per_page)
+
+    known_count = queryset_count + extra_start + len(extra) if extra_stop > 0 else queryset_count
+    return (rows + extra)[:per_page], {
+        'current_page': page,
+        'total_pages': max(ceil(known_count / per_page), 1),
+        'total_count': known_count,
+        'total_is_estimate': not exhausted,
+        'has_next': start + per_page < known_count,
+        'has_previous': page > 1,
+        'per_page': per_page
+    }
+
+
+# ============================================================
+# PAGE-MODE PAGINATION
+# ============================================================
+def get_page_info(page_obj):
+    """Pagination block returned by the page-mode list APIs"""
+    return {
+        'current_page': page_obj.number,
+        'total_pages': page_obj.paginator.num_pages,
+        'total_count': page_obj.paginator.count,
+        'has_next': page_obj.has_next(),
+        'has_previous': page_obj.has_previous(),
+        'per_page': page_obj.paginator.per_page
+    }
+
+
+async def apaginate(queryset, page, per_page, count=None):
+    """
+    Paginator.get_page() for async views: same page clamping, but the COUNT and the
+    page rows are fetched with the async ORM. Pass `count` when it is already known.
+    Returns (rows, pagination_dict)
+    """
+    paginator = Paginator(queryset, per_page)
+    # Pre-fill the cached_property so get_page() does not run a sync COUNT
+    paginator.count = await queryset.acount() if count is None else count
+    page_obj = paginator.get_page(page)
+    rows = [row async for row in page_obj.object_list]
+    return rows, get_page_info(page_obj)
@@ -1,3 +1,4 @@
+from asgiref.sync import sync_to_async
 from django.shortcuts import render
 from django.http import JsonResponse, HttpResponse
 from django.views.decorators.http import require_http_methods
@@ -5,18 +6,39 @@ from django.db.models import Q, Sum, Count
 from django.core.paginator import Paginator
 from datetime import datetime, date, timedelta
 from authapp.decorators import login_required_dual
+from authapp.principal import get_request_actor, aget_request_actor
 from authapp.models import CustomUser
+from authapp.user_directory import get_user_name_map
+from dus_reception.request_timing import timed
 from .models import Booking, ActivityLog
+from .pagination import keyset_paginate, InvalidCursor, apaginate
+from .activity_logger import log_activity
+from .async_utils import run_concurrently
+from .single_flight import ashare_result, ResponseSnapshot, BOOKINGS_VERSION
 import json
 
 
+REPORT_ORDERING = ('-booking_date', '-start_time', 'id')
+
+# Query params that change the page, not the report itself
+NON_FILTER_PARAMS = ('page', 'per_page', 'mode', 'cursor', 'with_count')
+
+
+def get_report_filter_key(request):
+    """Normalized report filters, used to coalesce repeated view/export log events"""
+    return sorted(
+        (key, value) for key, value in request.GET.items()
+        if key not in NON_FILTER_PARAMS and value
+    )
+
+
 # ============================================================
 # BOOKING REPORTS VIEW
 # ============================================================
 @login_required_dual(login_url='/unauthorized/')
 def booking_reports_view(request):
     """Render the booking reports page"""
-    custom_users = CustomUser.objects.all()
+    custom_users = get_user_name_map()
     
     # Get current date info
     today = date.today()
@@ -32,77 +54,101 @@ def booking_reports_view(request):
     return render(request, 'admin/booking_reports.html', context)
 
 
-@login_required_dual(login_url='/unauthorized/')
-@require_http_methods(["GET"])
-def get_booking_reports(request):
-    """API endpoint to get filtered booking reports with pagination"""
-    try:
-        # Get filter parameters
-        page = int(request.GET.get('page', 1))
-        per_page = int(request.GET.get('per_page', 20))
-        
-        date_from = request.GET.get('date_from', None)
-        date_to = request.GET.get('date_to', None)
-        event_type = request.GET.get('event_type', None)
-        created_by_filter = request.GET.get('created_by', None)
-        search = request.GET.get('search', None)
-        min_advance = request.GET.get('min_advance', None)
-        max_advance = request.GET.get('max_advance', None)
-        
-        # Start with all bookings
-        bookings = Booking.objects.all()
-        
-        # Apply filters
-        if date_from:
-            bookings = bookings.filter(booking_date__gte=date_from)
-        if date_to:
-            bookings = bookings.filter(booking_date__lte=date_to)
-        if event_type:
-            bookings = bookings.filter(event_type=event_type)
-        if min_advance:
-            bookings = bookings.filter(advance_given__gte=min_advance)
-        if max_advance:
-            bookings = bookings.filter(advance_given__lte=max_advance)
-        
-        # Apply created_by filter
-        if created_by_filter:
-            if created_by_filter.startswith('user_'):
-                user_id = created_by_filter.replace('user_', '')
-                bookings = bookings.filter(created_by_user_id=user_id)
-            elif created_by_filter.startswith('custom_'):
-                custom_id = created_by_filter.replace('custom_', '')
-                bookings = bookings.filter(created_by_custom_id=custom_id)
+async def build_booking_report(request):
+    """
+    Report page and statistics for the query string, as (ResponseSnapshot, total_bookings).
+    Independent of the caller, so concurrent identical requests share it.
+    """
+    # Get filter parameters
+    page = int(request.GET.get('page', 1))
+    per_page = int(request.GET.get('per_page', 20))
+    
+    # Cursor mode: seek on (-booking_date, -start_time, id) instead of OFFSET
+    pagination_mode = request.GET.get('mode', 'page')
+    cursor = request.GET.get('cursor', None)
+    with_count = request.GET.get('with_count', 'none')
+    
+    date_from = request.GET.get('date_from', None)
+    date_to = request.GET.get('date_to', None)
+    event_type = request.GET.get('event_type', None)
+    created_by_filter = request.GET.get('created_by', None)
+    search = request.GET.get('search', None)
+    min_advance = request.GET.get('min_advance', None)
+    max_advance = request.GET.get('max_advance', None)
+    
+    # Start with all bookings (creators joined for get_creator_name)
+    bookings = Booking.objects.select_related('created_by_user', 'created_by_custom')
+    
+    # Apply filters
+    if date_from:
+        bookings = bookings.filter(booking_date__gte=date_from)
+    if date_to:
+        bookings = bookings.filter(booking_date__lte=date_to)
+    if event_type:
+        bookings = bookings.filter(event_type=event_type)
+    if min_advance:
+        bookings = bookings.filter(advance_given__gte=min_advance)
+    if max_advance:
+        bookings = bookings.filter(advance_given__lte=max_advance)
+    
+    # Apply created_by filter
+    if created_by_filter:
+        if created_by_filter.startswith('user_'):
+            user_id = created_by_filter.replace('user_', '')
+            bookings = bookings.filter(created_by_user_id=user_id)
+        elif created_by_filter.startswith('custom_'):
+            custom_id = created_by_filter.replace('custom_', '')
+            bookings = bookings.filter(created_by_custom_id=custom_id)
+    
+    # Apply search
+    if search:
+        bookings = bookings.filter(
+            Q(client_name__icontains=search) |
+            Q(phone_number__icontains=search) |
+            Q(email__icontains=search) |
+            Q(event_type__icontains=search) |
+            Q(menu_type__icontains=search)
+        )
+    
+    # Order by booking date descending
+    bookings = bookings.order_by('-booking_date', '-start_time')
+    
+    total_bookings = None
+    statistics = None
+    
+    # Statistics are computed on the first page only in cursor mode
+    if pagination_mode != 'cursor' or not cursor:
+        # Totals and the event type breakdown are independent, so they run concurrently
+        totals, event_breakdown = await run_concurrently(
+            lambda: bookings.aggregate(total_bookings=Count('id'), total_advance=Sum('advance_given')),
+            lambda: list(bookings.values('event_type').annotate(
+                count=Count('id'),
+                total_advance=Sum('advance_given')
+            ).order_by('-count')),
+        )
+        total_bookings = totals['total_bookings']
         
-        # Apply search
-        if search:
-            bookings = bookings.filter(
-                Q(client_name__icontains=search) |
-                Q(phone_number__icontains=search) |
-                Q(email__icontains=search) |
-                Q(event_type__icontains=search) |
-                Q(menu_type__icontains=search)
+        statistics = {
+            'total_bookings': total_bookings,
+            'total_advance': float(totals['total_advance'] or 0),
+            'event_breakdown': event_breakdown
+        }
+    
+    if pagination_mode == 'cursor':
+        try:
+            page_rows, pagination = await sync_to_async(keyset_paginate)(
+                bookings, REPORT_ORDERING, cursor=cursor, per_page=per_page, with_count=with_count
             )
-        
-        # Order by booking date descending
-        bookings = bookings.order_by('-booking_date', '-start_time')
-        
-        # Calculate statistics before pagination
-        total_bookings = bookings.count()
-        total_advance = bookings.aggregate(Sum('advance_given'))['advance_given__sum'] or 0
-        
-        # Get event type breakdown
-        event_breakdown = bookings.values('event_type').annotate(
-            count=Count('id'),
-            total_advance=Sum('advance_given')
-        ).order_by('-count')
-        
-        # Paginate
-        paginator = Paginator(bookings, per_page)
-        page_obj = paginator.get_page(page)
-        
-        # Convert bookings to JSON
+        except InvalidCursor as e:
+            return ResponseSnapshot(JsonResponse({'error': str(e)}, status=400)), None
+    else:
+        # Paginate, reusing the total from the statistics
+        page_rows, pagination = await apaginate(bookings, page, per_page, count=total_bookings)
+    
+    # Convert bookings to JSON
+    with timed('serialize'):
         bookings_data = []
-        for booking in page_obj:
+        for booking in page_rows:
             from .views import get_nepali_date
             nepali_date = get_nepali_date(booking.booking_date)
             
@@ -123,52 +169,58 @@ def get_booking_reports(request):
                 'created_by': booking.get_creator_name(),
                 'created_at': booking.created_at.strftime('%Y-%m-%d %H:%M:%S')
             })
+    
+    response_data = {
+        'bookings': bookings_data,
+        'pagination': pagination
+    }
+    if statistics is not None:
+        response_data['statistics'] = statistics
+    
+    with timed('serialize'):
+        response = JsonResponse(response_data, status=200)
+    return ResponseSnapshot(response), total_bookings
+
+
+@login_required_dual(login_url='/unauthorized/')
+@require_http_methods(["GET"])
+async def get_booking_reports(request):
+    """API endpoint to get filtered booking reports with pagination"""
+    try:
+        # Concurrent identical requests share the report; every caller's view is still logged
+        snapshot, total_bookings = await ashare_result(
+            'get_booking_reports', request, (BOOKINGS_VERSION,), lambda: build_booking_report(request)
+        )
+        response = snapshot.build()
+        if response.status_code != 200:
+            return response
+        
+        date_from = request.GET.get('date_from', None)
+        date_to = request.GET.get('date_to', None)
+        event_type = request.GET.get('event_type', None)
         
         # Log report generation activity
-        from .views import log_activity, get_client_ip
-        performed_by_user = None
-        performed_by_custom = None
-        
-        if request.user.is_authenticated:
-            performed_by_user = request.user
-        else:
-            custom_user_id = request.COOKIES.get("custom_user_id")
-            if custom_user_id:
-                try:
-                    performed_by_custom = CustomUser.objects.get(id=custom_user_id)
-                except CustomUser.DoesNotExist:
-                    pass
+        performed_by_user, performed_by_custom = await aget_request_actor(request)
         
         filter_desc = []
         if date_from: filter_desc.append(f"from {date_from}")
         if date_to: filter_desc.append(f"to {date_to}")
         if event_type: filter_desc.append(f"event: {event_type}")
         
-        log_activity(
+        report_size = f'{total_bookings} bookings' if total_bookings is not None else 'next page'
+        
+        await sync_to_async(log_activity)(
             'view',
             'booking',
-            description=f'Generated booking report ({total_bookings} bookings{", " + ", ".join(filter_desc) if filter_desc else ""})',
+            description=f'Generated booking report ({report_size}{", " + ", ".join(filter_desc) if filter_desc else ""})',
             request=request,
             performed_by_user=performed_by_user,
-            performed_by_custom=performed_by_custom
+            performed_by_custom=performed_by_custom,
+            coalesce_key=get_report_filter_key(request)
         )
         
-        return JsonResponse({
-            'bookings': bookings_data,
-            'statistics': {
-                'total_bookings': total_bookings,
-                'total_advance': float(total_advance),
-                'event_breakdown': list(event_breakdown)
-            },
-            'pagination': {
-                'current_page': page_obj.number,
-                'total_pages': paginator.num_pages,
-                'total_count': total_bookings,
-                'has_previous': page_obj.has_previous(),
-                'has_next': page_obj.has_next(),
-                'per_page': per_page
-            }
-        }, status=200)
+        
+        return response
     
     except Exception as e:
         return JsonResponse({'error': str(e)}, status=500)
@@ -194,7 +246,8 @@ def export_booking_reports(request):
         created_by_filter = request.GET.get('created_by', None)
         search = request.GET.get('search', None)
         
-        bookings = Booking.objects.all()
+        # Creators joined for get_creator_name (one query instead of one per row)
+        bookings = Booking.objects.select_related('created_by_user', 'created_by_custom')
         
         # Apply same filters
         if date_from:
@@ -323,19 +376,7 @@ def export_booking_reports(request):
         wb.save(response)
         
         # Log export activity
-        from .views import log_activity
-        performed_by_user = None
-        performed_by_custom = None
-        
-        if request.user.is_authenticated:
-            performed_by_user = request.user
-        else:
-            custom_user_id = request.COOKIES.get("custom_user_id")
-            if custom_user_id:
-                try:
-                    performed_by_custom = CustomUser.objects.get(id=custom_user_id)
-                except CustomUser.DoesNotExist:
-                    pass
+        performed_by_user, performed_by_custom = get_request_actor(request)
         
         log_activity(
             'export',
@@ -343,7 +384,8 @@ def export_booking_reports(request):
             description=f'Exported {bookings.count()} bookings to Excel',
             request=request,
             performed_by_user=performed_by_user,
-            performed_by_custom=performed_by_custom
+            performed_by_custom=performed_by_custom,
+            coalesce_key=get_report_filter_key(request)
         )
         
         return response
@@ -364,7 +406,8 @@ def export_booking_reports_csv(request):
         created_by_filter = request.GET.get('created_by', None)
         search = request.GET.get('search', None)
         
-        bookings = Booking.objects.all()
+        # Creators joined for get_creator_name (one query instead of one per row)
+        bookings = Booking.objects.select_related('created_by_user', 'created_by_custom')
         
         # Apply same filters
         if date_from:
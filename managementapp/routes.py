@@ -20,7 +20,11 @@ urlpatterns = [
     path('activity/', activity_log_views.activity_log_view, name='activity_log_view'),
     path('activity/logs/', activity_log_views.get_activity_logs, name='get_activity_logs'),
     path('activity/stats/', activity_log_views.get_activity_stats, name='get_activity_stats'),
+    path('activity/bootstrap/', activity_log_views.get_activity_bootstrap_data, name='get_activity_bootstrap_data'),
+    path('activity/export/', activity_log_views.export_activity_logs, name='export_activity_logs'),
     path('activity/clear/', activity_log_views.clear_old_logs, name='clear_old_logs'),
+    path('activity/queue/', activity_log_views.get_activity_queue_metrics, name='get_activity_queue_metrics'),
+    path('api/single-flight/metrics/', activity_log_views.get_single_flight_metrics, name='get_single_flight_metrics'),
 
 
     # =============================
@@ -39,12 +43,15 @@ urlpatterns = [
     #  CALANDER API ENDPOINTS
     # =============================
     path('api/calendar-data/', views.get_calendar_data, name='get_calendar_data'),
+    path('api/calendar/bootstrap/', views.get_calendar_bootstrap_data, name='get_calendar_bootstrap_data'),
     path('api/bookings/', views.get_bookings, name='get_bookings'),
     path('api/bookings/<int:booking_id>/detail/', views.get_booking_detail, name='get_booking_detail'),
+    path('api/bookings/<int:booking_id>/history/', views.get_booking_history, name='get_booking_history'),
     path('api/bookings/date/<str:date_str>/', views.get_bookings_by_date, name='get_bookings_by_date'),
     path('api/bookings/create/', views.create_booking, name='create_booking'),
     path('api/bookings/<int:booking_id>/update/', views.update_booking, name='update_booking'),
     path('api/bookings/<int:booking_id>/delete/', views.delete_booking, name='delete_booking'),
+    path('api/autocomplete/', views.get_autocomplete, name='get_autocomplete'),
 ]
 
 # ============================================================
@@ -0,0 +1,246 @@
+from asgiref.sync import iscoroutinefunction
+from collections import OrderedDict
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from django.conf import settings
+from django.http import HttpResponse
+from functools import wraps
+from threading import Lock
+from urllib.parse import urlencode
+from dus_reception.cache_backends import get_cache_version
+import asyncio
+import time
+
+
+# ============================================================
+# SINGLE-FLIGHT SETTINGS
+# ============================================================
+DEFAULT_SINGLE_FLIGHT_SETTINGS = {
+    'ENABLED': True,
+    'TIMEOUT': 10,             # Seconds a follower waits before computing the response itself
+    'MAX_METRIC_KEYS': 500,    # Per-key metrics kept for the most recently used keys
+}
+
+# Data versions bumped after writes, so requests arriving after a write never
+# join a computation that started before it
+BOOKINGS_VERSION = 'bookings'
+
+
+def get_single_flight_settings():
+    return {**DEFAULT_SINGLE_FLIGHT_SETTINGS, **getattr(settings, 'SINGLE_FLIGHT', {})}
+
+
+class ResponseSnapshot:
+    """Status, headers and body of a response, rebuilt into a new response for every caller"""
+
+    def __init__(self, response):
+        self.status = response.status_code
+        self.content = response.content
+        self.headers = list(response.items())
+
+    def build(self):
+        response = HttpResponse(self.content, status=self.status)
+        for header, value in self.headers:
+            response[header] = value
+        return response
+
+
+# ============================================================
+# IN-FLIGHT CALL GROUP
+# ============================================================
+class LeaderCancelled(Exception):
+    """Given to followers when the leader was cancelled (e.g. its client disconnected)"""
+    pass
+
+
+class SingleFlightGroup:
+    """
+    Coalesces concurrent calls with the same key in this process: the first
+    caller (leader) computes, later callers (followers) wait on its future and
+    share the result. Futures are thread-safe, so sync workers and async views
+    on different event loops can wait on the same call.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._calls = {}
+        self._metrics = OrderedDict()
+
+    def _metric(self, key):
+        # Called with the lock held
+        metric = self._metrics.get(key)
+        if metric is None:
+            metric = self._metrics[key] = {
+                'leaders': 0, 'followers': 0, 'timeouts': 0, 'errors': 0,
+                'waiting': 0, 'max_waiting': 0, 'last_duration_ms': None,
+            }
+            while len(self._metrics) > get_single_flight_settings()['MAX_METRIC_KEYS']:
+                self._metrics.popitem(last=False)
+        else:
+            self._metrics.move_to_end(key)
+        return metric
+
+    def _join(self, key):
+        """(future, is_leader)"""
+        with self._lock:
+            metric = self._metric(key)
+            future = self._calls.get(key)
+            if future is not None:
+                metric['followers'] += 1
+                metric['waiting'] += 1
+                metric['max_waiting'] = max(metric['max_waiting'], metric['waiting'])
+                return future, False
+            future = self._calls[key] = Future()
+            metric['leaders'] += 1
+            return future, True
+
+    def _finish(self, key, future, started, result=None, error=None):
+        with self._lock:
+            self._calls.pop(key, None)
+            metric = self._metric(key)
+            metric['last_duration_ms'] = round((time.perf_counter() - started) * 1000, 1)
+            if error is not None:
+                metric['errors'] += 1
+        if error is not None:
+            # Followers only fall back to computing on Exception; a cancellation
+            # (CancelledError, KeyboardInterrupt) must not propagate to them
+            if not isinstance(error, Exception):
+                error = LeaderCancelled(f'Leader of {key} was cancelled')
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def _stop_waiting(self, key, timed_out=False):
+        with self._lock:
+            metric = self._metric(key)
+            metric['waiting'] -= 1
+            if timed_out:
+                metric['timeouts'] += 1
+
+    def run(self, key, func, timeout):
+        """Result of func() for this key, computed once for all concurrent callers"""
+        future, is_leader = self._join(key)
+        if is_leader:
+            started = time.perf_counter()
+            try:
+                result = func()
+            except BaseException as error:
+                self._finish(key, future, started, error=error)
+                raise
+            self._finish(key, future, started, result=result)
+            return result
+
+        try:
+            result = future.result(timeout=timeout)
+        except FutureTimeoutError:
+            self._stop_waiting(key, timed_out=True)
+            return func()
+        except Exception:
+            # The leader failed; compute independently rather than share its error
+            self._stop_waiting(key)
+            return func()
+        self._stop_waiting(key)
+        return result
+
+    async def arun(self, key, func, timeout):
+        """run() for coroutine functions"""
+        future, is_leader = self._join(key)
+        if is_leader:
+            started = time.perf_counter()
+            try:
+                result = await func()
+            except BaseException as error:
+                self._finish(key, future, started, error=error)
+                raise
+            self._finish(key, future, started, result=result)
+            return result
+
+        try:
+            # shield: a follower timing out must not cancel the shared future
+            result = await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), timeout)
+        except asyncio.TimeoutError:
+            self._stop_waiting(key, timed_out=True)
+            return await func()
+        except Exception:
+            self._stop_waiting(key)
+            return await func()
+        except BaseException:
+            # This follower itself was cancelled
+            self._stop_waiting(key)
+            raise
+        self._stop_waiting(key)
+        return result
+
+    def get_metrics(self):
+        with self._lock:
+            return {
+                'in_flight': len(self._calls),
+                'keys': {key: dict(metric) for key, metric in reversed(self._metrics.items())},
+            }
+
+
+single_flight_group = SingleFlightGroup()
+
+
+# ============================================================
+# VIEW DECORATOR
+# ============================================================
+def get_single_flight_key(name, request, versions):
+    """View name + data versions + query params in a stable order"""
+    params = urlencode(sorted((key, value) for key, values in request.GET.lists() for value in values))
+    data_versions = ','.join(f'{version}={get_cache_version(version)}' for version in versions)
+    return f'{name}?{params}@{data_versions}'
+
+
+async def ashare_result(name, request, versions, func):
+    """
+    await func() once for all concurrent callers with the same query string and
+    data versions, for views that share a computation but still do per-caller
+    work around it (e.g. audit logging). func's result must not depend on who asks.
+    """
+    config = get_single_flight_settings()
+    if not config['ENABLED']:
+        return await func()
+    key = get_single_flight_key(name, request, versions)
+    return await single_flight_group.arun(key, func, config['TIMEOUT'])
+
+
+def single_flight(versions=()):
+    """
+    Decorator for expensive GET views whose response depends only on the query
+    string and the given data versions (not on who asks): concurrent identical
+    requests share one computation. Place it under the auth decorators so every
+    request is still authenticated. Works on sync and async views.
+    """
+    def decorator(view_func):
+        name = view_func.__name__
+
+        if iscoroutinefunction(view_func):
+            @wraps(view_func)
+            async def async_wrapper(request, *args, **kwargs):
+                config = get_single_flight_settings()
+                if not config['ENABLED'] or request.method != 'GET':
+                    return await view_func(request, *args, **kwargs)
+
+                async def compute():
+                    return ResponseSnapshot(await view_func(request, *args, **kwargs))
+
+                key = get_single_flight_key(name, request, versions)
+                snapshot = await single_flight_group.arun(key, compute, config['TIMEOUT'])
+                return snapshot.build()
+
+            return async_wrapper
+
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            config = get_single_flight_settings()
+            if not config['ENABLED'] or request.method != 'GET':
+                return view_func(request, *args, **kwargs)
+
+            def compute():
+                return ResponseSnapshot(view_func(request, *args, **kwargs))
+
+            key = get_single_flight_key(name, request, versions)
+            return single_flight_group.run(key, compute, config['TIMEOUT']).build()
+
+        return wrapper
+    return decorator
@@ -1,3 +1,338 @@
-from django.test import TestCase
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.db.models import Count, Sum
+from django.utils import timezone
+from datetime import date, time as dt_time, timedelta
+from unittest import mock
+from .activity_logger import activity_log_writer, log_activity
+from .activity_log_views import ACTIVITY_LOG_ORDERING
+from .activity_rollups import (
+    ROLLUP_STATE_KEY, LATE_EVENT_WINDOW, compact_activity_rollups, compact_if_stale, floor_hour,
+    get_rollup_stats, get_rollup_watermark
+)
+from .booking_history import replay_booking
+from .models import ActivityLog, ActivityHourlyRollup, Booking, SystemState
+from .pagination import InvalidCursor, keyset_paginate
+from .reports_views import REPORT_ORDERING
+from .single_flight import SingleFlightGroup
+import asyncio
+import json
+import time
 
-# Create your tests here.
+
+# ============================================================
+# BOOKING HISTORY
+# ============================================================
+@override_settings(ACTIVITY_LOG={'ASYNC': False})
+class BookingHistoryTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.client.force_login(self.admin)
+
+    def create_booking(self, **fields):
+        data = {
+            'client_name': 'Sita Sharma', 'booking_date': '2030-05-01', 'start_time': '10:00',
+            'end_time': '14:00', 'phone_number': '9800000000', 'event_type': 'wedding',
+            'no_of_packs': 10, 'advance_given': 500, **fields,
+        }
+        response = self.client.post('/api/bookings/create/', json.dumps(data), content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+        return response.json()['booking']['id']
+
+    def update_booking(self, booking_id, **fields):
+        response = self.client.put(f'/api/bookings/{booking_id}/update/', json.dumps(fields), content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+
+    def get_changes(self, booking_id, action):
+        return ActivityLog.objects.get(entity_type='booking', entity_id=booking_id, action=action).changes
+
+    def test_create_logs_values_as_stored(self):
+        booking_id = self.create_booking()
+
+        changes = self.get_changes(booking_id, 'create')
+        self.assertEqual(changes['no_of_packs'], [None, '10'])
+        self.assertEqual(changes['start_time'], [None, '10:00:00'])
+        self.assertEqual(changes['advance_given'], [None, '500.00'])
+
+    def test_unchanged_update_logs_no_diff(self):
+        booking_id = self.create_booking()
+
+        self.update_booking(booking_id, no_of_packs=10, start_time='10:00', advance_given=500.0, client_name='Sita Sharma')
+
+        self.assertIsNone(self.get_changes(booking_id, 'update'))
+
+    def test_replay_across_create_update_delete(self):
+        before_create = timezone.now()
+        booking_id = self.create_booking()
+        after_create = timezone.now()
+        self.update_booking(booking_id, no_of_packs='25', client_name='Sita Thapa')
+        after_update = timezone.now()
+        response = self.client.delete(f'/api/bookings/{booking_id}/delete/')
+        self.assertEqual(response.status_code, 200)
+        after_delete = timezone.now()
+
+        self.assertEqual(self.get_changes(booking_id, 'update'), {
+            'client_name': ['Sita Sharma', 'Sita Thapa'],
+            'no_of_packs': ['10', '25'],
+        })
+        self.assertFalse(Booking.objects.filter(id=booking_id).exists())
+
+        state, history = replay_booking(booking_id, before_create)
+        self.assertIsNone(state)
+
+        state, history = replay_booking(booking_id, after_create)
+        self.assertEqual(state['client_name'], 'Sita Sharma')
+        self.assertEqual(state['no_of_packs'], '10')
+        self.assertEqual(state['booking_date'], '2030-05-01')
+        self.assertEqual([log.action for log in history], ['create'])
+
+        state, history = replay_booking(booking_id, after_update)
+        self.assertEqual(state['client_name'], 'Sita Thapa')
+        self.assertEqual(state['no_of_packs'], '25')
+        self.assertEqual([log.action for log in history], ['create', 'update'])
+
+        state, history = replay_booking(booking_id, after_delete)
+        self.assertIsNone(state)
+        self.assertEqual([log.action for log in history], ['create', 'update', 'delete'])
+
+
+# ============================================================
+# ACTIVITY LOG COALESCING
+# ============================================================
+@override_settings(ACTIVITY_LOG={'ASYNC': True, 'FLUSH_INTERVAL': 60})
+class ActivityCoalescingTests(TransactionTestCase):
+    """The batched writer thread uses its own connection, so rows must really be committed"""
+
+    def log_view(self, coalesce_key):
+        log_activity('view', 'report', description='Viewed booking reports', coalesce_key=coalesce_key)
+
+    def test_repeated_views_become_one_row_with_hit_count(self):
+        self.log_view('coalesce-test')
+        # Let the writer thread take the first row into its batch (written after FLUSH_INTERVAL)
+        time.sleep(0.2)
+        self.log_view('coalesce-test')
+        self.log_view('coalesce-test')
+        activity_log_writer.flush()
+
+        self.assertEqual(list(ActivityLog.objects.filter(action='view').values_list('hit_count', flat=True)), [3])
+
+
+# ============================================================
+# SINGLE-FLIGHT
+# ============================================================
+class SingleFlightGroupTests(SimpleTestCase):
+    def setUp(self):
+        self.group = SingleFlightGroup()
+
+    def run_leader_and_follower(self, leader_func, follower_func, follower_timeout=5, cancel_leader=False):
+        """Start a leader, let a follower join it, optionally cancel the leader; returns (leader outcome, follower result)"""
+        async def scenario():
+            leader = asyncio.ensure_future(self.group.arun('key', leader_func, 5))
+            await asyncio.sleep(0)
+            follower = asyncio.ensure_future(self.group.arun('key', follower_func, follower_timeout))
+            await asyncio.sleep(0.01)
+            if cancel_leader:
+                leader.cancel()
+            leader_outcome = (await asyncio.gather(leader, return_exceptions=True))[0]
+            return leader_outcome, await follower
+        return asyncio.run(scenario())
+
+    def get_metric(self):
+        return self.group.get_metrics()['keys']['key']
+
+    async def slow(self, value, delay=0.05):
+        await asyncio.sleep(delay)
+        return value
+
+    def test_follower_shares_leader_result(self):
+        calls = []
+
+        async def follower_func():
+            calls.append('follower')
+            return 'follower'
+
+        leader, follower = self.run_leader_and_follower(lambda: self.slow('leader'), follower_func)
+
+        self.assertEqual((leader, follower), ('leader', 'leader'))
+        self.assertEqual(calls, [])
+        self.assertEqual(self.get_metric()['waiting'], 0)
+
+    def test_leader_cancellation_makes_follower_compute(self):
+        leader, follower = self.run_leader_and_follower(
+            lambda: self.slow('leader', delay=1), lambda: self.slow('follower', delay=0), cancel_leader=True
+        )
+
+        self.assertIsInstance(leader, asyncio.CancelledError)
+        self.assertEqual(follower, 'follower')
+        self.assertEqual(self.get_metric()['waiting'], 0)
+        self.assertEqual(self.group.get_metrics()['in_flight'], 0)
+
+    def test_leader_error_makes_follower_compute(self):
+        async def failing():
+            await asyncio.sleep(0.05)
+            raise ValueError('boom')
+
+        leader, follower = self.run_leader_and_follower(failing, lambda: self.slow('follower', delay=0))
+
+        self.assertIsInstance(leader, ValueError)
+        self.assertEqual(follower, 'follower')
+        self.assertEqual(self.get_metric()['errors'], 1)
+        self.assertEqual(self.get_metric()['waiting'], 0)
+
+    def test_follower_timeout_computes_without_cancelling_leader(self):
+        leader, follower = self.run_leader_and_follower(
+            lambda: self.slow('leader', delay=0.1), lambda: self.slow('follower', delay=0), follower_timeout=0.001
+        )
+
+        self.assertEqual((leader, follower), ('leader', 'follower'))
+        self.assertEqual(self.get_metric()['timeouts'], 1)
+        self.assertEqual(self.get_metric()['waiting'], 0)
+
+
+# ============================================================
+# HOURLY ACTIVITY ROLLUPS
+# ============================================================
+class ActivityRollupTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.now = timezone.now()
+
+    def add_logs(self, *ages, action='create'):
+        ActivityLog.objects.bulk_create([
+            ActivityLog(action=action, entity_type='booking', description='x',
+                        performed_by_user=self.admin if index % 2 else None, created_at=self.now - age)
+            for index, age in enumerate(ages)
+        ])
+
+    def rolled_up_total(self):
+        return ActivityHourlyRollup.objects.aggregate(total=Sum('count'))['total'] or 0
+
+    def set_watermark(self, value):
+        SystemState.objects.filter(key=ROLLUP_STATE_KEY).update(value={'rolled_up_until': value.isoformat()})
+
+    def test_compaction_matches_raw_count_before_watermark(self):
+        self.add_logs(*[timedelta(minutes=37 * index) for index in range(200)])
+
+        compact_activity_rollups()
+
+        watermark = get_rollup_watermark()
+        self.assertEqual(watermark, floor_hour(self.now - timedelta(minutes=2)))
+        self.assertEqual(self.rolled_up_total(), ActivityLog.objects.filter(created_at__lt=watermark).count())
+
+    def test_rows_are_bucketed_by_local_hour(self):
+        hour = floor_hour(self.now - timedelta(hours=5))
+        ActivityLog.objects.bulk_create([
+            ActivityLog(action='create', entity_type='booking', description='x', created_at=created_at)
+            for created_at in (hour, hour + timedelta(minutes=59, seconds=59), hour + timedelta(hours=1))
+        ])
+
+        compact_activity_rollups()
+
+        counts = dict(ActivityHourlyRollup.objects.values_list('hour', 'count'))
+        self.assertEqual(counts, {hour: 2, hour + timedelta(hours=1): 1})
+
+    def test_stats_match_raw_count_across_rollups_and_raw_rows(self):
+        self.add_logs(*[timedelta(minutes=53 * index) for index in range(150)], action='update')
+        compact_activity_rollups()
+        # Rows after the watermark are counted from the raw table
+        self.add_logs(timedelta(seconds=1), timedelta(seconds=2))
+
+        stats = get_rollup_stats(days=3)
+
+        raw = ActivityLog.objects.filter(created_at__gte=floor_hour(self.now - timedelta(days=3)))
+        self.assertEqual(stats['total_activities'], raw.count())
+        self.assertEqual(
+            {row['action']: row['count'] for row in stats['action_stats']},
+            dict(raw.values_list('action').annotate(count=Count('id')).order_by())
+        )
+
+    def test_late_rows_are_counted_when_their_hour_is_rolled_up_again(self):
+        self.add_logs(*[timedelta(hours=index) for index in range(1, 24)])
+        compact_activity_rollups()
+        watermark = get_rollup_watermark()
+
+        # Inserted after its hour was rolled up (e.g. a coalesced event written when its window closed)
+        self.add_logs(timedelta(hours=3))
+        self.assertEqual(self.rolled_up_total(), ActivityLog.objects.filter(created_at__lt=watermark).count() - 1)
+
+        # The next compaction (one hour later) re-rolls LATE_EVENT_WINDOW before the watermark
+        self.set_watermark(watermark - timedelta(hours=1))
+        compact_activity_rollups()
+
+        self.assertLess(self.now - timedelta(hours=3), watermark)
+        self.assertGreater(self.now - timedelta(hours=3), watermark - LATE_EVENT_WINDOW)
+        self.assertEqual(self.rolled_up_total(), ActivityLog.objects.filter(created_at__lt=watermark).count())
+
+    def test_fresh_watermark_skips_compaction(self):
+        self.add_logs(timedelta(hours=2))
+        compact_if_stale()
+
+        with mock.patch('managementapp.activity_rollups.compact_activity_rollups') as compact:
+            compact_if_stale()
+        compact.assert_not_called()
+
+    def test_rebuild_recomputes_everything(self):
+        self.add_logs(*[timedelta(hours=index) for index in range(1, 50)])
+        compact_activity_rollups()
+        ActivityHourlyRollup.objects.update(count=999)
+
+        compact_activity_rollups(rebuild=True)
+
+        self.assertEqual(self.rolled_up_total(), ActivityLog.objects.filter(created_at__lt=get_rollup_watermark()).count())
+
+
+# ============================================================
+# KEYSET (CURSOR) PAGINATION
+# ============================================================
+class KeysetPaginationTests(TestCase):
+    def page_through(self, queryset, ordering, per_page):
+        ids, cursor, pages = [], None, 0
+        while True:
+            rows, pagination = keyset_paginate(queryset, ordering, cursor=cursor, per_page=per_page)
+            ids.extend(row.id for row in rows)
+            pages += 1
+            cursor = pagination['next_cursor']
+            if not pagination['has_next']:
+                self.assertIsNone(cursor)
+                return ids, pages
+
+    def test_activity_logs_with_tied_timestamps(self):
+        now = timezone.now()
+        ActivityLog.objects.bulk_create([
+            ActivityLog(action='create', entity_type='booking', description=str(index),
+                        created_at=now - timedelta(minutes=index // 4))
+            for index in range(17)
+        ])
+        queryset = ActivityLog.objects.all()
+
+        ids, pages = self.page_through(queryset, ACTIVITY_LOG_ORDERING, per_page=3)
+
+        self.assertEqual(ids, list(queryset.order_by(*ACTIVITY_LOG_ORDERING).values_list('id', flat=True)))
+        self.assertEqual(pages, 6)
+
+    def test_bookings_with_tied_date_and_time(self):
+        Booking.objects.bulk_create([
+            Booking(client_name=f'Client {index}', booking_date=date(2030, 1, 1 + index % 3),
+                    start_time=dt_time(10 + index % 2), end_time=dt_time(18), phone_number='9800000000')
+            for index in range(13)
+        ])
+        queryset = Booking.objects.all()
+
+        ids, pages = self.page_through(queryset, REPORT_ORDERING, per_page=4)
+
+        self.assertEqual(ids, list(queryset.order_by(*REPORT_ORDERING).values_list('id', flat=True)))
+        self.assertEqual(pages, 4)
+
+    def test_counts(self):
+        ActivityLog.objects.bulk_create([
+            ActivityLog(action='create', entity_type='booking', description='x') for _ in range(5)
+        ])
+
+        rows, pagination = keyset_paginate(ActivityLog.objects.all(), ACTIVITY_LOG_ORDERING, per_page=2, with_count='exact')
+
+        self.assertEqual((pagination['total_count'], pagination['total_is_estimate']), (5, False))
+
+    def test_invalid_cursor(self):
+        for cursor in ('not-a-cursor', 'WzFd'):
+            with self.assertRaises(InvalidCursor):
+                keyset_paginate(ActivityLog.objects.all(), ACTIVITY_LOG_ORDERING, cursor=cursor)
@@ -6,49 +6,22 @@ from django.contrib.auth.decorators import login_required
 from django.utils.decorators import method_decorator
 from django.views import View
 from django.db.models import Q
+from django.utils import timezone
 from datetime import datetime, date, timedelta
 import json
 import nepali_datetime
 from authapp.decorators import login_required_dual
+from authapp.principal import get_request_actor, get_actor_name
 from authapp.models import CustomUser
+from authapp.user_directory import get_user_name_map
+from dus_reception.cache_backends import bump_cache_version
+from dus_reception.request_timing import timed
 from .models import Booking, ActivityLog
-
-
-# ============================================================
-# ACTIVITY LOG HELPER FUNCTIONS
-# ============================================================
-def get_client_ip(request):
-    """Get client IP address from request"""
-    x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
-    if x_forwarded_for:
-        ip = x_forwarded_for.split(',')[0]
-    else:
-        ip = request.META.get('REMOTE_ADDR')
-    return ip
-
-
-def log_activity(action, entity_type, entity_id=None, entity_name='', description='', request=None, performed_by_user=None, performed_by_custom=None):
-    """
-    Helper function to create activity logs
-    Usage: log_activity('create', 'booking', booking.id, booking.client_name, 'Created new booking', request)
-    """
-    try:
-        ip_address = get_client_ip(request) if request else None
-        user_agent = request.META.get('HTTP_USER_AGENT', '') if request else ''
-        
-        ActivityLog.objects.create(
-            action=action,
-            entity_type=entity_type,
-            entity_id=entity_id,
-            entity_name=entity_name,
-            description=description,
-            performed_by_user=performed_by_user,
-            performed_by_custom=performed_by_custom,
-            ip_address=ip_address,
-            user_agent=user_agent
-        )
-    except Exception as e:
-        print(f"Activity logging error: {e}")
+from .autocomplete import booking_autocomplete, AUTOCOMPLETE_FIELDS
+from .activity_logger import log_activity
+from .dashboards import invalidate_dashboards
+from .single_flight import single_flight, BOOKINGS_VERSION
+from .booking_history import snapshot_booking, diff_snapshots, replay_booking
 
 
 # ============================================================
@@ -57,15 +30,16 @@ def log_activity(action, entity_type, entity_id=None, entity_name='', descriptio
 def get_nepali_date(english_date):
     """Convert English date to Nepali date"""
     try:
-        nepali_date = nepali_datetime.date.from_datetime_date(english_date)
-        return {
-            'year': nepali_date.year,
-            'month': nepali_date.month,
-            'day': nepali_date.day,
-            'month_name': nepali_date.strftime('%B'),
-            'formatted': nepali_date.strftime('%Y-%m-%d'),
-            'formatted_nepali': nepali_date.strftime('%Y %B %d')
-        }
+        with timed('nepali'):
+            nepali_date = nepali_datetime.date.from_datetime_date(english_date)
+            return {
+                'year': nepali_date.year,
+                'month': nepali_date.month,
+                'day': nepali_date.day,
+                'month_name': nepali_date.strftime('%B'),
+                'formatted': nepali_date.strftime('%Y-%m-%d'),
+                'formatted_nepali': nepali_date.strftime('%Y %B %d')
+            }
     except Exception as e:
         print(f"Error converting date: {e}")
         return None
@@ -94,13 +68,100 @@ def get_shift_type(start_time, end_time):
         return ''
 
 
+# ============================================================
+# SHARED BOOKING SERIALIZATION
+# ============================================================
+def get_booking_queryset():
+    """Bookings with their creators joined, so get_creator_name() needs no extra queries"""
+    return Booking.objects.select_related('created_by_user', 'created_by_custom')
+
+
+def serialize_booking(booking, nepali_dates=None):
+    """JSON representation of a booking used by the list endpoints and the bootstrap bundle"""
+    if nepali_dates is not None:
+        if booking.booking_date not in nepali_dates:
+            nepali_dates[booking.booking_date] = get_nepali_date(booking.booking_date)
+        nepali_date = nepali_dates[booking.booking_date]
+    else:
+        nepali_date = get_nepali_date(booking.booking_date)
+    return {
+        'id': booking.id,
+        'client_name': booking.client_name,
+        'booking_date': booking.booking_date.strftime('%Y-%m-%d'),
+        'booking_date_nepali': nepali_date['formatted_nepali'] if nepali_date else '',
+        'start_time': booking.start_time.strftime('%H:%M'),
+        'end_time': booking.end_time.strftime('%H:%M'),
+        'phone_number': booking.phone_number,
+        'email': booking.email or '',
+        'event_type': booking.event_type,
+        'event_type_display': booking.get_event_type_display(),
+        'menu_type': booking.menu_type or '',
+        'no_of_packs': booking.no_of_packs or '',
+        'advance_given': str(booking.advance_given),
+        'color': booking.get_time_color(),
+        'shift_type': get_shift_type(booking.start_time, booking.end_time),
+        'created_by': booking.get_creator_name(),
+        'created_at': booking.created_at.strftime('%Y-%m-%d %H:%M:%S')
+    }
+
+
+def get_month_bounds(year, month):
+    first_day = date(year, month, 1)
+    if month == 12:
+        last_day = date(year + 1, 1, 1)
+    else:
+        last_day = date(year, month + 1, 1)
+    return first_day, last_day
+
+
+def build_calendar_days(first_day, last_day, bookings, nepali_dates=None):
+    """Month grid from already fetched bookings (grouped in Python, no query per day)"""
+    nepali_dates = {} if nepali_dates is None else nepali_dates
+    bookings_by_date = {}
+    for booking in bookings:
+        if first_day <= booking.booking_date < last_day:
+            bookings_by_date.setdefault(booking.booking_date, []).append(booking)
+    
+    today = date.today()
+    calendar_days = []
+    current_date = first_day
+    
+    while current_date < last_day:
+        if current_date not in nepali_dates:
+            nepali_dates[current_date] = get_nepali_date(current_date)
+        day_bookings = bookings_by_date.get(current_date, [])
+        
+        calendar_days.append({
+            'date': current_date.strftime('%Y-%m-%d'),
+            'day': current_date.day,
+            'nepali_date': nepali_dates[current_date],
+            'is_today': current_date == today,
+            'booking_count': len(day_bookings),
+            'bookings': [
+                {
+                    'id': booking.id,
+                    'client_name': booking.client_name,
+                    'event_type': booking.get_event_type_display(),
+                    'start_time': booking.start_time.strftime('%H:%M'),
+                    'end_time': booking.end_time.strftime('%H:%M'),
+                    'color': booking.get_time_color(),
+                    'shift_type': get_shift_type(booking.start_time, booking.end_time)
+                }
+                for booking in day_bookings
+            ]
+        })
+        current_date = current_date + timedelta(days=1)
+    
+    return calendar_days
+
+
 # ============================================================
 # CALENDAR VIEWS
 # ============================================================
 @login_required_dual(login_url='/unauthorized/')
 def calendar_view(request):
     """Render the calendar booking page"""
-    custom_users = CustomUser.objects.all()
+    custom_users = get_user_name_map()
     today = date.today()
     nepali_today = get_nepali_date(today)
     
@@ -110,65 +171,89 @@ def calendar_view(request):
     context = {
         'custom_users': custom_users,
         'today_nepali': nepali_today,
-        'event_types': event_types
+        'event_types': event_types,
+        # Embedded with json_script so the first paint needs no XHRs
+        'calendar_bootstrap': get_calendar_bootstrap(today.year, today.month, today),
     }
     return render(request, 'Function/calendar.html', context)
 
 
+# ============================================================
+# CALENDAR BOOTSTRAP BUNDLE
+# ============================================================
+def get_calendar_bootstrap(year, month, selected_date):
+    """
+    Everything the calendar page needs on open: the month grid, all bookings
+    (the list and the header stats), and the selected day's bookings.
+    One bookings query feeds every part, and Nepali dates are converted once per day.
+    """
+    first_day, last_day = get_month_bounds(year, month)
+    today = date.today()
+    
+    bookings = list(get_booking_queryset().order_by('booking_date', 'start_time'))
+    nepali_dates = {}
+    bookings_data = [serialize_booking(booking, nepali_dates) for booking in bookings]
+    selected_date_str = selected_date.strftime('%Y-%m-%d')
+    
+    return {
+        'year': year,
+        'month': month,
+        'calendar_days': build_calendar_days(first_day, last_day, bookings, nepali_dates),
+        'bookings': bookings_data,
+        'selected_date': selected_date_str,
+        'selected_bookings': [booking for booking in bookings_data if booking['booking_date'] == selected_date_str],
+        'stats': {
+            'total_bookings': len(bookings),
+            'upcoming_bookings': sum(1 for booking in bookings if booking.booking_date >= today),
+            'month_bookings': sum(1 for booking in bookings if first_day <= booking.booking_date < last_day),
+        },
+    }
+
+
 @login_required_dual(login_url='/unauthorized/')
 @require_http_methods(["GET"])
-def get_calendar_data(request):
+def get_calendar_bootstrap_data(request):
+    """API endpoint returning the calendar page's initial data in one response"""
+    try:
+        today = date.today()
+        year = int(request.GET.get('year', today.year))
+        month = int(request.GET.get('month', today.month))
+        selected = request.GET.get('date', None)
+        selected_date = datetime.strptime(selected, '%Y-%m-%d').date() if selected else today
+        
+        return JsonResponse(get_calendar_bootstrap(year, month, selected_date), status=200)
+    
+    except Exception as e:
+        return JsonResponse({'error': str(e)}, status=500)
+
+
+@login_required_dual(login_url='/unauthorized/')
+@require_http_methods(["GET"])
+@single_flight(versions=(BOOKINGS_VERSION,))
+async def get_calendar_data(request):
     """API endpoint to get calendar data with Nepali dates"""
     try:
         year = int(request.GET.get('year', datetime.now().year))
         month = int(request.GET.get('month', datetime.now().month))
         
-        first_day = date(year, month, 1)
-        if month == 12:
-            last_day = date(year + 1, 1, 1)
-        else:
-            last_day = date(year, month + 1, 1)
-        
-        bookings = Booking.objects.filter(
-            booking_date__gte=first_day,
-            booking_date__lt=last_day
-        )
+        first_day, last_day = get_month_bounds(year, month)
         
-        calendar_days = []
-        current_date = first_day
+        bookings = [
+            booking async for booking in Booking.objects.filter(
+                booking_date__gte=first_day,
+                booking_date__lt=last_day
+            )
+        ]
         
-        while current_date < last_day:
-            nepali_date = get_nepali_date(current_date)
-            day_bookings = bookings.filter(booking_date=current_date)
-            
-            day_data = {
-                'date': current_date.strftime('%Y-%m-%d'),
-                'day': current_date.day,
-                'nepali_date': nepali_date,
-                'is_today': current_date == date.today(),
-                'booking_count': day_bookings.count(),
-                'bookings': []
-            }
-            
-            for booking in day_bookings:
-                day_data['bookings'].append({
-                    'id': booking.id,
-                    'client_name': booking.client_name,
-                    'event_type': booking.get_event_type_display(),
-                    'start_time': booking.start_time.strftime('%H:%M'),
-                    'end_time': booking.end_time.strftime('%H:%M'),
-                    'color': booking.get_time_color(),
-                    'shift_type': get_shift_type(booking.start_time, booking.end_time)
-                })
+        with timed('serialize'):
+            calendar_days = build_calendar_days(first_day, last_day, bookings)
             
-            calendar_days.append(day_data)
-            current_date = current_date + timedelta(days=1)
-        
-        return JsonResponse({
-            'calendar_days': calendar_days,
-            'year': year,
-            'month': month
-        }, status=200)
+            response = JsonResponse({
+                'calendar_days': calendar_days,
+                'year': year,
+                'month': month
+            }, status=200)
+        return response
     
     except Exception as e:
         return JsonResponse({'error': str(e)}, status=500)
@@ -180,7 +265,7 @@ def get_bookings(request):
     """API endpoint to get all bookings with Nepali dates"""
     try:
         created_by_filter = request.GET.get('created_by', None)
-        bookings = Booking.objects.all()
+        bookings = get_booking_queryset()
         
         if created_by_filter:
             if created_by_filter.startswith('user_'):
@@ -190,28 +275,8 @@ def get_bookings(request):
                 custom_id = created_by_filter.replace('custom_', '')
                 bookings = bookings.filter(created_by_custom_id=custom_id)
         
-        bookings_data = []
-        for booking in bookings:
-            nepali_date = get_nepali_date(booking.booking_date)
-            bookings_data.append({
-                'id': booking.id,
-                'client_name': booking.client_name,
-                'booking_date': booking.booking_date.strftime('%Y-%m-%d'),
-                'booking_date_nepali': nepali_date['formatted_nepali'] if nepali_date else '',
-                'start_time': booking.start_time.strftime('%H:%M'),
-                'end_time': booking.end_time.strftime('%H:%M'),
-                'phone_number': booking.phone_number,
-                'email': booking.email or '',
-                'event_type': booking.event_type,
-                'event_type_display': booking.get_event_type_display(),
-                'menu_type': booking.menu_type or '',
-                'no_of_packs': booking.no_of_packs or '',
-                'advance_given': str(booking.advance_given),
-                'color': booking.get_time_color(),
-                'shift_type': get_shift_type(booking.start_time, booking.end_time),
-                'created_by': booking.get_creator_name(),
-                'created_at': booking.created_at.strftime('%Y-%m-%d %H:%M:%S')
-            })
+        nepali_dates = {}
+        bookings_data = [serialize_booking(booking, nepali_dates) for booking in bookings]
         
         return JsonResponse({'bookings': bookings_data}, status=200)
     
@@ -259,6 +324,45 @@ def get_booking_detail(request, booking_id):
         return JsonResponse({'error': str(e)}, status=500)
 
 
+@login_required_dual(login_url='/unauthorized/')
+@require_http_methods(["GET"])
+def get_booking_history(request, booking_id):
+    """
+    API endpoint to rebuild a booking as it was at a point in time by replaying
+    the field diffs stored on its activity logs.
+    ?at=YYYY-MM-DDTHH:MM[:SS] (local time, defaults to now)
+    """
+    try:
+        at_param = request.GET.get('at')
+        try:
+            at = datetime.fromisoformat(at_param) if at_param else timezone.now()
+        except ValueError:
+            return JsonResponse({'error': 'Invalid at, expected YYYY-MM-DDTHH:MM'}, status=400)
+        if timezone.is_naive(at):
+            at = timezone.make_aware(at)
+        
+        state, history = replay_booking(booking_id, at)
+        
+        return JsonResponse({
+            'booking_id': booking_id,
+            'at': timezone.localtime(at).strftime('%Y-%m-%d %H:%M:%S'),
+            'exists': state is not None,
+            'booking': state,
+            'history': [
+                {
+                    'log_id': log.id,
+                    'action': log.action,
+                    'changes': log.changes,
+                    'created_at': timezone.localtime(log.created_at).strftime('%Y-%m-%d %H:%M:%S'),
+                }
+                for log in history
+            ]
+        }, status=200)
+    
+    except Exception as e:
+        return JsonResponse({'error': str(e)}, status=500)
+
+
 @login_required_dual(login_url='/unauthorized/')
 @require_http_methods(["POST"])
 def create_booking(request):
@@ -291,18 +395,7 @@ def create_booking(request):
         if bookings_on_date >= 2:
             return JsonResponse({'error': 'Maximum 2 bookings per day'}, status=400)
         
-        created_by_user = None
-        created_by_custom = None
-        
-        if request.user.is_authenticated:
-            created_by_user = request.user
-        else:
-            custom_user_id = request.COOKIES.get("custom_user_id")
-            if custom_user_id:
-                try:
-                    created_by_custom = CustomUser.objects.get(id=custom_user_id)
-                except CustomUser.DoesNotExist:
-                    pass
+        created_by_user, created_by_custom = get_request_actor(request)
         
         booking = Booking.objects.create(
             client_name=data['client_name'],
@@ -315,9 +408,12 @@ def create_booking(request):
             menu_type=data.get('menu_type', ''),
             no_of_packs=data.get('no_of_packs', ''),
             advance_given=advance_given,
-            created_by_user=created_by_user,
-            created_by_custom=created_by_custom
+            created_by_user_id=getattr(created_by_user, 'pk', None),
+            created_by_custom_id=getattr(created_by_custom, 'pk', None)
         )
+        booking_autocomplete.record_booking(booking)
+        invalidate_dashboards(booking)
+        bump_cache_version(BOOKINGS_VERSION)
         
         log_activity(
             'create',
@@ -327,7 +423,8 @@ def create_booking(request):
             description=f'Created new booking for {booking.client_name} on {booking.booking_date} ({booking.get_event_type_display()})',
             request=request,
             performed_by_user=created_by_user,
-            performed_by_custom=created_by_custom
+            performed_by_custom=created_by_custom,
+            changes=diff_snapshots(None, snapshot_booking(booking))
         )
         
         nepali_date = get_nepali_date(booking.booking_date)
@@ -350,7 +447,7 @@ def create_booking(request):
                 'advance_given': str(booking.advance_given),
                 'color': booking.get_time_color(),
                 'shift_type': get_shift_type(booking.start_time, booking.end_time),
-                'created_by': booking.get_creator_name()
+                'created_by': get_actor_name(created_by_user, created_by_custom)
             }
         }, status=201)
     
@@ -365,6 +462,8 @@ def update_booking(request, booking_id):
     try:
         booking = Booking.objects.get(id=booking_id)
         data = json.loads(request.body)
+        previous_values = {field: getattr(booking, field) for field in AUTOCOMPLETE_FIELDS}
+        before = snapshot_booking(booking)
         
         if 'client_name' in data:
             booking.client_name = data['client_name']
@@ -402,19 +501,11 @@ def update_booking(request, booking_id):
             return JsonResponse({'error': 'End time must be after start time'}, status=400)
         
         booking.save()
+        booking_autocomplete.record_booking(booking, previous=previous_values)
+        invalidate_dashboards(booking)
+        bump_cache_version(BOOKINGS_VERSION)
         
-        performed_by_user = None
-        performed_by_custom = None
-        
-        if request.user.is_authenticated:
-            performed_by_user = request.user
-        else:
-            custom_user_id = request.COOKIES.get("custom_user_id")
-            if custom_user_id:
-                try:
-                    performed_by_custom = CustomUser.objects.get(id=custom_user_id)
-                except CustomUser.DoesNotExist:
-                    pass
+        performed_by_user, performed_by_custom = get_request_actor(request)
         
         log_activity(
             'update',
@@ -424,7 +515,8 @@ def update_booking(request, booking_id):
             description=f'Updated booking for {booking.client_name} on {booking.booking_date} ({booking.get_event_type_display()})',
             request=request,
             performed_by_user=performed_by_user,
-            performed_by_custom=performed_by_custom
+            performed_by_custom=performed_by_custom,
+            changes=diff_snapshots(before, snapshot_booking(booking))
         )
         
         nepali_date = get_nepali_date(booking.booking_date)
@@ -468,18 +560,7 @@ def delete_booking(request, booking_id):
         booking_date = booking.booking_date
         booking_event_type = booking.get_event_type_display()
         
-        performed_by_user = None
-        performed_by_custom = None
-        
-        if request.user.is_authenticated:
-            performed_by_user = request.user
-        else:
-            custom_user_id = request.COOKIES.get("custom_user_id")
-            if custom_user_id:
-                try:
-                    performed_by_custom = CustomUser.objects.get(id=custom_user_id)
-                except CustomUser.DoesNotExist:
-                    pass
+        performed_by_user, performed_by_custom = get_request_actor(request)
         
         log_activity(
             'delete',
@@ -489,10 +570,14 @@ def delete_booking(request, booking_id):
             description=f'Deleted booking for {booking_client_name} on {booking_date} ({booking_event_type})',
             request=request,
             performed_by_user=performed_by_user,
-            performed_by_custom=performed_by_custom
+            performed_by_custom=performed_by_custom,
+            changes=diff_snapshots(snapshot_booking(booking), None)
         )
         
         booking.delete()
+        booking_autocomplete.forget_booking(booking)
+        invalidate_dashboards(booking)
+        bump_cache_version(BOOKINGS_VERSION)
         
         return JsonResponse({'message': 'Booking deleted successfully'}, status=200)
     
@@ -504,34 +589,17 @@ def delete_booking(request, booking_id):
 
 @login_required_dual(login_url='/unauthorized/')
 @require_http_methods(["GET"])
-def get_bookings_by_date(request, date_str):
+async def get_bookings_by_date(request, date_str):
     """API endpoint to get bookings for a specific date"""
     try:
         booking_date = datetime.strptime(date_str, '%Y-%m-%d').date()
-        bookings = Booking.objects.filter(booking_date=booking_date)
         nepali_date = get_nepali_date(booking_date)
         
-        bookings_data = []
-        for booking in bookings:
-            bookings_data.append({
-                'id': booking.id,
-                'client_name': booking.client_name,
-                'booking_date': booking.booking_date.strftime('%Y-%m-%d'),
-                'booking_date_nepali': nepali_date['formatted_nepali'] if nepali_date else '',
-                'start_time': booking.start_time.strftime('%H:%M'),
-                'end_time': booking.end_time.strftime('%H:%M'),
-                'phone_number': booking.phone_number,
-                'email': booking.email or '',
-                'event_type': booking.event_type,
-                'event_type_display': booking.get_event_type_display(),
-                'menu_type': booking.menu_type or '',
-                'no_of_packs': booking.no_of_packs or '',
-                'advance_given': str(booking.advance_given),
-                'color': booking.get_time_color(),
-                'shift_type': get_shift_type(booking.start_time, booking.end_time),
-                'created_by': booking.get_creator_name(),
-                'created_at': booking.created_at.strftime('%Y-%m-%d %H:%M:%S')
-            })
+        nepali_dates = {booking_date: nepali_date}
+        bookings_data = [
+            serialize_booking(booking, nepali_dates)
+            async for booking in get_booking_queryset().filter(booking_date=booking_date)
+        ]
         
         return JsonResponse({
             'bookings': bookings_data,
@@ -542,4 +610,32 @@ def get_bookings_by_date(request, date_str):
         }, status=200)
     
     except Exception as e:
-        return JsonResponse({'error': str(e)}, status=500)
\ No newline at end of file
+        return JsonResponse({'error': str(e)}, status=500)
+
+
+@login_required_dual(login_url='/unauthorized/')
+@require_http_methods(["GET"])
+def get_autocomplete(request):
+    """API endpoint for booking form type-ahead suggestions (client_name / menu_type)"""
+    try:
+        field = request.GET.get('field', '')
+        query = request.GET.get('q', '')
+        
+        if field not in AUTOCOMPLETE_FIELDS:
+            return JsonResponse({'error': f'field must be one of: {", ".join(AUTOCOMPLETE_FIELDS)}'}, status=400)
+        
+        try:
+            limit = min(max(int(request.GET.get('limit', 8)), 1), 20)
+        except ValueError:
+            limit = 8
+        
+        suggestions = booking_autocomplete.suggest(field, query, limit)
+        
+        return JsonResponse({
+            'field': field,
+            'query': query,
+            'suggestions': suggestions
+        }, status=200)
+    
+    except Exception as e:
+        return JsonResponse({'error': str(e)}, status=500)
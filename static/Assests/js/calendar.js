@@ -10,13 +10,76 @@ window.addEventListener('load', function() {
         document.getElementById('topBarPreloader').classList.add('hide');
     }, 500);
     
-    loadMonthData();
-    loadBookings();
+    // Initial data is embedded in the page; fall back to the APIs if it is missing
+    if (!applyBootstrap()) {
+        loadMonthData();
+        loadBookings();
+    }
     
     document.getElementById('creatorFilter').addEventListener('change', loadBookings);
     setupModalBackdropHandlers();
+    setupAutocomplete('clientName', 'client_name', 'clientNameSuggestions');
+    setupAutocomplete('menuType', 'menu_type', 'menuTypeSuggestions');
+    setupAutocomplete('editClientName', 'client_name', 'editClientNameSuggestions');
+    setupAutocomplete('editMenuType', 'menu_type', 'editMenuTypeSuggestions');
 });
 
+// Use the calendar bootstrap bundle embedded by the server (month grid + bookings)
+function applyBootstrap() {
+    const element = document.getElementById('calendar-bootstrap');
+    if (!element) return false;
+    
+    const bootstrap = JSON.parse(element.textContent);
+    // The server renders the current month; a client in another timezone may disagree
+    if (bootstrap.year !== currentDate.getFullYear() || bootstrap.month !== currentDate.getMonth() + 1) {
+        return false;
+    }
+    
+    currentMonthNepaliData = bootstrap;
+    allBookings = bootstrap.bookings || [];
+    renderCalendar();
+    renderBookingsList();
+    return true;
+}
+
+// Type-ahead suggestions for booking form text fields (debounced)
+function setupAutocomplete(inputId, field, datalistId) {
+    const input = document.getElementById(inputId);
+    const datalist = document.getElementById(datalistId);
+    if (!input || !datalist) return;
+
+    let debounceTimer = null;
+    let controller = null;
+
+    input.addEventListener('input', function() {
+        clearTimeout(debounceTimer);
+        const query = input.value.trim();
+        if (!query) {
+            datalist.innerHTML = '';
+            return;
+        }
+
+        debounceTimer = setTimeout(async () => {
+            if (controller) controller.abort();
+            controller = new AbortController();
+            try {
+                const response = await fetch(`/api/autocomplete/?field=${field}&q=${encodeURIComponent(query)}`, {
+                    method: 'GET',
+                    headers: { 'Accept': 'application/json' },
+                    signal: controller.signal
+                });
+                if (!response.ok) return;
+                const data = await response.json();
+                datalist.innerHTML = data.suggestions
+                    .map(value => `<option value="${escapeHtml(value)}"></option>`)
+                    .join('');
+            } catch (error) {
+                if (error.name !== 'AbortError') console.error('Autocomplete error:', error);
+            }
+        }, 200);
+    });
+}
+
 // Setup modal backdrop click handlers
 function setupModalBackdropHandlers() {
     const modals = ['addBookingModal', 'viewBookingsModal', 'editBookingModal'];
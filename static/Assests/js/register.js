@@ -4,6 +4,7 @@ window.addEventListener('load', function() {
         document.getElementById('topBarPreloader').classList.add('hide');
     }, 500);
     loadUsers();
+    setupUserSearch();
 });
 
 // Get CSRF Token from cookies
@@ -83,11 +84,27 @@ function hidePreloader() {
     document.getElementById('topBarPreloader').classList.add('hide');
 }
 
-// Load users from API
-async function loadUsers() {
+// Load users from API (one page at a time)
+let currentUserPage = 1;
+let userSearchTimer = null;
+
+function setupUserSearch() {
+    const input = document.getElementById('userSearchInput');
+    if (!input) return;
+    input.addEventListener('input', () => {
+        clearTimeout(userSearchTimer);
+        userSearchTimer = setTimeout(() => loadUsers(1), 300);
+    });
+}
+
+async function loadUsers(page = currentUserPage) {
     try {
         showPreloader();
-        const response = await fetch('/auth/api/users/', {
+        const params = new URLSearchParams({ page: page, per_page: 20 });
+        const search = document.getElementById('userSearchInput')?.value.trim();
+        if (search) params.append('search', search);
+
+        const response = await fetch(`/auth/api/users/?${params}`, {
             method: 'GET',
             headers: {
                 'Accept': 'application/json',
@@ -97,7 +114,8 @@ async function loadUsers() {
 
         if (response.ok) {
             const data = await response.json();
-            renderUsers(data.users || data || []);
+            renderUsers(data.users || []);
+            renderUserPagination(data.pagination);
         } else {
             showToast('Failed to load users', 'error');
         }
@@ -109,6 +127,16 @@ async function loadUsers() {
     }
 }
 
+// Render pagination controls
+function renderUserPagination(pagination) {
+    if (!pagination) return;
+    currentUserPage = pagination.current_page;
+    document.getElementById('userPaginationInfo').textContent =
+        `Page ${pagination.current_page} of ${pagination.total_pages} (${pagination.total_count} users)`;
+    document.getElementById('userPrevPage').disabled = !pagination.has_previous;
+    document.getElementById('userNextPage').disabled = !pagination.has_next;
+}
+
 // Render users in table
 function renderUsers(users) {
     const tbody = document.getElementById('userTableBody');
@@ -116,7 +144,7 @@ function renderUsers(users) {
     if (!users || users.length === 0) {
         tbody.innerHTML = `
             <tr>
-                <td colspan="5" class="px-6 py-12 text-center text-gray-500">
+                <td colspan="8" class="px-6 py-12 text-center text-gray-500">
                     <p class="font-semibold text-sm sm:text-base">No users registered yet</p>
                     <p class="text-xs sm:text-sm mt-1">Register a new user to get started</p>
                 </td>
@@ -131,6 +159,9 @@ function renderUsers(users) {
             <td class="px-3 sm:px-6 py-3 sm:py-4 text-xs sm:text-sm text-gray-800">${escapeHtml(user.full_name)}</td>
             <td class="px-3 sm:px-6 py-3 sm:py-4 text-xs sm:text-sm text-gray-600">${user.created_by ? escapeHtml(user.created_by) : 'System'}</td>
             <td class="px-3 sm:px-6 py-3 sm:py-4 text-xs sm:text-sm text-gray-600">${formatDate(user.created_at)}</td>
+            <td class="px-3 sm:px-6 py-3 sm:py-4 text-xs sm:text-sm text-gray-800 text-right">${user.booking_count}</td>
+            <td class="px-3 sm:px-6 py-3 sm:py-4 text-xs sm:text-sm text-gray-800 text-right">Rs. ${user.total_advance}</td>
+            <td class="px-3 sm:px-6 py-3 sm:py-4 text-xs sm:text-sm text-gray-600">${user.last_activity ? formatDate(user.last_activity) : '-'}</td>
             <td class="px-3 sm:px-6 py-3 sm:py-4">
                 <div class="flex items-center justify-center gap-2 flex-wrap">
                     <button 